@@ -1,17 +1,31 @@
-from typing import Generator
+from typing import Annotated
+from fastapi import Depends, Request
+from app.services.embedding import EmbeddingService
 from app.services.qdrant import QdrantService
-from app.core.config import settings
-
-# Assuming a simple dependency that yields a QdrantService instance
-def get_qdrant_service() -> Generator:
-    """Dependency that provides access to QdrantService."""
-    qdrant_service = QdrantService(
-        host=settings.QDRANT_HOST,
-        port=settings.QDRANT_PORT
-    )
-    try:
-        yield qdrant_service
-    finally:
-        qdrant_service.close()  # Assuming the QdrantService class has a close method
+from app.services.write_buffer import WriteBuffer
+
+
+def get_qdrant_service(request: Request) -> QdrantService:
+    """Dependency that provides the QdrantService created by the app lifespan."""
+    return request.app.state.qdrant_service
+
+
+QdrantServiceDep = Annotated[QdrantService, Depends(get_qdrant_service)]
+
+
+def get_embedding_service(request: Request) -> EmbeddingService:
+    """Dependency that provides the EmbeddingService created by the app lifespan."""
+    return request.app.state.embedding_service
+
+
+EmbeddingServiceDep = Annotated[EmbeddingService, Depends(get_embedding_service)]
+
+
+def get_write_buffer(request: Request) -> WriteBuffer:
+    """Dependency that provides the WriteBuffer created by the app lifespan."""
+    return request.app.state.write_buffer
+
+
+WriteBufferDep = Annotated[WriteBuffer, Depends(get_write_buffer)]
 
 # Additional dependencies, such as for authentication or authorization, can be defined here
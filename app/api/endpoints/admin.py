@@ -0,0 +1,52 @@
+import os
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse
+from app.models.models import OperationStatus
+
+router = APIRouter()
+
+
+def _profile_store(request: Request):
+    return request.app.state.profile_store
+
+
+@router.get("/profiles", status_code=200, response_model=OperationStatus)
+async def list_profiles(request: Request):
+    """List the saved request profiles, most recent first
+
+    Returns:
+        OperationStatus: The summary (route, status, duration and stage
+            timings) of every profile in the ring.
+    """
+    return OperationStatus(
+        message="Request profiles", details={"profiles": _profile_store(request).list()}
+    )
+
+
+@router.get("/profiles/{profile_id}", status_code=200, response_model=OperationStatus)
+async def get_profile(profile_id: str, request: Request):
+    """Retrieve a request profile, with its cProfile report when it was sampled
+
+    Returns:
+        OperationStatus: The profile summary and cProfile statistics.
+    """
+    profile = _profile_store(request).get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return OperationStatus(message="Request profile", details=profile)
+
+
+@router.get("/profiles/{profile_id}/raw", status_code=200)
+async def download_profile(profile_id: str, request: Request):
+    """Download the raw cProfile output of a sampled request, for pstats or snakeviz
+
+    Returns:
+        FileResponse: The .prof file.
+    """
+    store = _profile_store(request)
+    path = store.path(profile_id, ".prof")
+    if store.get(profile_id) is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(
+        path, media_type="application/octet-stream", filename=f"{profile_id}.prof"
+    )
@@ -1,21 +1,155 @@
+import asyncio
 from logging import getLogger
-from fastapi import APIRouter, HTTPException, Path, Body
-from typing import List, Dict, Union, Annotated
+from fastapi import APIRouter, HTTPException, Path, Body, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
+from typing import AsyncIterator, List, Dict, Optional, Union, Annotated
 from app.models.models import (
+    ChunkedTextDocument,
     Collection,
     CollectionCreate,
+    CollectionUpdate,
     Document,
+    DocumentBatchUpload,
+    DocumentCount,
+    DocumentIdList,
+    DocumentRetrieve,
+    ExportQuery,
+    HybridSearchQuery,
+    PayloadFilter,
     OperationStatus,
+    RetrieveQuery,
+    SearchBatchQuery,
+    SearchCacheConfig,
+    SearchQuery,
+    TextDocumentBatch,
+    TextSearchQuery,
 )
-from app.services.qdrant import QdrantService
+from app.api.deps import EmbeddingServiceDep, QdrantServiceDep, WriteBufferDep
+from app.api.responses import (
+    NDJSON,
+    OCTET_STREAM,
+    binary_document,
+    ndjson_document,
+    vector_response,
+)
+from app.core.config import settings
+from app.services.chunking import embed_chunks, iter_chunks, stale_chunks_filter
+from app.services.retrieval import postprocess
+from app.services.write_buffer import BufferFull, WriteBuffer, WriteTooLarge
 
 router = APIRouter()
-qdrant_service = QdrantService()
 logger = getLogger("uvicorn")
 
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/jsonl")
+# Invalid NDJSON lines reported back in full; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+def _ingest_status(response: Dict, details: Optional[Dict] = None):
+    """Builds the response for a chunked upload, 207 when it partly failed."""
+    details = details or response["content"]
+    if not response["success"] and response["status_code"] != 207:
+        raise HTTPException(status_code=response["status_code"], detail=details)
+    if not response["success"] or details.get("invalid_lines"):
+        return JSONResponse(
+            status_code=207,
+            content=OperationStatus(
+                message="Documents partially uploaded", details=details
+            ).model_dump(),
+        )
+    return OperationStatus(message="Documents uploaded", details=details)
+
+
+def _buffered_write(
+    write_buffer: WriteBuffer,
+    collection_name: str,
+    operation: str,
+    documents: List[Document],
+) -> JSONResponse:
+    """Hands documents to the write buffer and answers 202 with the job.
+
+    Raises:
+        HTTPException: 400 when a document has no id, 413 when there are more
+            documents than the buffer holds, 429 when the buffer is full
+    """
+    try:
+        job = write_buffer.submit(collection_name, operation, documents)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except WriteTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except BufferFull as e:
+        raise HTTPException(
+            status_code=429, detail=str(e), headers={"Retry-After": "1"}
+        )
+    return JSONResponse(
+        status_code=202,
+        content=OperationStatus(
+            message="Write accepted", details=job.report()
+        ).model_dump(),
+    )
+
+
+async def _read_ndjson(request: Request, errors: List[Dict]) -> AsyncIterator[Document]:
+    """Yields one Document per line of an NDJSON request body as it arrives.
+
+    Lines that fail validation are skipped and recorded in ``errors``, as are
+    lines longer than NDJSON_MAX_LINE_BYTES, which are dropped as they arrive
+    rather than buffered.
+    """
+    max_line_bytes = settings.NDJSON_MAX_LINE_BYTES
+    buffer = bytearray()
+    # The current line is over the limit and is skipped up to its end
+    skipping = False
+    line_number = 0
+    invalid = 0
+
+    def reject(line: int, error: str) -> None:
+        nonlocal invalid
+        invalid += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"line": line, "error": error})
+
+    def parse(line: bytes) -> Optional[Document]:
+        if not line.strip():
+            return None
+        try:
+            return Document.model_validate_json(line)
+        except ValidationError as e:
+            reject(line_number, str(e))
+            return None
+
+    async for data in request.stream():
+        start = 0
+        while True:
+            # Only the new bytes are searched for the end of the line
+            end = data.find(b"\n", start)
+            if not skipping:
+                buffer += data[start:] if end == -1 else data[start:end]
+                if len(buffer) > max_line_bytes:
+                    reject(line_number + 1, f"Line longer than {max_line_bytes} bytes")
+                    buffer.clear()
+                    skipping = True
+            if end == -1:
+                break
+            line_number += 1
+            if not skipping and (document := parse(bytes(buffer))) is not None:
+                yield document
+            buffer.clear()
+            skipping = False
+            start = end + 1
+    line_number += 1
+    if not skipping and (document := parse(bytes(buffer))) is not None:
+        yield document
+    if invalid > len(errors):
+        errors.append({"line": None, "error": f"{invalid - len(errors)} more"})
+
 
 @router.post("/collections/", status_code=201, response_model=OperationStatus)
-async def create_collection(collection: CollectionCreate):
+async def create_collection(
+    collection: CollectionCreate, qdrant_service: QdrantServiceDep
+):
     """
     Create a new collection in the Qdrant database.
     """
@@ -26,16 +160,12 @@ async def create_collection(collection: CollectionCreate):
         )
     return OperationStatus(
         message="Collection created successfully",
-        details={
-            "name": collection.name,
-            "dimensions": collection.dimensions,
-            "distance": collection.distance,
-        },
+        details=collection.model_dump(exclude_none=True),
     )
 
 
 @router.get("/collections/", status_code=200, response_model=OperationStatus)
-async def get_collections():
+async def get_collections(qdrant_service: QdrantServiceDep):
     """List the collection in the database
 
     Raises:
@@ -45,7 +175,9 @@ async def get_collections():
     """
     response = await qdrant_service.list_collections()
     if not response["success"]:
-        raise HTTPException(status_code=400, detail=response["content"])
+        raise HTTPException(
+            status_code=response["status_code"], detail=response["content"]
+        )
     return OperationStatus(
         message="Collections found", details={"collections": response["content"]}
     )
@@ -55,7 +187,8 @@ async def get_collections():
     "/collections/{collection_name}", status_code=200, response_model=OperationStatus
 )
 async def get_collection_info(
-    collection_name: Annotated[str, Path(title="The name of a collection that exist.")]
+    collection_name: Annotated[str, Path(title="The name of a collection that exist.")],
+    qdrant_service: QdrantServiceDep,
 ):
     """Returns information about a collection within the database
 
@@ -78,13 +211,123 @@ async def get_collection_info(
     return OperationStatus(message="Collection found", details=response["content"])
 
 
+@router.get(
+    "/collections/{collection_name}/cache",
+    status_code=200,
+    response_model=OperationStatus,
+)
+async def get_search_cache(collection_name: str, qdrant_service: QdrantServiceDep):
+    """Report whether search results are cached for a collection, and the hit rate
+
+    Returns:
+        OperationStatus: The search cache statistics of the collection.
+    """
+    return OperationStatus(
+        message="Search cache statistics",
+        details=qdrant_service.search_cache.stats(collection_name),
+    )
+
+
+@router.put(
+    "/collections/{collection_name}/cache",
+    status_code=200,
+    response_model=OperationStatus,
+)
+async def set_search_cache(
+    collection_name: str, config: SearchCacheConfig, qdrant_service: QdrantServiceDep
+):
+    """Turn search result caching on or off for a collection
+
+    Returns:
+        OperationStatus: The search cache statistics of the collection.
+    """
+    qdrant_service.search_cache.set_enabled(collection_name, config.enabled)
+    return OperationStatus(
+        message="Search cache updated",
+        details=qdrant_service.search_cache.stats(collection_name),
+    )
+
+
+@router.get("/embedding/stats", status_code=200, response_model=OperationStatus)
+async def get_embedding_stats(embedding_service: EmbeddingServiceDep):
+    """Report the dynamic batching and cache statistics of the embedding service
+
+    Returns:
+        OperationStatus: Queue depth, batch size histogram, queue wait times
+            and cache hit/miss/eviction counters.
+    """
+    return OperationStatus(
+        message="Embedding statistics", details=embedding_service.stats()
+    )
+
+
+@router.get("/jobs/", status_code=200, response_model=OperationStatus)
+async def get_write_buffer_stats(write_buffer: WriteBufferDep):
+    """Report the fill, flush lag and job counts of the write buffer
+
+    Returns:
+        OperationStatus: Buffered documents per collection, the age of the
+            oldest unwritten document and job counts by status.
+    """
+    return OperationStatus(
+        message="Write buffer statistics", details=write_buffer.stats()
+    )
+
+
+@router.get("/jobs/{job_id}", status_code=200, response_model=OperationStatus)
+async def get_write_job(job_id: str, write_buffer: WriteBufferDep):
+    """Report the progress of a buffered write
+
+    Raises:
+        HTTPException: Job not found
+
+    Returns:
+        OperationStatus: Documents written, superseded by a later write,
+            failed and still pending, with the first errors.
+    """
+    job = write_buffer.job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return OperationStatus(message="Job found", details=job.report())
+
+
+@router.patch(
+    "/collections/{collection_name}", status_code=200, response_model=OperationStatus
+)
+async def update_collection(
+    collection_name: Annotated[str, Path(title="The name of a collection that exist.")],
+    update: CollectionUpdate,
+    qdrant_service: QdrantServiceDep,
+):
+    """Change the HNSW, quantization, storage, replication and optimizer
+    settings of a collection, and index more payload fields
+
+    Raises:
+        HTTPException: Collection not found or invalid settings
+
+    Returns:
+        OperationStatus: Collection updated
+    """
+    response = await qdrant_service.update_collection(
+        Collection(name=collection_name), update
+    )
+    if not response["success"]:
+        raise HTTPException(
+            status_code=response["status_code"], detail=response["content"]
+        )
+    return OperationStatus(
+        message="Collection updated", details=update.model_dump(exclude_none=True)
+    )
+
+
 @router.delete(
     "/collections/{collection_name}", status_code=202, response_model=OperationStatus
 )
 async def delete_collection(
     collection_name: Annotated[
         str, Path(title="The name of an existing collection to delete.")
-    ]
+    ],
+    qdrant_service: QdrantServiceDep,
 ):
     """Deletes a collection that exists within the database
 
@@ -95,17 +338,573 @@ async def delete_collection(
         OperationStatus: Collection Deleted
     """
     collection_data = Collection(name=collection_name)
-    success = await qdrant_service.delete_collection(collection_data=collection_data)
-    if not success:
-        raise HTTPException(status_code=400, detail="Collection not found.")
+    response = await qdrant_service.delete_collection(collection_data=collection_data)
+    if not response["success"]:
+        raise HTTPException(
+            status_code=response["status_code"], detail=response["content"]
+        )
     return OperationStatus(message="Collection deleted", details=None)
 
 
+@router.post("/batch", status_code=201, response_model=OperationStatus)
+async def upload_documents(
+    batch: DocumentBatchUpload,
+    qdrant_service: QdrantServiceDep,
+    write_buffer: WriteBufferDep,
+    background: bool = False,
+):
+    """Upload many documents to a collection in concurrent chunks.
+
+    With ``background=true`` the documents are buffered and written later;
+    the response is 202 with a job to poll on /jobs/{job_id}.
+
+    Raises:
+        HTTPException: No chunk could be uploaded, or the write buffer is full
+
+    Returns:
+        OperationStatus: A per-chunk report. The status is 207 when only some
+            chunks were uploaded, so only the failed chunks need retrying.
+    """
+    if background:
+        return _buffered_write(
+            write_buffer, batch.collection_name, "upsert", batch.documents
+        )
+    c = Collection(name=batch.collection_name)
+    response = await qdrant_service.upload_documents(
+        collection=c,
+        documents=batch.documents,
+        chunk_size=batch.chunk_size,
+        wait=batch.wait,
+    )
+    return _ingest_status(response)
+
+
+@router.post(
+    "/{collection_name}/stream", status_code=201, response_model=OperationStatus
+)
+async def ingest_stream(
+    collection_name: str,
+    request: Request,
+    qdrant_service: QdrantServiceDep,
+    chunk_size: Annotated[Optional[int], Query(gt=0)] = None,
+    wait: bool = True,
+):
+    """Upload documents from an NDJSON body, one Document object per line.
+
+    The body is parsed line by line while earlier chunks are being written, so
+    memory use does not grow with the size of the upload. Invalid lines are
+    skipped and reported.
+
+    Raises:
+        HTTPException: The body is not NDJSON, or no chunk could be uploaded
+
+    Returns:
+        OperationStatus: A per-chunk report. The status is 207 when some
+            chunks or lines were not uploaded.
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if media_type not in NDJSON_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=415, detail=f"Content-Type must be one of {NDJSON_MEDIA_TYPES}"
+        )
+    c = Collection(name=collection_name)
+    errors = []
+    response = await qdrant_service.ingest_stream(
+        collection=c,
+        documents=_read_ndjson(request, errors),
+        chunk_size=chunk_size,
+        wait=wait,
+    )
+    return _ingest_status(response, {**response["content"], "invalid_lines": errors})
+
+
+@router.post("/{collection_name}/text", status_code=201, response_model=OperationStatus)
+async def upload_text_documents(
+    collection_name: str,
+    batch: TextDocumentBatch,
+    qdrant_service: QdrantServiceDep,
+    embedding_service: EmbeddingServiceDep,
+):
+    """Embed plain text documents and upload them in concurrent chunks.
+
+    The text is stored in each document's payload under "text". With
+    "sparse", BM25 sparse vectors are stored too, for hybrid search.
+
+    Raises:
+        HTTPException: No chunk could be uploaded
+
+    Returns:
+        OperationStatus: A per-chunk report. The status is 207 when only some
+            chunks were uploaded.
+    """
+    texts = [d.text for d in batch.documents]
+    vectors = await embedding_service.embed(texts)
+    sparse_vectors = (
+        await embedding_service.sparse_embed(texts)
+        if batch.sparse
+        else [None] * len(texts)
+    )
+    documents = [
+        Document(
+            id=d.id,
+            vector=v.tolist(),
+            sparse_vector=sv,
+            metadata={**(d.metadata or {}), "text": d.text},
+        )
+        for d, v, sv in zip(batch.documents, vectors, sparse_vectors)
+    ]
+    c = Collection(name=collection_name)
+    response = await qdrant_service.upload_documents(
+        collection=c, documents=documents, chunk_size=batch.chunk_size, wait=batch.wait
+    )
+    return _ingest_status(response)
+
+
+@router.post(
+    "/{collection_name}/text/chunked",
+    status_code=201,
+    response_model=OperationStatus,
+)
+async def upload_chunked_text_document(
+    collection_name: str,
+    document: ChunkedTextDocument,
+    qdrant_service: QdrantServiceDep,
+    embedding_service: EmbeddingServiceDep,
+):
+    """Split a long text document into token windows, embed and upload each one.
+
+    Every chunk becomes its own point, with the chunk text, "parent_id",
+    "chunk_index" and the "start"/"end" character offsets in its payload.
+    Chunks are produced, embedded and uploaded as a pipeline, so they are
+    never all held in memory at once. Chunks left from an earlier, longer
+    version of the document are deleted afterwards.
+
+    Raises:
+        HTTPException: Invalid chunking options, or no chunk could be uploaded
+
+    Returns:
+        OperationStatus: A per-chunk report. The status is 207 when only some
+            chunks were uploaded.
+    """
+    max_tokens = document.max_tokens or settings.CHUNK_MAX_TOKENS
+    overlap = settings.CHUNK_OVERLAP if document.overlap is None else document.overlap
+    # Leave room for the [CLS] and [SEP] tokens added when embedding
+    if max_tokens > embedding_service.max_length - 2:
+        raise HTTPException(
+            status_code=400,
+            detail=f"max_tokens must be at most {embedding_service.max_length - 2}",
+        )
+    if overlap >= max_tokens // 2:
+        raise HTTPException(
+            status_code=400, detail="overlap must be less than max_tokens / 2"
+        )
+    tokenizer = await asyncio.to_thread(lambda: embedding_service.tokenizer)
+    chunks = iter_chunks(
+        document.text,
+        tokenizer,
+        max_tokens=max_tokens,
+        overlap=overlap,
+        sentence_aware=document.sentence_aware,
+    )
+    c = Collection(name=collection_name)
+    response = await qdrant_service.ingest_stream(
+        collection=c,
+        documents=embed_chunks(
+            chunks,
+            embedding_service,
+            parent_id=document.id,
+            metadata=document.metadata or {},
+            batch_size=embedding_service.batch_size,
+            sparse=document.sparse,
+        ),
+        wait=document.wait,
+    )
+    content = response["content"]
+    if content["uploaded"]:
+        # The new chunks overwrote the old ones by id; delete the old ones past
+        # the end of the new version
+        total = content["uploaded"] + content["failed"]
+        cleanup = await qdrant_service.delete_by_filter(
+            c, PayloadFilter(filter=stale_chunks_filter(document.id, total))
+        )
+        if not cleanup["success"]:
+            content["stale_chunks_error"] = str(cleanup["content"])
+            response.update(success=False, status_code=207)
+    return _ingest_status(response)
+
+
+@router.post(
+    "/{collection_name}/search", status_code=200, response_model=OperationStatus
+)
+async def search(
+    collection_name: str,
+    query: SearchQuery,
+    request: Request,
+    qdrant_service: QdrantServiceDep,
+):
+    """Find the documents closest to a query vector.
+
+    Raises:
+        HTTPException: Invalid filter, or the collection could not be searched
+
+    Returns:
+        OperationStatus: The matching points, best first.
+    """
+    c = Collection(name=collection_name)
+    response = await qdrant_service.search(collection=c, query=query)
+    if not response["success"]:
+        raise HTTPException(
+            status_code=response["status_code"], detail=response["content"]
+        )
+    return vector_response(
+        request,
+        message="Search complete",
+        details={"points": response["content"]},
+        points=response["content"],
+    )
+
+
+@router.post(
+    "/{collection_name}/search/text", status_code=200, response_model=OperationStatus
+)
+async def search_text(
+    collection_name: str,
+    query: TextSearchQuery,
+    request: Request,
+    qdrant_service: QdrantServiceDep,
+    embedding_service: EmbeddingServiceDep,
+):
+    """Find the documents closest to a plain text query.
+
+    Raises:
+        HTTPException: Invalid filter, or the collection could not be searched
+
+    Returns:
+        OperationStatus: The matching points, best first.
+    """
+    vector = (await embedding_service.embed([query.text]))[0]
+    search_query = SearchQuery(
+        vector=vector.tolist(), **query.model_dump(exclude={"text"})
+    )
+    c = Collection(name=collection_name)
+    response = await qdrant_service.search(collection=c, query=search_query)
+    if not response["success"]:
+        raise HTTPException(
+            status_code=response["status_code"], detail=response["content"]
+        )
+    return vector_response(
+        request,
+        message="Search complete",
+        details={"points": response["content"]},
+        points=response["content"],
+    )
+
+
+@router.post(
+    "/{collection_name}/search/hybrid", status_code=200, response_model=OperationStatus
+)
+async def search_hybrid(
+    collection_name: str,
+    query: HybridSearchQuery,
+    request: Request,
+    qdrant_service: QdrantServiceDep,
+    embedding_service: EmbeddingServiceDep,
+):
+    """Find documents by both meaning and exact terms of a plain text query.
+
+    The dense embedding and the BM25 sparse vector of the query are searched
+    in one request and ranked by reciprocal rank fusion, so exact-term
+    matches (codes, names) surface alongside semantic ones. The collection
+    must be created with "sparse" and its documents uploaded with "sparse".
+
+    Raises:
+        HTTPException: Invalid filter, or the collection could not be searched
+
+    Returns:
+        OperationStatus: The matching points, best first.
+    """
+    vectors, sparse_vector = await asyncio.gather(
+        embedding_service.embed([query.text]),
+        embedding_service.sparse_embed_query(query.text),
+    )
+    c = Collection(name=collection_name)
+    response = await qdrant_service.hybrid_search(
+        collection=c,
+        vector=vectors[0].tolist(),
+        sparse_vector=sparse_vector,
+        query=query,
+    )
+    if not response["success"]:
+        raise HTTPException(
+            status_code=response["status_code"], detail=response["content"]
+        )
+    return vector_response(
+        request,
+        message="Search complete",
+        details={"points": response["content"]},
+        points=response["content"],
+    )
+
+
+@router.post(
+    "/{collection_name}/search/batch", status_code=200, response_model=OperationStatus
+)
+async def search_batch(
+    collection_name: str,
+    batch: SearchBatchQuery,
+    request: Request,
+    qdrant_service: QdrantServiceDep,
+):
+    """Run several searches against a collection in one round-trip.
+
+    Raises:
+        HTTPException: Invalid filter, or the collection could not be searched
+
+    Returns:
+        OperationStatus: One list of matching points per search, in order.
+    """
+    c = Collection(name=collection_name)
+    response = await qdrant_service.search_batch(collection=c, queries=batch.searches)
+    if not response["success"]:
+        raise HTTPException(
+            status_code=response["status_code"], detail=response["content"]
+        )
+    return vector_response(
+        request,
+        message="Search complete",
+        details={"results": response["content"]},
+        points=[p for points in response["content"] for p in points],
+    )
+
+
+@router.post(
+    "/{collection_name}/retrieve/context",
+    status_code=200,
+    response_model=OperationStatus,
+)
+async def retrieve_context(
+    collection_name: str,
+    query: RetrieveQuery,
+    request: Request,
+    qdrant_service: QdrantServiceDep,
+    embedding_service: EmbeddingServiceDep,
+):
+    """Retrieve a diverse set of documents fitting a token budget, for RAG.
+
+    "fetch_k" candidates are searched with their vectors, reordered by
+    maximal marginal relevance, near-duplicates dropped, and the best
+    "top_k" kept. With "max_tokens", only the documents whose "text_field"
+    texts fit the budget together are returned.
+
+    Raises:
+        HTTPException: Invalid filter, or the collection could not be searched
+
+    Returns:
+        OperationStatus: The selected points, best first, with the tokens
+            they use and the number of candidates dropped.
+    """
+    vector = (await embedding_service.embed([query.text]))[0]
+    search_query = SearchQuery(
+        vector=vector.tolist(),
+        **query.model_dump(
+            include={"offset", "score_threshold", "filter", "hnsw_ef", "exact"}
+        ),
+        top_k=query.fetch_k or 4 * query.top_k,
+        with_payload=True,
+        with_vectors=True,
+    )
+    c = Collection(name=collection_name)
+    response = await qdrant_service.search(collection=c, query=search_query)
+    if not response["success"]:
+        raise HTTPException(
+            status_code=response["status_code"], detail=response["content"]
+        )
+    if query.max_tokens is not None:
+        tokenizer = await asyncio.to_thread(lambda: embedding_service.tokenizer)
+    else:
+        tokenizer = None
+    result = await asyncio.to_thread(
+        postprocess,
+        response["content"],
+        vector,
+        query.top_k,
+        mmr_lambda=query.mmr_lambda,
+        duplicate_threshold=query.duplicate_threshold,
+        max_tokens=query.max_tokens,
+        tokenizer=tokenizer,
+        text_field=query.text_field,
+    )
+    # Copies, as the candidates may be shared with the search cache
+    points = [
+        {
+            **p,
+            "payload": p.get("payload") if query.with_payload else None,
+            "vector": p.get("vector") if query.with_vectors else None,
+        }
+        for p in result["points"]
+    ]
+    return vector_response(
+        request,
+        message="Retrieval complete",
+        details={**result, "points": points},
+        points=points,
+    )
+
+
+@router.post(
+    "/{collection_name}/retrieve", status_code=200, response_model=OperationStatus
+)
+async def get_documents(
+    collection_name: str,
+    selection: DocumentRetrieve,
+    request: Request,
+    qdrant_service: QdrantServiceDep,
+):
+    """Retrieve many documents by id in one call.
+
+    Ids that do not exist are left out of the result. Vectors can be
+    negotiated as for a single document.
+
+    Raises:
+        HTTPException: The collection could not be read
+
+    Returns:
+        OperationStatus: The documents found.
+    """
+    c = Collection(name=collection_name)
+    response = await qdrant_service.get_documents(collection=c, selection=selection)
+    if not response["success"]:
+        raise HTTPException(
+            status_code=response["status_code"], detail=response["content"]
+        )
+    return vector_response(
+        request,
+        message="Documents found",
+        details={"points": response["content"]},
+        points=response["content"],
+    )
+
+
+@router.post(
+    "/{collection_name}/delete", status_code=200, response_model=OperationStatus
+)
+async def delete_documents(
+    collection_name: str, selection: DocumentIdList, qdrant_service: QdrantServiceDep
+):
+    """Delete many documents by id in one call.
+
+    Raises:
+        HTTPException: The documents could not be deleted
+
+    Returns:
+        OperationStatus: Documents deleted
+    """
+    c = Collection(name=collection_name)
+    response = await qdrant_service.delete_documents(collection=c, selection=selection)
+    if not response["success"]:
+        raise HTTPException(
+            status_code=response["status_code"], detail=response["content"]
+        )
+    return OperationStatus(message="Documents deleted", details=response["content"])
+
+
+@router.post(
+    "/{collection_name}/delete/filter",
+    status_code=200,
+    response_model=OperationStatus,
+)
+async def delete_by_filter(
+    collection_name: str, selection: PayloadFilter, qdrant_service: QdrantServiceDep
+):
+    """Delete every document matching a payload filter in one call.
+
+    Raises:
+        HTTPException: Invalid filter, or the documents could not be deleted
+
+    Returns:
+        OperationStatus: Documents deleted
+    """
+    c = Collection(name=collection_name)
+    response = await qdrant_service.delete_by_filter(collection=c, selection=selection)
+    if not response["success"]:
+        raise HTTPException(
+            status_code=response["status_code"], detail=response["content"]
+        )
+    return OperationStatus(message="Documents deleted", details=response["content"])
+
+
+@router.post(
+    "/{collection_name}/count", status_code=200, response_model=OperationStatus
+)
+async def count_documents(
+    collection_name: str, query: DocumentCount, qdrant_service: QdrantServiceDep
+):
+    """Count the documents in a collection, optionally matching a payload filter.
+
+    Raises:
+        HTTPException: Invalid filter, or the collection could not be read
+
+    Returns:
+        OperationStatus: The number of matching documents.
+    """
+    c = Collection(name=collection_name)
+    response = await qdrant_service.count_documents(collection=c, query=query)
+    if not response["success"]:
+        raise HTTPException(
+            status_code=response["status_code"], detail=response["content"]
+        )
+    return OperationStatus(message="Documents counted", details=response["content"])
+
+
+@router.post("/{collection_name}/export", status_code=200)
+async def export_documents(
+    collection_name: str, query: ExportQuery, qdrant_service: QdrantServiceDep
+):
+    """Stream a whole collection, or the documents matching a filter.
+
+    Documents are scrolled page by page in id order and written as they
+    arrive, so memory use does not depend on the size of the collection.
+    The ndjson format has one Document object per line and can be fed back
+    into the stream endpoint. The binary format is described in
+    app.api.responses.binary_document. To resume an interrupted export,
+    pass the last id received as ``offset`` and drop the first document.
+
+    Raises:
+        HTTPException: Invalid filter, or the collection could not be read
+    """
+    c = Collection(name=collection_name)
+    response = await qdrant_service.export_documents(collection=c, query=query)
+    if not response["success"]:
+        raise HTTPException(
+            status_code=response["status_code"], detail=response["content"]
+        )
+    encode = ndjson_document if query.format == "ndjson" else binary_document
+
+    async def body():
+        async for page in response["content"]:
+            yield b"".join(encode(point) for point in page)
+
+    return StreamingResponse(
+        body(), media_type=NDJSON if query.format == "ndjson" else OCTET_STREAM
+    )
+
+
 @router.post("/{collection_name}", status_code=201, response_model=OperationStatus)
-async def upload_document(collection_name: str, document: Document):
+async def upload_document(
+    collection_name: str,
+    document: Document,
+    qdrant_service: QdrantServiceDep,
+    write_buffer: WriteBufferDep,
+    background: bool = False,
+):
     """
     Upload a document to the qdrant database.
+
+    With ``background=true`` the document is buffered and written later; the
+    response is 202 with a job to poll on /jobs/{job_id}.
     """
+    if background:
+        return _buffered_write(write_buffer, collection_name, "upsert", [document])
     c = Collection(name=collection_name)
     response = await qdrant_service.upload_document(collection=c, document=document)
     if not response["success"]:
@@ -118,7 +917,9 @@ async def upload_document(collection_name: str, document: Document):
 @router.delete(
     "/{collection_name}/{document_id}", status_code=200, response_model=OperationStatus
 )
-async def delete_document(collection_name: str, document_id: int):
+async def delete_document(
+    collection_name: str, document_id: int, qdrant_service: QdrantServiceDep
+):
     c = Collection(name=collection_name)
     d = Document(id=document_id)
     response = await qdrant_service.delete_document(collection=c, document=d)
@@ -132,7 +933,18 @@ async def delete_document(collection_name: str, document_id: int):
 @router.get(
     "/{collection_name}/{document_id}", status_code=200, response_model=OperationStatus
 )
-async def get_document(collection_name: str, document_id: int):
+async def get_document(
+    collection_name: str,
+    document_id: int,
+    request: Request,
+    qdrant_service: QdrantServiceDep,
+):
+    """Returns a document with its payload and vector
+
+    The vector is a list of floats by default. Send
+    ``Accept: application/json; vector-encoding=base64`` for base64 float32,
+    or ``Accept: application/octet-stream`` for the raw float32 bytes only.
+    """
     c = Collection(name=collection_name)
     d = Document(id=document_id)
     response = await qdrant_service.get_document(collection=c, document=d)
@@ -140,16 +952,32 @@ async def get_document(collection_name: str, document_id: int):
         raise HTTPException(
             status_code=response["status_code"], detail=response["content"]
         )
-    return OperationStatus(message="Document found", details=response["content"])
+    return vector_response(
+        request,
+        message="Document found",
+        details=response["content"],
+        points=[response["content"]],
+    )
 
 
 @router.post(
     "/{collection_name}/update", status_code=201, response_model=OperationStatus
 )
-async def update_document(collection_name: str, document: Document):
+async def update_document(
+    collection_name: str,
+    document: Document,
+    qdrant_service: QdrantServiceDep,
+    write_buffer: WriteBufferDep,
+    background: bool = False,
+):
     """
     Upload a document to the qdrant database.
+
+    With ``background=true`` the new vectors are buffered and written later;
+    the response is 202 with a job to poll on /jobs/{job_id}.
     """
+    if background:
+        return _buffered_write(write_buffer, collection_name, "update", [document])
     c = Collection(name=collection_name)
     response = await qdrant_service.update_document(collection=c, document=document)
     if not response["success"]:
@@ -0,0 +1,150 @@
+from typing import Any, Dict, List, Optional
+import base64
+import struct
+import time
+import numpy as np
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+from app.core.profiling import record_stage
+
+# Media type for a bare little-endian float32 vector
+OCTET_STREAM = "application/octet-stream"
+NDJSON = "application/x-ndjson"
+
+
+class ORJSONResponse(Response):
+    """JSON response rendered by orjson, which also serializes numpy arrays.
+
+    Returning it from an endpoint skips the re-validation of the content
+    against the endpoint's response_model.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        body = orjson.dumps(
+            content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+        record_stage("serialization", time.perf_counter() - start)
+        return body
+
+
+def encode_vector(vector) -> str:
+    """Encodes a vector as base64 of its little-endian float32 bytes."""
+    return base64.b64encode(np.asarray(vector, dtype="<f4").tobytes()).decode("ascii")
+
+
+def _encode_point(point: Dict) -> Dict:
+    vector = point.get("vector")
+    if vector is None:
+        return point
+    if isinstance(vector, dict):
+        vector = {
+            name: encode_vector(v) if isinstance(v, list) else v
+            for name, v in vector.items()
+        }
+    else:
+        vector = encode_vector(vector)
+    return {**point, "vector": vector}
+
+
+def vector_encoding(request: Request) -> Optional[str]:
+    """Reads the vector encoding the client asked for in its Accept header.
+
+    ``Accept: application/octet-stream`` asks for raw float32 bytes, and
+    ``Accept: application/json; vector-encoding=base64`` for JSON with base64
+    vectors. Anything else gets plain JSON float lists.
+    """
+    accept = request.headers.get("accept", "")
+    for media_range in accept.split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        if media_type == OCTET_STREAM:
+            return "raw"
+        if "vector-encoding=base64" in params:
+            return "base64"
+    return None
+
+
+def vector_response(
+    request: Request,
+    message: str,
+    details: Dict,
+    points: Optional[List[Dict]] = None,
+    status_code: int = 200,
+) -> Response:
+    """Builds an OperationStatus-shaped response for vector-heavy endpoints.
+
+    The vectors of ``points`` (which must be the point dicts referenced from
+    ``details``) are encoded as the client asked. With raw encoding the body
+    is the vectors of ``points`` as consecutive float32 rows, with the row
+    count and dimensions in the X-Vector-Count and X-Vector-Dimensions
+    headers; the rest of ``details`` is dropped.
+    """
+    encoding = vector_encoding(request)
+    points = points or []
+    if encoding == "raw":
+        vectors = [p["vector"] for p in points if isinstance(p.get("vector"), list)]
+        matrix = np.asarray(vectors, dtype="<f4")
+        return Response(
+            content=matrix.tobytes(),
+            status_code=status_code,
+            media_type=OCTET_STREAM,
+            headers={
+                "X-Vector-Count": str(len(vectors)),
+                "X-Vector-Dimensions": str(matrix.shape[1] if vectors else 0),
+            },
+        )
+    if encoding == "base64":
+        encoded = {id(p): _encode_point(p) for p in points}
+        details = _replace_points(details, encoded)
+    return ORJSONResponse(
+        content={"message": message, "details": details}, status_code=status_code
+    )
+
+
+def _replace_points(value, encoded: Dict[int, Dict]):
+    """Copies ``value`` with each point dict swapped for its encoded version."""
+    if id(value) in encoded:
+        return encoded[id(value)]
+    if isinstance(value, dict):
+        return {k: _replace_points(v, encoded) for k, v in value.items()}
+    if isinstance(value, list) and value and isinstance(value[0], (dict, list)):
+        return [_replace_points(v, encoded) for v in value]
+    return value
+
+
+def ndjson_document(point: Dict) -> bytes:
+    """Encodes a point as one NDJSON Document line, as accepted by ingestion."""
+    document = {
+        "id": point["id"],
+        "vector": point.get("vector"),
+        "metadata": point.get("payload"),
+    }
+    if "sparse_vector" in point:
+        document["sparse_vector"] = point["sparse_vector"]
+    return orjson.dumps(document, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n"
+
+
+def binary_document(point: Dict) -> bytes:
+    """Encodes a point as one length-prefixed binary record.
+
+    A record is a little-endian uint32 header length, a JSON header holding
+    "id" and "metadata", a uint32 vector dimension and then that many
+    little-endian float32 values. Points without a single dense vector have
+    dimension 0.
+    """
+    header = orjson.dumps({"id": point["id"], "metadata": point.get("payload")})
+    vector = point.get("vector")
+    if not isinstance(vector, list):
+        vector = []
+    values = np.asarray(vector, dtype="<f4").tobytes()
+    return b"".join(
+        (
+            struct.pack("<I", len(header)),
+            header,
+            struct.pack("<I", len(vector)),
+            values,
+        )
+    )
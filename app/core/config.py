@@ -1,5 +1,6 @@
 import os
 import json
+from typing import Optional
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
 
@@ -11,6 +12,163 @@ class Settings(BaseSettings):
     QDRANT_HOST: str = os.environ["QDRANT_HOST"]
     QDRANT_PORT: int = os.environ["QDRANT_PORT"]
     QDRANT_API_KEY: str = os.environ["QDRANT_API_KEY"]
+    # Set to ":memory:" or a local path to run Qdrant in embedded local mode
+    QDRANT_LOCATION: Optional[str] = os.environ.get("QDRANT_LOCATION")
+    QDRANT_PREFER_GRPC: bool = os.environ.get("QDRANT_PREFER_GRPC", "false")
+    QDRANT_GRPC_PORT: int = os.environ.get("QDRANT_GRPC_PORT", 6334)
+    # Connection pool shared by every request in the process
+    QDRANT_POOL_SIZE: int = os.environ.get("QDRANT_POOL_SIZE", 32)
+    QDRANT_KEEPALIVE_EXPIRY: float = os.environ.get("QDRANT_KEEPALIVE_EXPIRY", 30.0)
+    QDRANT_TIMEOUT: int = os.environ.get("QDRANT_TIMEOUT", 10)
+    # Other Qdrant nodes serving the same collections ("host" or "host:port",
+    # comma-separated), used for hedged reads
+    QDRANT_REPLICA_HOSTS: str = os.environ.get("QDRANT_REPLICA_HOSTS", "")
+    # Hedged reads: a search or retrieve still running after the
+    # HEDGE_PERCENTILE latency of recent ones (and at least HEDGE_MIN_DELAY_MS)
+    # is sent again, to the next replica if any, and the first answer is used.
+    # At most about HEDGE_BUDGET of the reads are hedged
+    HEDGE_ENABLED: bool = os.environ.get("HEDGE_ENABLED", "true")
+    HEDGE_PERCENTILE: float = os.environ.get("HEDGE_PERCENTILE", 95)
+    HEDGE_MIN_DELAY_MS: float = os.environ.get("HEDGE_MIN_DELAY_MS", 10)
+    HEDGE_BUDGET: float = os.environ.get("HEDGE_BUDGET", 0.1)
+    # Vector store: "qdrant", or "embedded" for the in-process NumPy store kept
+    # in EMBEDDED_STORE_PATH (":memory:" for a temporary directory). Tombstoned
+    # rows are compacted away once they make up EMBEDDED_COMPACT_RATIO of a
+    # collection. The embedded store is locked to one process, so the app must
+    # run a single worker with it
+    VECTOR_BACKEND: str = os.environ.get("VECTOR_BACKEND", "qdrant")
+    EMBEDDED_STORE_PATH: str = os.environ.get("EMBEDDED_STORE_PATH", ":memory:")
+    EMBEDDED_COMPACT_RATIO: float = os.environ.get("EMBEDDED_COMPACT_RATIO", 0.2)
+
+    # Batch ingestion: points per upsert call and concurrent upserts per batch
+    INGEST_CHUNK_SIZE: int = os.environ.get("INGEST_CHUNK_SIZE", 256)
+    INGEST_MAX_CONCURRENCY: int = os.environ.get("INGEST_MAX_CONCURRENCY", 4)
+    # Longest NDJSON line accepted by streaming ingestion; longer lines are
+    # skipped and reported as invalid
+    NDJSON_MAX_LINE_BYTES: int = os.environ.get(
+        "NDJSON_MAX_LINE_BYTES", 16 * 1024 * 1024
+    )
+
+    # Write-behind buffer for ?background=true writes: documents buffered at
+    # most, documents per flush, longest wait before a flush, collections
+    # flushed concurrently, an optional append-only log replayed on start,
+    # and how many finished jobs are kept for status queries
+    WRITE_BUFFER_MAX_DOCUMENTS: int = os.environ.get(
+        "WRITE_BUFFER_MAX_DOCUMENTS", 10_000
+    )
+    WRITE_BUFFER_FLUSH_SIZE: int = os.environ.get("WRITE_BUFFER_FLUSH_SIZE", 1024)
+    WRITE_BUFFER_FLUSH_INTERVAL_MS: float = os.environ.get(
+        "WRITE_BUFFER_FLUSH_INTERVAL_MS", 200
+    )
+    WRITE_BUFFER_WORKERS: int = os.environ.get("WRITE_BUFFER_WORKERS", 2)
+    WRITE_BUFFER_LOG_PATH: Optional[str] = os.environ.get("WRITE_BUFFER_LOG_PATH")
+    WRITE_BUFFER_MAX_JOBS: int = os.environ.get("WRITE_BUFFER_MAX_JOBS", 10_000)
+
+    # Text embedding
+    EMBEDDING_MODEL: str = os.environ.get("EMBEDDING_MODEL", "bert-base-uncased")
+    EMBEDDING_MAX_LENGTH: int = os.environ.get("EMBEDDING_MAX_LENGTH", 512)
+    EMBEDDING_BATCH_SIZE: int = os.environ.get("EMBEDDING_BATCH_SIZE", 32)
+    # Never download model files; EMBEDDING_MODEL must then be a local directory
+    # or already be in the Hugging Face cache
+    EMBEDDING_LOCAL_FILES_ONLY: bool = os.environ.get(
+        "EMBEDDING_LOCAL_FILES_ONLY", "false"
+    )
+    # Inference backend: "torch" or "onnx" (ONNX Runtime on an export of the
+    # model, kept in EMBEDDING_ONNX_DIR), optionally int8-quantized (onnx only)
+    EMBEDDING_BACKEND: str = os.environ.get("EMBEDDING_BACKEND", "torch")
+    EMBEDDING_QUANTIZE: bool = os.environ.get("EMBEDDING_QUANTIZE", "false")
+    EMBEDDING_ONNX_DIR: Optional[str] = os.environ.get("EMBEDDING_ONNX_DIR")
+    EMBEDDING_TORCH_COMPILE: bool = os.environ.get("EMBEDDING_TORCH_COMPILE", "false")
+    # Memory-map safetensors weights so processes share them (torch only)
+    EMBEDDING_MMAP_WEIGHTS: bool = os.environ.get("EMBEDDING_MMAP_WEIGHTS", "false")
+    # When to load the model: "lazy" on first use, "startup" in the background
+    # during the lifespan (readiness waits for it), or "import" when app.main is
+    # imported, so a preloading server (gunicorn --preload) loads it before
+    # forking workers
+    EMBEDDING_PRELOAD: str = os.environ.get("EMBEDDING_PRELOAD", "lazy")
+    # Threads running inference, and the torch intra-op thread pool they share
+    EMBEDDING_WORKERS: int = os.environ.get("EMBEDDING_WORKERS", 1)
+    EMBEDDING_TORCH_THREADS: int = os.environ.get(
+        "EMBEDDING_TORCH_THREADS", os.cpu_count() or 1
+    )
+    # Embedding processes (0 runs inference in-process on EMBEDDING_WORKERS
+    # threads). Each one loads the model and uses EMBEDDING_TORCH_THREADS
+    # threads; size API workers x processes x threads to the core count
+    EMBEDDING_PROCESSES: int = os.environ.get("EMBEDDING_PROCESSES", 0)
+    # Texts per job sent to an embedding process, which sizes its shared
+    # memory output buffer
+    EMBEDDING_PROCESS_MAX_ROWS: int = os.environ.get("EMBEDDING_PROCESS_MAX_ROWS", 256)
+    # Coalesce concurrent embedding requests into shared forward passes
+    EMBEDDING_DYNAMIC_BATCHING: bool = os.environ.get(
+        "EMBEDDING_DYNAMIC_BATCHING", "true"
+    )
+    EMBEDDING_BATCH_MAX_SIZE: int = os.environ.get("EMBEDDING_BATCH_MAX_SIZE", 64)
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = os.environ.get(
+        "EMBEDDING_BATCH_MAX_WAIT_MS", 2.0
+    )
+    # Embedding cache: in-process LRU size (0 disables the cache) and an
+    # optional directory for the memory-mapped on-disk tier, used by one
+    # process at a time (other workers cache in memory only)
+    EMBEDDING_CACHE_MAX_BYTES: int = os.environ.get(
+        "EMBEDDING_CACHE_MAX_BYTES", 256 * 1024 * 1024
+    )
+    EMBEDDING_CACHE_PATH: Optional[str] = os.environ.get("EMBEDDING_CACHE_PATH")
+    EMBEDDING_CACHE_DISK_ROWS: int = os.environ.get(
+        "EMBEDDING_CACHE_DISK_ROWS", 1_000_000
+    )
+    # BM25 sparse vectors for hybrid search: term frequency saturation, length
+    # normalization and the expected average document length in tokens
+    SPARSE_BM25_K1: float = os.environ.get("SPARSE_BM25_K1", 1.2)
+    SPARSE_BM25_B: float = os.environ.get("SPARSE_BM25_B", 0.75)
+    SPARSE_AVG_DOC_TOKENS: float = os.environ.get("SPARSE_AVG_DOC_TOKENS", 256)
+    # Chunking of long text documents, in tokens
+    CHUNK_MAX_TOKENS: int = os.environ.get("CHUNK_MAX_TOKENS", 256)
+    CHUNK_OVERLAP: int = os.environ.get("CHUNK_OVERLAP", 32)
+
+    # Request deadline in seconds, unless the client sends another (at most
+    # the maximum) in REQUEST_TIMEOUT_HEADER. Qdrant and embedding calls are
+    # bounded by what is left of it, and a request past it is answered with
+    # 504. 0 disables the default deadline
+    REQUEST_TIMEOUT_SECONDS: float = os.environ.get("REQUEST_TIMEOUT_SECONDS", 60)
+    REQUEST_TIMEOUT_MAX_SECONDS: float = os.environ.get(
+        "REQUEST_TIMEOUT_MAX_SECONDS", 600
+    )
+    REQUEST_TIMEOUT_HEADER: str = os.environ.get(
+        "REQUEST_TIMEOUT_HEADER", "X-Request-Timeout"
+    )
+    # Adaptive limit on /qdrant requests in flight per process; requests over
+    # it are shed with 503. It starts at the initial limit and moves between
+    # the minimum and maximum as latency rises above TOLERANCE times its
+    # long-run average or falls back
+    CONCURRENCY_LIMIT_ENABLED: bool = os.environ.get(
+        "CONCURRENCY_LIMIT_ENABLED", "true"
+    )
+    CONCURRENCY_LIMIT_INITIAL: int = os.environ.get("CONCURRENCY_LIMIT_INITIAL", 100)
+    CONCURRENCY_LIMIT_MIN: int = os.environ.get("CONCURRENCY_LIMIT_MIN", 8)
+    CONCURRENCY_LIMIT_MAX: int = os.environ.get("CONCURRENCY_LIMIT_MAX", 1000)
+    CONCURRENCY_LIMIT_TOLERANCE: float = os.environ.get(
+        "CONCURRENCY_LIMIT_TOLERANCE", 1.5
+    )
+
+    # Search result cache, invalidated by writes to the collection
+    SEARCH_CACHE_ENABLED: bool = os.environ.get("SEARCH_CACHE_ENABLED", "true")
+    SEARCH_CACHE_MAX_ENTRIES: int = os.environ.get("SEARCH_CACHE_MAX_ENTRIES", 10_000)
+    SEARCH_CACHE_TTL_SECONDS: float = os.environ.get("SEARCH_CACHE_TTL_SECONDS", 60)
+    # Results are not cached for this long after a write sent with wait=False,
+    # which Qdrant may not have applied yet
+    SEARCH_CACHE_SETTLE_SECONDS: float = os.environ.get(
+        "SEARCH_CACHE_SETTLE_SECONDS", 5
+    )
+
+    # Prometheus metrics on /metrics
+    METRICS_ENABLED: bool = os.environ.get("METRICS_ENABLED", "true")
+
+    # Request profiling, saved to a ring of files and served on /admin/profiles
+    PROFILING_ENABLED: bool = os.environ.get("PROFILING_ENABLED", "false")
+    PROFILING_SAMPLE_RATE: float = os.environ.get("PROFILING_SAMPLE_RATE", "0.01")
+    PROFILING_SLOW_MS: float = os.environ.get("PROFILING_SLOW_MS", "500")
+    PROFILING_DIR: str = os.environ.get("PROFILING_DIR", "/tmp/rag-profiles")
+    PROFILING_MAX_PROFILES: int = os.environ.get("PROFILING_MAX_PROFILES", "100")
 
     # Application configurations
     APP_NAME: str = os.environ["APP_NAME"]
@@ -0,0 +1,117 @@
+from contextvars import ContextVar
+from typing import Awaitable, Optional, TypeVar
+import asyncio
+import time
+from app.core.metrics import DEADLINES_EXCEEDED
+
+T = TypeVar("T")
+
+# time.monotonic() by which the request being handled must be answered
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request deadline passed before an operation completed."""
+
+
+def remaining() -> Optional[float]:
+    """Seconds left until the current request's deadline, None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def set_deadline(seconds: Optional[float]):
+    """Starts a deadline ``seconds`` from now for the current context.
+
+    Returns:
+        Token: Restores the previous deadline when passed to reset_deadline.
+    """
+    return _deadline.set(None if seconds is None else time.monotonic() + seconds)
+
+
+def reset_deadline(token) -> None:
+    _deadline.reset(token)
+
+
+async def within_deadline(
+    awaitable: Awaitable[T], operation: str, shield: bool = False
+) -> T:
+    """Awaits an operation for at most the time left before the deadline.
+
+    Args:
+        awaitable: The operation.
+        operation (str): Its name, for the error and the metric.
+        shield (bool): Let the operation run to completion in the background
+            when the deadline passes, for work that must not be cancelled
+            halfway (e.g. an inference batch shared with other requests).
+
+    Raises:
+        DeadlineExceeded: The deadline passed first, or had already passed.
+    """
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        DEADLINES_EXCEEDED.labels(operation).inc()
+        raise DeadlineExceeded(f"Deadline exceeded before {operation}")
+    if shield:
+        awaitable = asyncio.shield(awaitable)
+    try:
+        return await asyncio.wait_for(awaitable, left)
+    except TimeoutError:
+        DEADLINES_EXCEEDED.labels(operation).inc()
+        raise DeadlineExceeded(f"Deadline exceeded during {operation}") from None
+
+
+class DeadlineMiddleware:
+    """ASGI middleware giving each HTTP request a deadline.
+
+    The deadline is ``header`` seconds from the start of the request when the
+    client sends it (at most ``max_seconds``), else ``default_seconds``; 0
+    means none. Qdrant and embedding calls made while handling the request
+    are bounded by what is left of it (see within_deadline), and raise
+    DeadlineExceeded, answered with 504, once it passes. A deadline the
+    client made shorter than the default is marked in the scope as
+    ``deadline_shortened``, so its 504s are not taken as a sign of overload.
+    """
+
+    def __init__(
+        self,
+        app,
+        default_seconds: float = 60,
+        max_seconds: float = 600,
+        header: str = "x-request-timeout",
+    ):
+        self.app = app
+        self.default_seconds = default_seconds
+        self.max_seconds = max_seconds
+        self.header = header.lower().encode("latin-1")
+
+    def seconds(self, scope) -> Optional[float]:
+        seconds = self.default_seconds
+        for name, value in scope["headers"]:
+            if name == self.header:
+                try:
+                    # Clients may shorten or extend the deadline, not remove it
+                    seconds = float(value) if float(value) > 0 else seconds
+                except ValueError:
+                    pass
+                break
+        if seconds <= 0:
+            return None
+        return min(seconds, self.max_seconds) if self.max_seconds else seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        seconds = self.seconds(scope)
+        scope["deadline_shortened"] = seconds is not None and (
+            self.default_seconds <= 0 or seconds < self.default_seconds
+        )
+        token = set_deadline(seconds)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            reset_deadline(token)
@@ -0,0 +1,183 @@
+from typing import Dict, List
+import math
+import time
+from fastapi.responses import JSONResponse
+from app.core.metrics import CONCURRENCY_LIMIT, REQUESTS_SHED
+
+
+class AdaptiveLimiter:
+    """A concurrency limit that adapts to latency, in the style of Gradient2.
+
+    Two moving averages of request latency are kept: a short one tracking
+    current latency, and a long one standing for the latency the service has
+    when it is not overloaded. Requests of different kinds (e.g. streamed
+    ingests and point reads) take very different times, so each ``kind``
+    passed to release has its own pair of averages. While the short average
+    stays within
+    ``tolerance`` times the long one the limit grows (by about its square
+    root per request, smoothed); once queueing shows up as a rising short
+    average the limit shrinks in proportion to the ratio. Requests that
+    timed out or failed from overload back the limit off multiplicatively
+    (the AIMD decrease), so it collapses fast and recovers gradually.
+
+    Args:
+        initial_limit (int): Requests allowed in flight at first.
+        min_limit (int): The limit never goes below this.
+        max_limit (int): The limit never goes above this.
+        tolerance (float): Latency growth over the long average tolerated
+            before the limit shrinks.
+        smoothing (float): Weight of each new limit estimate.
+        backoff (float): Factor applied to the limit on a dropped request.
+        long_window (int): Requests averaged by the long latency average.
+        short_window (int): Requests averaged by the short latency average.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 100,
+        min_limit: int = 8,
+        max_limit: int = 1000,
+        tolerance: float = 1.5,
+        smoothing: float = 0.2,
+        backoff: float = 0.9,
+        long_window: int = 600,
+        short_window: int = 10,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.backoff = backoff
+        self._long_alpha = 2 / (long_window + 1)
+        self._short_alpha = 2 / (short_window + 1)
+        # Kind of request -> [short average, long average] of its latency
+        self.latency: Dict[str, List[float]] = {}
+        self.in_flight = 0
+        self.shed = 0
+        CONCURRENCY_LIMIT.set(self.limit)
+
+    def try_acquire(self) -> bool:
+        """Takes a slot if one is free under the limit."""
+        if self.in_flight >= int(self.limit):
+            self.shed += 1
+            REQUESTS_SHED.inc()
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(
+        self, latency: float, dropped: bool = False, kind: str = "default"
+    ) -> None:
+        """Frees a slot and adapts the limit to the request's outcome.
+
+        Args:
+            latency (float): Seconds the request took.
+            dropped (bool): It timed out or failed from overload.
+            kind (str): The kind of request, whose latency averages are used.
+        """
+        in_flight = self.in_flight
+        self.in_flight -= 1
+        if dropped:
+            self._set_limit(self.limit * self.backoff)
+            return
+        averages = self.latency.get(kind)
+        if averages is None:
+            self.latency[kind] = [latency, latency]
+            return
+        averages[0] += self._short_alpha * (latency - averages[0])
+        averages[1] += self._long_alpha * (latency - averages[1])
+        # After a lasting latency drop, let the long average catch up faster
+        if averages[1] > 2 * averages[0]:
+            averages[1] *= 0.95
+        short_latency, long_latency = averages
+        gradient = max(
+            0.5,
+            min(1.0, self.tolerance * long_latency / short_latency),
+        )
+        estimate = self.limit * gradient + math.sqrt(self.limit)
+        # Only grow a limit that is being used
+        if estimate > self.limit and in_flight < self.limit / 2:
+            return
+        self._set_limit((1 - self.smoothing) * self.limit + self.smoothing * estimate)
+
+    def _set_limit(self, limit: float) -> None:
+        self.limit = min(max(limit, self.min_limit), self.max_limit)
+        CONCURRENCY_LIMIT.set(self.limit)
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "shed": self.shed,
+            "latency_ms": {
+                kind: {
+                    "short": round(short * 1000, 2),
+                    "long": round(long * 1000, 2),
+                }
+                for kind, (short, long) in self.latency.items()
+            },
+        }
+
+
+class ConcurrencyLimitMiddleware:
+    """ASGI middleware shedding requests beyond an AdaptiveLimiter's limit.
+
+    Requests over the limit are answered at once with 503 and Retry-After,
+    rather than queueing until latency collapses. Only paths starting with
+    one of ``prefixes`` are limited, so health checks and metrics always
+    answer. Latency is measured to the start of the response, so a long
+    streamed body holds its slot without skewing the latency averages.
+    Streamed ingests (paths ending in one of ``ingest_suffixes``) read their
+    whole body before answering, and are averaged apart from other requests.
+
+    503 responses from the application count as dropped, and so do 504s,
+    unless the client had shortened the deadline (see DeadlineMiddleware):
+    a client asking for an answer in a millisecond says nothing about load.
+    """
+
+    def __init__(
+        self,
+        app,
+        limiter: AdaptiveLimiter,
+        prefixes=("/qdrant",),
+        ingest_suffixes=("/stream",),
+    ):
+        self.app = app
+        self.limiter = limiter
+        self.prefixes = tuple(prefixes)
+        self.ingest_suffixes = tuple(ingest_suffixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefixes):
+            return await self.app(scope, receive, send)
+        if not self.limiter.try_acquire():
+            response = JSONResponse(
+                {"detail": "Server overloaded, retry later"},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
+            return await response(scope, receive, send)
+        start = time.perf_counter()
+        latency = None
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal latency, status
+            if message["type"] == "http.response.start":
+                latency = time.perf_counter() - start
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if latency is None:
+                latency = time.perf_counter() - start
+            dropped = status == 503 or (
+                status == 504 and not scope.get("deadline_shortened", False)
+            )
+            kind = (
+                "ingest" if scope["path"].endswith(self.ingest_suffixes) else "default"
+            )
+            self.limiter.release(latency, dropped=dropped, kind=kind)
@@ -0,0 +1,167 @@
+import functools
+import inspect
+import time
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram
+from prometheus_client import generate_latest
+from app.core.profiling import record_stage
+
+# Latency buckets from 1ms to 10s, in seconds
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+REQUEST_LATENCY = Histogram(
+    "rag_request_duration_seconds",
+    "HTTP request latency, until the last byte of the response is sent",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "rag_requests_in_flight", "HTTP requests currently being handled"
+)
+RESPONSES = Counter(
+    "rag_responses_total",
+    "HTTP responses by status code",
+    ["method", "route", "status"],
+)
+QDRANT_LATENCY = Histogram(
+    "rag_qdrant_call_duration_seconds",
+    "Latency of Qdrant client calls",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+QDRANT_ERRORS = Counter(
+    "rag_qdrant_call_errors_total", "Qdrant client calls that raised", ["operation"]
+)
+EMBEDDING_LATENCY = Histogram(
+    "rag_embedding_forward_duration_seconds",
+    "Latency of one TextEncoder forward pass",
+    buckets=LATENCY_BUCKETS,
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "rag_embedding_batch_size",
+    "Texts per TextEncoder forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+
+WRITE_BUFFER_DOCUMENTS = Gauge(
+    "rag_write_buffer_documents",
+    "Documents accepted by the write buffer and not yet written to Qdrant",
+)
+WRITE_BUFFER_REJECTED = Counter(
+    "rag_write_buffer_rejected_total",
+    "Documents rejected because the write buffer was full",
+)
+WRITE_BUFFER_FLUSH_LAG = Histogram(
+    "rag_write_buffer_flush_lag_seconds",
+    "Time from accepting a buffered write to Qdrant acknowledging it",
+    buckets=LATENCY_BUCKETS,
+)
+
+DEADLINES_EXCEEDED = Counter(
+    "rag_deadlines_exceeded_total",
+    "Operations abandoned because the request deadline passed",
+    ["operation"],
+)
+HEDGED_CALLS = Counter(
+    "rag_qdrant_hedged_calls_total",
+    "Qdrant reads sent a second time, by the attempt that answered first",
+    ["operation", "winner"],
+)
+CONCURRENCY_LIMIT = Gauge(
+    "rag_concurrency_limit", "Current adaptive limit on requests in flight"
+)
+REQUESTS_SHED = Counter(
+    "rag_requests_shed_total",
+    "Requests rejected with 503 because the concurrency limit was reached",
+)
+
+
+def metrics_response():
+    """Renders every metric in the Prometheus text format.
+
+    Returns:
+        tuple: The body and its content type.
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, in-flight requests and status codes.
+
+    Routes are labelled with their path template (e.g.
+    ``/qdrant/{collection_name}/search``) to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            REQUEST_LATENCY.labels(scope["method"], path).observe(elapsed)
+            RESPONSES.labels(scope["method"], path, status).inc()
+
+
+class InstrumentedClient:
+    """Wraps a Qdrant client so every coroutine method call is timed.
+
+    Calls are labelled with the client method name (upsert, retrieve,
+    query_points, delete, ...) and counted in the "qdrant" profiling stage.
+    Other attributes are passed through.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if not inspect.iscoroutinefunction(attribute):
+            return attribute
+        latency = QDRANT_LATENCY.labels(name)
+
+        @functools.wraps(attribute)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await attribute(*args, **kwargs)
+            except Exception:
+                QDRANT_ERRORS.labels(name).inc()
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                latency.observe(elapsed)
+                record_stage("qdrant", elapsed)
+
+        # Cache the wrapper so later calls skip __getattr__
+        setattr(self, name, timed)
+        return timed
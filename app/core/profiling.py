@@ -0,0 +1,178 @@
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+import asyncio
+import cProfile
+import io
+import itertools
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import time
+
+logger = logging.getLogger("uvicorn")
+
+# Seconds spent per stage by the request being handled, when it is profiled
+_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("stages", default=None)
+# Profile ids: milliseconds since the epoch, process id and a counter
+PROFILE_ID = re.compile(r"^\d+-\d+-\d+$")
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Adds time to a stage of the current request; a no-op when not profiling."""
+    stages = _stages.get()
+    if stages is not None:
+        stages[name] = stages.get(name, 0.0) + seconds
+
+
+class ProfileStore:
+    """A bounded ring of profile files on disk.
+
+    Each profile is a JSON summary, plus a cProfile ``.prof`` file (loadable
+    with pstats or snakeviz) when the request was sampled. The ring is the
+    directory itself, so profiles left by earlier runs or saved by other
+    worker processes are listed and pruned like this process's own; ids
+    start with the time in milliseconds and carry the process id, so they
+    sort by age and never collide. The oldest profiles are deleted once
+    ``max_profiles`` is exceeded.
+    """
+
+    def __init__(self, directory: str, max_profiles: int = 100):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self._counter = itertools.count(1)
+        os.makedirs(directory, exist_ok=True)
+        self._prune()
+
+    def path(self, profile_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}{suffix}")
+
+    def ids(self) -> List[str]:
+        """The ids of the stored profiles, oldest first."""
+        return sorted(
+            name[: -len(".json")]
+            for name in os.listdir(self.directory)
+            if name.endswith(".json") and PROFILE_ID.match(name[: -len(".json")])
+        )
+
+    def save(self, summary: Dict, profiler: Optional[cProfile.Profile]) -> str:
+        profile_id = (
+            f"{int(time.time() * 1000)}-{os.getpid()}-{next(self._counter):06d}"
+        )
+        summary = {"id": profile_id, **summary}
+        if profiler is not None:
+            profiler.dump_stats(self.path(profile_id, ".prof"))
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(40)
+            summary["cprofile"] = text.getvalue()
+        # Written aside and renamed, so other workers never read half a file
+        partial = self.path(profile_id, ".json.partial")
+        with open(partial, "w") as f:
+            json.dump(summary, f)
+        os.replace(partial, self.path(profile_id, ".json"))
+        self._prune()
+        return profile_id
+
+    def _prune(self) -> None:
+        ids = self.ids()
+        for old_id in ids[: max(len(ids) - self.max_profiles, 0)]:
+            for suffix in (".json", ".prof"):
+                try:
+                    os.remove(self.path(old_id, suffix))
+                except FileNotFoundError:
+                    # Not sampled, or pruned by another worker
+                    pass
+
+    def list(self) -> List[Dict]:
+        profiles = []
+        for profile_id in reversed(self.ids()):
+            summary = self.get(profile_id)
+            if summary is not None:
+                summary.pop("cprofile", None)
+                profiles.append(summary)
+        return profiles
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        if not PROFILE_ID.match(profile_id):
+            return None
+        try:
+            with open(self.path(profile_id, ".json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware capturing per-request profiles.
+
+    Every request gets per-stage timings (Qdrant calls, embedding,
+    serialization, and the remainder: routing, validation and endpoint
+    code). A ``sample_rate`` fraction of requests also runs under cProfile;
+    cProfile sees the whole event loop thread, so only one request is
+    profiled at a time. Requests that were sampled or took longer than
+    ``slow_ms`` are saved to the store.
+
+    The middleware is only installed when profiling is enabled, so it costs
+    nothing otherwise.
+    """
+
+    def __init__(self, app, store: ProfileStore, sample_rate: float, slow_ms: float):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.slow = slow_ms / 1000
+        self._profiling = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        profiler = None
+        if not self._profiling and random.random() < self.sample_rate:
+            self._profiling = True
+            profiler = cProfile.Profile()
+        stages: Dict[str, float] = {}
+        token = _stages.set(stages)
+        start = time.perf_counter()
+        try:
+            if profiler is not None:
+                profiler.enable()
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+            elapsed = time.perf_counter() - start
+            _stages.reset(token)
+            if profiler is not None or elapsed >= self.slow:
+                await self._save(scope, status, elapsed, stages, profiler)
+
+    async def _save(self, scope, status, elapsed, stages, profiler) -> None:
+        route = scope.get("route")
+        measured = sum(stages.values())
+        summary = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": route.path if route is not None else None,
+            "status": status,
+            "duration_ms": elapsed * 1000,
+            "sampled": profiler is not None,
+            "stages_ms": {
+                **{name: seconds * 1000 for name, seconds in stages.items()},
+                "validation_and_other": max(elapsed - measured, 0.0) * 1000,
+            },
+        }
+        try:
+            # Off the event loop: dumping and writing the profile is file I/O
+            await asyncio.to_thread(self.store.save, summary, profiler)
+        except OSError as e:
+            logger.warning(f"Could not save request profile: {e}")
@@ -1,12 +1,51 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import asyncio
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.endpoints import vector_api
+from app.api.endpoints import admin, vector_api
 from app.core.config import settings
+from app.core.deadlines import DeadlineExceeded, DeadlineMiddleware
+from app.core.limiter import AdaptiveLimiter, ConcurrencyLimitMiddleware
+from app.core.metrics import MetricsMiddleware, metrics_response
+from app.core.profiling import ProfileStore, ProfilingMiddleware
+from app.services.embedding import EmbeddingService
+from app.services.qdrant import QdrantService
+from app.services.write_buffer import WriteBuffer
+
+# Load the model weights now, e.g. in a preloading server's master process,
+# so forked workers share them instead of each loading a copy
+if settings.EMBEDDING_PRELOAD == "import":
+    EmbeddingService.preload()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One QdrantService (and connection pool) shared by every request
+    app.state.qdrant_service = QdrantService()
+    app.state.embedding_service = EmbeddingService()
+    app.state.write_buffer = WriteBuffer(app.state.qdrant_service)
+    await app.state.write_buffer.start()
+    # Warm the model in the background so liveness answers while it loads
+    warm_up = None
+    if settings.EMBEDDING_PRELOAD != "lazy":
+        warm_up = asyncio.create_task(app.state.embedding_service.warm_up())
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    if warm_up is not None:
+        await warm_up
+    await app.state.embedding_service.close()
+    # Buffered writes are flushed before the Qdrant connections close
+    await app.state.write_buffer.close()
+    await app.state.qdrant_service.close()
+
 
 app = FastAPI(
     title=settings.APP_NAME,
     description=settings.APP_DESCRIPTION,
     version=settings.APP_VERSION,
+    lifespan=lifespan,
 )
 
 # CORS middleware configuration
@@ -18,6 +57,50 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Deadline of each request, bounding the Qdrant and embedding calls it makes
+app.add_middleware(
+    DeadlineMiddleware,
+    default_seconds=settings.REQUEST_TIMEOUT_SECONDS,
+    max_seconds=settings.REQUEST_TIMEOUT_MAX_SECONDS,
+    header=settings.REQUEST_TIMEOUT_HEADER,
+)
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+# Shed load with 503 once latency shows the service is saturated
+app.state.concurrency_limiter = None
+if settings.CONCURRENCY_LIMIT_ENABLED:
+    app.state.concurrency_limiter = AdaptiveLimiter(
+        initial_limit=settings.CONCURRENCY_LIMIT_INITIAL,
+        min_limit=settings.CONCURRENCY_LIMIT_MIN,
+        max_limit=settings.CONCURRENCY_LIMIT_MAX,
+        tolerance=settings.CONCURRENCY_LIMIT_TOLERANCE,
+    )
+    app.add_middleware(
+        ConcurrencyLimitMiddleware, limiter=app.state.concurrency_limiter
+    )
+
+# Request latency, in-flight and status code metrics
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Sampled and slow request profiles, only installed when enabled
+if settings.PROFILING_ENABLED:
+    app.state.profile_store = ProfileStore(
+        settings.PROFILING_DIR, max_profiles=settings.PROFILING_MAX_PROFILES
+    )
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=app.state.profile_store,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        slow_ms=settings.PROFILING_SLOW_MS,
+    )
+    app.include_router(admin.router, prefix="/admin", tags=["admin"])
+
 # Include router from vector_api
 app.include_router(vector_api.router, prefix="/qdrant", tags=["qdrant"])
 
@@ -27,6 +110,46 @@ async def root():
     return {"message": "Welcome to the Qdrant FastAPI application!"}
 
 
+@app.get("/health/live", include_in_schema=False)
+async def liveness():
+    return {"status": "alive"}
+
+
+@app.get("/health/ready", include_in_schema=False)
+async def readiness():
+    """Ready once the lifespan has started and, unless the model is loaded
+    lazily, the embedding model is warm."""
+    embedding = getattr(app.state, "embedding_service", None)
+    model = embedding.status if embedding is not None else "not_loaded"
+    ready = getattr(app.state, "ready", False) and (
+        settings.EMBEDDING_PRELOAD == "lazy" or model == "warm"
+    )
+    processes = None
+    if embedding is not None and embedding.pool is not None:
+        # Once started, every embedding process must be alive
+        processes = embedding.pool.health()
+        ready = ready and (processes["healthy"] or not processes["started"])
+    return JSONResponse(
+        {
+            "status": "ready" if ready else "not_ready",
+            "models": {"embedding": model},
+            "embedding_processes": processes,
+            "concurrency": (
+                app.state.concurrency_limiter.stats()
+                if app.state.concurrency_limiter is not None
+                else None
+            ),
+        },
+        status_code=200 if ready else 503,
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = metrics_response()
+    return Response(content=body, media_type=content_type)
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -1,5 +1,24 @@
-from typing import List, Optional, Union
-from pydantic import BaseModel, Field
+from typing import Annotated, List, Literal, Optional, Union
+import base64
+import binascii
+import numpy as np
+from pydantic import BaseModel, BeforeValidator, Field, field_validator
+
+
+def decode_vector(value):
+    """Accepts a vector as a list of floats, or as base64 of little-endian float32."""
+    if isinstance(value, (str, bytes)):
+        try:
+            raw = base64.b64decode(value, validate=True)
+        except binascii.Error as e:
+            raise ValueError(f"Invalid base64 vector: {e}")
+        if len(raw) % 4:
+            raise ValueError("A base64 vector must hold whole float32 values")
+        return np.frombuffer(raw, dtype="<f4").tolist()
+    return value
+
+
+Vector = Annotated[List[float], BeforeValidator(decode_vector)]
 
 
 # Schema for creating a new collection
@@ -7,13 +26,119 @@ class Collection(BaseModel):
     name: str = Field(..., description="The name of the collection")
 
 
-class CollectionCreate(Collection):
-    dimensions: str = Field(
-        default=2048, description="The dimension size. Default: 2048"
+# HNSW index parameters
+class HnswConfig(BaseModel):
+    m: Optional[int] = Field(
+        default=None, ge=0, description="Edges per node; 0 disables the index"
+    )
+    ef_construct: Optional[int] = Field(
+        default=None, gt=0, description="Beam size used while building the index"
+    )
+    on_disk: Optional[bool] = Field(
+        default=None, description="Store the index on disk instead of in RAM"
+    )
+
+
+# Vector quantization parameters
+class QuantizationConfig(BaseModel):
+    type: Literal["scalar", "product", "binary", "disabled"] = Field(
+        ..., description="The quantization method, or 'disabled' to remove it"
+    )
+    always_ram: Optional[bool] = Field(
+        default=None, description="Keep the quantized vectors in RAM"
+    )
+    quantile: Optional[float] = Field(
+        default=None,
+        gt=0.5,
+        le=1,
+        description="Scalar only: quantile used to clip outliers",
+    )
+    compression: Literal["x4", "x8", "x16", "x32", "x64"] = Field(
+        default="x16", description="Product only: the compression ratio"
+    )
+
+
+# Optimizer thresholds, in kilobytes of vectors per segment
+class OptimizerConfig(BaseModel):
+    indexing_threshold: Optional[int] = Field(
+        default=None, ge=0, description="Build the HNSW index above this size"
+    )
+    memmap_threshold: Optional[int] = Field(
+        default=None, ge=0, description="Move segments to memmap storage above this"
+    )
+    default_segment_number: Optional[int] = Field(
+        default=None, gt=0, description="Target number of segments"
+    )
+    max_optimization_threads: Optional[int] = Field(
+        default=None, ge=0, description="Threads used by the optimizer"
+    )
+
+
+# A payload field to index for fast filtered search
+class PayloadIndex(BaseModel):
+    field: str = Field(..., description="The payload field name")
+    schema_type: Literal[
+        "keyword", "integer", "float", "bool", "geo", "datetime", "text", "uuid"
+    ] = Field(default="keyword", description="The type of the field")
+
+
+# Performance settings that can be changed on an existing collection
+class CollectionUpdate(BaseModel):
+    hnsw: Optional[HnswConfig] = Field(default=None, description="HNSW parameters")
+    quantization: Optional[QuantizationConfig] = Field(
+        default=None, description="Vector quantization"
+    )
+    on_disk: Optional[bool] = Field(
+        default=None, description="Store the original vectors on disk"
+    )
+    on_disk_payload: Optional[bool] = Field(
+        default=None, description="Store payloads on disk"
+    )
+    replication_factor: Optional[int] = Field(
+        default=None, gt=0, description="Copies of each shard"
+    )
+    optimizer: Optional[OptimizerConfig] = Field(
+        default=None, description="Optimizer thresholds"
+    )
+    payload_indexes: List[PayloadIndex] = Field(
+        default=[], description="Payload fields to index"
+    )
+
+
+# First path segments of the static routes under /qdrant; a collection with
+# one of these names would be shadowed by them, or shadow them
+RESERVED_COLLECTION_NAMES = frozenset({"batch", "collections", "embedding", "jobs"})
+
+
+class CollectionCreate(CollectionUpdate, Collection):
+    dimensions: int = Field(
+        default=2048, gt=0, description="The dimension size. Default: 2048"
     )
     distance: str = Field(
         default="cosine", description="The similarity metric used. Default: cosine"
     )
+    shard_number: Optional[int] = Field(
+        default=None, gt=0, description="The number of shards"
+    )
+    sparse: bool = Field(
+        default=False,
+        description="Also hold BM25 sparse vectors, needed for hybrid search",
+    )
+
+    @field_validator("name")
+    @classmethod
+    def name_is_not_reserved(cls, name: str) -> str:
+        if name in RESERVED_COLLECTION_NAMES:
+            raise ValueError(
+                f"'{name}' is reserved by the API routes, choose another name"
+            )
+        return name
+
+
+# Schema for a sparse vector, as parallel lists of token ids and weights
+class SparseVector(BaseModel):
+    indices: List[int] = Field(..., description="The non-zero dimensions")
+    values: List[float] = Field(..., description="The weight of each dimension")
 
 
 # Schema for a single document to be uploaded
@@ -21,8 +146,13 @@ class Document(BaseModel):
     id: Optional[Union[int, str]] = Field(
         default=None, description="The unique identifier for the document"
     )
-    vector: Optional[List[float]] = Field(
-        default=None, description="The encoded vector for the document"
+    vector: Optional[Vector] = Field(
+        default=None,
+        description="The encoded vector for the document, as floats or base64 float32",
+    )
+    sparse_vector: Optional[SparseVector] = Field(
+        default=None,
+        description="BM25 term weights, for collections created with sparse=True",
     )
     metadata: Optional[dict] = Field(
         default=None, description="Optional metadata for the document"
@@ -37,6 +167,210 @@ class DocumentBatchUpload(BaseModel):
     documents: List[Document] = Field(
         ..., description="A list of documents to be uploaded"
     )
+    chunk_size: Optional[int] = Field(
+        default=None,
+        gt=0,
+        description="Documents per upsert call. Default: INGEST_CHUNK_SIZE",
+    )
+    wait: bool = Field(
+        default=True,
+        description="Wait for Qdrant to apply each chunk before responding",
+    )
+
+
+# Schema for selecting many documents by id
+class DocumentIdList(BaseModel):
+    ids: List[Union[int, str]] = Field(
+        ..., min_length=1, description="The identifiers of the documents"
+    )
+
+
+# Schema for retrieving many documents by id
+class DocumentRetrieve(DocumentIdList):
+    with_payload: Union[bool, List[str]] = Field(
+        default=True, description="Return the payloads, or only these payload keys"
+    )
+    with_vectors: bool = Field(default=False, description="Return the vectors")
+
+
+# Schema for selecting documents by payload
+class PayloadFilter(BaseModel):
+    filter: dict = Field(
+        ..., description="A Qdrant payload filter (must/should/must_not)"
+    )
+
+
+# Schema for counting documents
+class DocumentCount(BaseModel):
+    filter: Optional[dict] = Field(
+        default=None, description="Only count documents matching this filter"
+    )
+    exact: bool = Field(
+        default=True, description="Count exactly rather than estimate from the index"
+    )
+
+
+# Schema for exporting a collection
+class ExportQuery(BaseModel):
+    filter: Optional[dict] = Field(
+        default=None, description="Only export documents matching this filter"
+    )
+    with_payload: bool = Field(default=True, description="Export the payloads")
+    with_vectors: bool = Field(default=True, description="Export the vectors")
+    batch_size: int = Field(
+        default=256, gt=0, le=10_000, description="Documents fetched per scroll call"
+    )
+    offset: Optional[Union[int, str]] = Field(
+        default=None,
+        description="Start from this document id (inclusive), to resume an export",
+    )
+    format: Literal["ndjson", "binary"] = Field(
+        default="ndjson", description="The export format. Default: ndjson"
+    )
+
+
+# Options shared by vector and text similarity searches
+class SearchOptions(BaseModel):
+    top_k: int = Field(
+        default=10, gt=0, description="The number of results to return. Default: 10"
+    )
+    offset: int = Field(
+        default=0, ge=0, description="The number of results to skip, for pagination"
+    )
+    score_threshold: Optional[float] = Field(
+        default=None, description="Only return results scoring better than this"
+    )
+    filter: Optional[dict] = Field(
+        default=None, description="A Qdrant payload filter (must/should/must_not)"
+    )
+    with_payload: bool = Field(default=True, description="Return the payloads")
+    with_vectors: bool = Field(default=False, description="Return the vectors")
+    hnsw_ef: Optional[int] = Field(
+        default=None,
+        gt=0,
+        description="HNSW search beam size; higher is more accurate but slower",
+    )
+    exact: bool = Field(
+        default=False, description="Bypass the index and do an exact search"
+    )
+
+
+# Schema for switching the search result cache of a collection
+class SearchCacheConfig(BaseModel):
+    enabled: bool = Field(..., description="Cache search results for the collection")
+
+
+# Schema for a plain text document, embedded server-side
+class TextDocument(BaseModel):
+    id: Union[int, str] = Field(
+        ..., description="The unique identifier for the document"
+    )
+    text: str = Field(..., description="The plain text of the document")
+    metadata: Optional[dict] = Field(
+        default=None, description="Optional metadata for the document"
+    )
+
+
+# Schema for uploading plain text documents
+class TextDocumentBatch(BaseModel):
+    documents: List[TextDocument] = Field(
+        ..., description="A list of text documents to be embedded and uploaded"
+    )
+    sparse: bool = Field(
+        default=False,
+        description="Also store BM25 sparse vectors; the collection must be sparse",
+    )
+    chunk_size: Optional[int] = Field(
+        default=None,
+        gt=0,
+        description="Documents per upsert call. Default: INGEST_CHUNK_SIZE",
+    )
+    wait: bool = Field(
+        default=True,
+        description="Wait for Qdrant to apply each chunk before responding",
+    )
+
+
+# Schema for a long plain text document, split into chunks before embedding
+class ChunkedTextDocument(TextDocument):
+    max_tokens: Optional[int] = Field(
+        default=None, gt=0, description="Tokens per chunk. Default: CHUNK_MAX_TOKENS"
+    )
+    overlap: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Tokens shared by consecutive chunks. Default: CHUNK_OVERLAP",
+    )
+    sentence_aware: bool = Field(
+        default=True, description="Prefer ending chunks at sentence boundaries"
+    )
+    sparse: bool = Field(
+        default=False,
+        description="Also store BM25 sparse vectors; the collection must be sparse",
+    )
+    wait: bool = Field(
+        default=True,
+        description="Wait for Qdrant to apply each chunk before responding",
+    )
+
+
+# Schema for a vector similarity search
+class SearchQuery(SearchOptions):
+    vector: Vector = Field(
+        ..., description="The query vector, as floats or base64 float32"
+    )
+
+
+# Schema for a similarity search with a plain text query
+class TextSearchQuery(SearchOptions):
+    text: str = Field(..., description="The query text, embedded server-side")
+
+
+# Schema for a text search over both dense and BM25 sparse vectors
+class HybridSearchQuery(TextSearchQuery):
+    prefetch_limit: Optional[int] = Field(
+        default=None,
+        gt=0,
+        description=(
+            "Candidates fetched by each of the dense and sparse searches before "
+            "fusion. Default: 4 * (top_k + offset)"
+        ),
+    )
+
+
+# Schema for a text search post-processed for a RAG context window
+class RetrieveQuery(TextSearchQuery):
+    fetch_k: Optional[int] = Field(
+        default=None,
+        gt=0,
+        le=1000,
+        description="Candidates fetched before diversification. Default: 4 * top_k",
+    )
+    mmr_lambda: float = Field(
+        default=0.5,
+        ge=0,
+        le=1,
+        description="Maximal marginal relevance trade-off: 1 ranks by relevance "
+        "only, 0 by diversity only",
+    )
+    duplicate_threshold: Optional[float] = Field(
+        default=0.95,
+        description="Drop candidates at least this cosine-similar to a kept one. "
+        "null keeps near-duplicates",
+    )
+    max_tokens: Optional[int] = Field(
+        default=None,
+        gt=0,
+        description="Token budget for the texts of the returned points",
+    )
+    text_field: str = Field(
+        default="text", description="The payload field holding each point's text"
+    )
+
+
+# Schema for running several searches in one call
+class SearchBatchQuery(BaseModel):
+    searches: List[SearchQuery] = Field(..., description="The searches to run")
 
 
 # Response model for a successful operation
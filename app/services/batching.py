@@ -0,0 +1,144 @@
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import time
+import numpy as np
+
+logger = logging.getLogger("uvicorn")
+
+
+class MicroBatcher:
+    """Coalesces concurrent embedding requests into shared forward passes.
+
+    Each call to ``submit`` queues its texts and waits. A worker takes the
+    oldest request, keeps collecting queued requests until it holds
+    ``max_batch_size`` texts or ``max_wait_ms`` has passed, runs ``embed``
+    once on all of them and hands every caller back its own rows.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[List[str]], Awaitable[np.ndarray]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+        workers: int = 1,
+    ):
+        self.embed = embed
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._batches = 0
+        self._requests = 0
+        self._texts = 0
+        self._histogram: Dict[int, int] = {}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    async def submit(self, texts: List[str]) -> np.ndarray:
+        """Embeds texts as part of the next batch.
+
+        Returns:
+            np.ndarray: One embedding row per text, in order.
+        """
+        if self._queue is None:
+            self._start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((texts, future, time.perf_counter()))
+        return await future
+
+    def _start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _collect(self) -> List:
+        """Waits for a request, then gathers more until the batch is full."""
+        loop = asyncio.get_running_loop()
+        items = [await self._queue.get()]
+        size = len(items[0][0])
+        deadline = loop.time() + self.max_wait
+        while size < self.max_batch_size:
+            if self._queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self._queue.get_nowait()
+            items.append(item)
+            size += len(item[0])
+        return items
+
+    async def _worker(self) -> None:
+        while True:
+            items = await self._collect()
+            texts = [text for item in items for text in item[0]]
+            self._record(items, len(texts))
+            try:
+                vectors = await self.embed(texts)
+            except asyncio.CancelledError:
+                for _, future, _ in items:
+                    future.cancel()
+                raise
+            except Exception as e:
+                logger.warning(f"Could not embed batch of {len(texts)} texts: {e}")
+                for _, future, _ in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            start = 0
+            for item_texts, future, _ in items:
+                if not future.done():
+                    future.set_result(vectors[start : start + len(item_texts)])
+                start += len(item_texts)
+
+    def _record(self, items: List, size: int) -> None:
+        now = time.perf_counter()
+        for _, _, queued_at in items:
+            wait = now - queued_at
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+        # Histogram buckets are powers of two: 1, 2, 4, ... texts per batch
+        bucket = 1 << max(size - 1, 0).bit_length()
+        self._histogram[bucket] = self._histogram.get(bucket, 0) + 1
+        self._batches += 1
+        self._texts += size
+        self._requests += len(items)
+
+    def stats(self) -> Dict:
+        """Reports queue depth, batch sizes and time spent waiting in the queue.
+
+        Returns:
+            dict: The current batching statistics.
+        """
+        requests = self._requests
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self._batches,
+            "requests": requests,
+            "texts": self._texts,
+            "mean_batch_size": self._texts / self._batches if self._batches else 0,
+            "batch_size_histogram": {
+                f"<={k}": v for k, v in sorted(self._histogram.items())
+            },
+            "mean_wait_ms": self._wait_total / requests * 1000 if requests else 0,
+            "max_wait_observed_ms": self._wait_max * 1000,
+        }
+
+    async def close(self) -> None:
+        """Stops the workers, failing any request still waiting in the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        while self._queue is not None and not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.cancel()
+        self._queue = None
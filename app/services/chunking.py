@@ -0,0 +1,151 @@
+from typing import AsyncIterator, Dict, Iterator, List, Tuple
+import asyncio
+import uuid
+from app.models.models import Document
+
+# Characters that end a sentence; chunks prefer to end right after one
+SENTENCE_ENDINGS = ".!?"
+# Namespace for the ids of chunk points, derived from the parent id and index
+CHUNK_NAMESPACE = uuid.UUID("8b0c8f5e-3f5e-4a8e-9a4c-2f4c3c1b6d2a")
+
+
+def _token_spans(text: str, tokenizer, block_chars: int) -> Iterator[Tuple[int, int]]:
+    """Yields the character span of every token, tokenizing one block at a time.
+
+    Blocks end on whitespace so no word is split between two blocks.
+    """
+    position = 0
+    while position < len(text):
+        end = min(position + block_chars, len(text))
+        if end < len(text):
+            space = max(text.rfind(" ", position, end), text.rfind("\n", position, end))
+            if space > position:
+                end = space
+        encoded = tokenizer(
+            text[position:end], add_special_tokens=False, return_offsets_mapping=True
+        )
+        for start, stop in encoded["offset_mapping"]:
+            yield position + start, position + stop
+        position = end
+
+
+def iter_chunks(
+    text: str,
+    tokenizer,
+    max_tokens: int = 256,
+    overlap: int = 32,
+    sentence_aware: bool = True,
+    block_chars: int = 16_384,
+) -> Iterator[Dict]:
+    """Splits a document into overlapping token windows, lazily.
+
+    Uses the offsets of a fast tokenizer, so each chunk is an exact slice of
+    the original text. With ``sentence_aware`` a window is cut after the last
+    sentence ending in its second half, when there is one. Only one window of
+    token offsets is held in memory at a time.
+
+    Args:
+        text (str): The document text.
+        tokenizer: A fast (offset-mapping capable) Hugging Face tokenizer.
+        max_tokens (int): The maximum number of tokens per chunk.
+        overlap (int): Tokens repeated at the start of the next chunk.
+        sentence_aware (bool): Prefer cutting chunks at sentence endings.
+        block_chars (int): Characters tokenized per tokenizer call.
+
+    Yields:
+        dict: The chunk index, text, character offsets and token count.
+    """
+    if not 0 <= overlap < max_tokens // 2:
+        raise ValueError("overlap must be at least 0 and less than max_tokens / 2")
+    window: List[Tuple[int, int]] = []
+    carried = 0
+    index = 0
+
+    def chunk(spans: List[Tuple[int, int]]) -> Dict:
+        start, end = spans[0][0], spans[-1][1]
+        return {
+            "index": index,
+            "text": text[start:end],
+            "start": start,
+            "end": end,
+            "tokens": len(spans),
+        }
+
+    for span in _token_spans(text, tokenizer, block_chars):
+        window.append(span)
+        if len(window) < max_tokens:
+            continue
+        cut = len(window)
+        if sentence_aware:
+            for i in range(len(window) - 1, max_tokens // 2 - 1, -1):
+                if text[window[i][1] - 1] in SENTENCE_ENDINGS:
+                    cut = i + 1
+                    break
+        yield chunk(window[:cut])
+        index += 1
+        carried = min(overlap, cut)
+        window = window[cut - carried :]
+    if len(window) > carried:
+        yield chunk(window)
+
+
+def chunk_point_id(parent_id, index: int) -> str:
+    """The deterministic point id of a chunk, so re-ingesting overwrites it."""
+    return str(uuid.uuid5(CHUNK_NAMESPACE, f"{parent_id}:{index}"))
+
+
+def stale_chunks_filter(parent_id, count: int) -> Dict:
+    """A payload filter matching the chunks of a document past its first ``count``.
+
+    Re-ingesting a shorter version of a document overwrites its first chunks
+    by id; this matches the ones left over from the longer version.
+    """
+    return {
+        "must": [
+            {"key": "parent_id", "match": {"value": parent_id}},
+            {"key": "chunk_index", "range": {"gte": count}},
+        ]
+    }
+
+
+async def embed_chunks(
+    chunks: Iterator[Dict],
+    embedding_service,
+    parent_id,
+    metadata: Dict,
+    batch_size: int,
+    sparse: bool = False,
+) -> AsyncIterator[Document]:
+    """Embeds chunks in batches and yields one Document per chunk.
+
+    Chunks are pulled from the iterator on a worker thread, one batch at a
+    time, so tokenizing a long document does not block the event loop and
+    only one batch of chunks exists at once. With ``sparse`` each Document
+    also gets its BM25 sparse vector.
+    """
+
+    def take() -> List[Dict]:
+        return [c for _, c in zip(range(batch_size), chunks)]
+
+    while batch := await asyncio.to_thread(take):
+        texts = [c["text"] for c in batch]
+        vectors = await embedding_service.embed(texts)
+        sparse_vectors = (
+            await embedding_service.sparse_embed(texts)
+            if sparse
+            else [None] * len(batch)
+        )
+        for c, vector, sparse_vector in zip(batch, vectors, sparse_vectors):
+            yield Document(
+                id=chunk_point_id(parent_id, c["index"]),
+                vector=vector.tolist(),
+                sparse_vector=sparse_vector,
+                metadata={
+                    **metadata,
+                    "text": c["text"],
+                    "parent_id": parent_id,
+                    "chunk_index": c["index"],
+                    "start": c["start"],
+                    "end": c["end"],
+                },
+            )
@@ -0,0 +1,1156 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import bisect
+import fcntl
+import itertools
+import json
+import logging
+import math
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import httpx
+import numpy as np
+import orjson
+from qdrant_client.http import models
+from qdrant_client.http.exceptions import UnexpectedResponse
+from app.services.sparse import SPARSE_VECTOR
+
+logger = logging.getLogger("uvicorn")
+
+# Row flags
+ALIVE, DENSE, SPARSE = 1, 2, 4
+# Rows scored at once; bounds the temporary score matrix
+BLOCK_ROWS = 1 << 18
+# Bytes of (rows x dimensions) differences held at once for Manhattan
+MANHATTAN_BLOCK_BYTES = 1 << 26
+# Compaction is skipped below this many rows
+COMPACT_MIN_ROWS = 1024
+# The constant k of reciprocal rank fusion, as in Qdrant
+RRF_K = 2
+# Suffixes of the directories a compaction writes the new collection to and
+# moves the old one aside to; never loaded as collections
+COMPACTING, REPLACED = ".compacting", ".replaced"
+MISSING = object()
+
+
+def _error(status_code: int, message: str) -> UnexpectedResponse:
+    """Builds the error Qdrant would answer with, so callers handle both alike."""
+    return UnexpectedResponse(
+        status_code=status_code,
+        reason_phrase=httpx.codes.get_reason_phrase(status_code),
+        content=orjson.dumps({"status": {"error": message}}),
+        headers=httpx.Headers(),
+    )
+
+
+def _point_id(point_id):
+    """Normalizes a point id: unsigned integers, or UUIDs in canonical form."""
+    if isinstance(point_id, int) and not isinstance(point_id, bool):
+        if point_id < 0:
+            raise _error(400, f"Point id {point_id} is not an unsigned integer")
+        return point_id
+    try:
+        return str(uuid.UUID(str(point_id)))
+    except ValueError:
+        raise _error(400, f"Point id {point_id} is not an integer or a UUID")
+
+
+def _id_key(point_id) -> Tuple[bool, Any]:
+    """Sort key of a point id: integers first, then UUIDs, as Qdrant orders them."""
+    return (isinstance(point_id, str), point_id)
+
+
+def _as_list(conditions) -> list:
+    if conditions is None:
+        return []
+    return conditions if isinstance(conditions, list) else [conditions]
+
+
+def _field_values(payload: Optional[dict], key: str):
+    """The value at a dotted payload key, or MISSING."""
+    value = payload if payload is not None else MISSING
+    for part in key.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+
+def _any_value(value, predicate: Callable[[Any], bool]) -> bool:
+    """Applies a predicate to a payload value; arrays match if any element does."""
+    if value is MISSING or value is None:
+        return False
+    if isinstance(value, list):
+        return any(predicate(v) for v in value)
+    return predicate(value)
+
+
+def _match_predicate(match) -> Callable[[Any], bool]:
+    if isinstance(match, models.MatchValue):
+        return lambda v: v == match.value and type(v) is type(match.value)
+    # Objects and nested arrays cannot be looked up in a set; like Qdrant,
+    # they match neither condition
+    if isinstance(match, models.MatchAny):
+        allowed = set(match.any)
+        return lambda v: not isinstance(v, (dict, list)) and v in allowed
+    if isinstance(match, models.MatchExcept):
+        excluded = set(match.except_)
+        return lambda v: not isinstance(v, (dict, list)) and v not in excluded
+    if isinstance(match, models.MatchText):
+        return lambda v: isinstance(v, str) and match.text in v
+    raise ValueError(f"{type(match).__name__} is not supported by the embedded store")
+
+
+def _range_predicate(bounds: models.Range) -> Callable[[Any], bool]:
+    def predicate(v) -> bool:
+        if not isinstance(v, (int, float)) or isinstance(v, bool):
+            return False
+        return (
+            (bounds.gt is None or v > bounds.gt)
+            and (bounds.gte is None or v >= bounds.gte)
+            and (bounds.lt is None or v < bounds.lt)
+            and (bounds.lte is None or v <= bounds.lte)
+        )
+
+    return predicate
+
+
+def _select_payload(payload: Optional[dict], with_payload) -> Optional[dict]:
+    if with_payload is True:
+        return payload or {}
+    if not with_payload:
+        return None
+    payload = payload or {}
+    if isinstance(with_payload, list):
+        return {k: payload[k] for k in with_payload if k in payload}
+    if isinstance(with_payload, models.PayloadSelectorInclude):
+        return {k: payload[k] for k in with_payload.include if k in payload}
+    if isinstance(with_payload, models.PayloadSelectorExclude):
+        return {k: v for k, v in payload.items() if k not in with_payload.exclude}
+    return payload
+
+
+class EmbeddedCollection:
+    """One collection stored in a directory of memory-mapped files.
+
+    Dense vectors live in a float32 matrix (``vectors.f32``) with their
+    squared norms and per-row flags beside them. The id, payload and sparse
+    vector of each row are an orjson record appended to ``records.bin``, at
+    the offset kept in ``offsets.i64``. Rows are only ever appended: writing
+    a point again tombstones its old row, and ``compact`` rewrites the files
+    without the tombstoned rows once they make up ``compact_ratio`` of them.
+
+    Search is exact: scores for a block of rows and every query come from one
+    matrix product (or absolute differences for Manhattan), and the top k of
+    each block is kept with argpartition.
+
+    Not thread-safe on its own; EmbeddedClient serializes access.
+    """
+
+    def __init__(self, path: str, compact_ratio: float = 0.2):
+        self.path = path
+        self.compact_ratio = compact_ratio
+        with open(self._file("meta.json")) as f:
+            self.meta = json.load(f)
+        self.dimensions = self.meta["dimensions"]
+        self.distance = models.Distance(self.meta["distance"])
+        self.sparse = self.meta["sparse"]
+        self.rows = self.meta["rows"]
+        self.capacity = self.meta["capacity"]
+        self._map_files()
+        self._records = open(self._file("records.bin"), "ab+")
+        self.ids: List[Any] = [None] * self.rows
+        self.index: Dict[Any, int] = {}
+        self.tombstones = 0
+        for row, record in self._iter_records():
+            point_id = record[0]
+            self.ids[row] = point_id
+            if self.flags[row] & ALIVE:
+                self.index[point_id] = row
+            else:
+                self.tombstones += 1
+        self._reset_caches()
+
+    @classmethod
+    def create(
+        cls,
+        path: str,
+        dimensions: int,
+        distance: models.Distance,
+        sparse: bool = False,
+        config: Optional[dict] = None,
+        compact_ratio: float = 0.2,
+        capacity: int = 1024,
+    ) -> "EmbeddedCollection":
+        os.makedirs(path)
+        for name, dtype, shape in cls._layout(dimensions, capacity):
+            np.memmap(os.path.join(path, name), dtype=dtype, mode="w+", shape=shape)
+        open(os.path.join(path, "records.bin"), "wb").close()
+        meta = {
+            "dimensions": dimensions,
+            "distance": distance.value,
+            "sparse": sparse,
+            "rows": 0,
+            "capacity": capacity,
+            "config": config or {},
+        }
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        return cls(path, compact_ratio=compact_ratio)
+
+    @staticmethod
+    def _layout(dimensions: int, capacity: int):
+        return [
+            ("vectors.f32", np.float32, (capacity, dimensions)),
+            ("norms.f32", np.float32, (capacity,)),
+            ("flags.u8", np.uint8, (capacity,)),
+            ("offsets.i64", np.int64, (capacity, 2)),
+        ]
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _map_files(self) -> None:
+        self.vectors, self.norms, self.flags, self.offsets = (
+            np.memmap(self._file(name), dtype=dtype, mode="r+", shape=shape)
+            for name, dtype, shape in self._layout(self.dimensions, self.capacity)
+        )
+
+    def _reset_caches(self) -> None:
+        # Payload columns used by filters, the sparse inverted index and the
+        # scroll order are built on first use and dropped by compaction.
+        # Payloads never change in place, so the masks of payload conditions
+        # stay valid until rows are appended
+        self._columns: Dict[str, list] = {}
+        self._masks: Dict[str, np.ndarray] = {}
+        self._postings: Optional[Dict[int, Tuple[list, list]]] = None
+        self._order: Optional[List[Tuple[Tuple[bool, Any], int]]] = None
+
+    def _save_meta(self) -> None:
+        self.meta.update(rows=self.rows, capacity=self.capacity)
+        partial = self._file("meta.json.partial")
+        with open(partial, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(partial, self._file("meta.json"))
+
+    def _grow(self, rows: int) -> None:
+        capacity = self.capacity
+        while capacity < rows:
+            capacity *= 2
+        if capacity == self.capacity:
+            return
+        self.flush()
+        del self.vectors, self.norms, self.flags, self.offsets
+        for name, dtype, shape in self._layout(self.dimensions, capacity):
+            size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            os.truncate(self._file(name), size)
+        self.capacity = capacity
+        self._map_files()
+
+    # Records
+
+    def _read_record(self, row: int) -> list:
+        start, length = self.offsets[row]
+        return orjson.loads(os.pread(self._records.fileno(), int(length), int(start)))
+
+    def _iter_records(self, rows: Optional[np.ndarray] = None):
+        """Yields (row, record) by reading the record file once."""
+        with open(self._file("records.bin"), "rb") as f:
+            data = f.read()
+        for row in range(self.rows) if rows is None else rows:
+            start, length = self.offsets[row]
+            yield int(row), orjson.loads(data[start : start + length])
+
+    def payload(self, row: int) -> Optional[dict]:
+        return self._read_record(row)[1]
+
+    def sparse_vector(self, row: int) -> Optional[models.SparseVector]:
+        sparse = self._read_record(row)[2]
+        return models.SparseVector(**sparse) if sparse else None
+
+    # Writes
+
+    def append(self, points: List[Tuple[Any, Optional[list], Optional[dict], Any]]):
+        """Appends rows of (id, dense vector, sparse vector, payload).
+
+        A point written again replaces its earlier row, which is tombstoned;
+        within one call the last write of an id wins.
+        """
+        points = list({point[0]: point for point in points}.values())
+        if not points:
+            return
+        start = self.rows
+        self._grow(start + len(points))
+        dense = np.zeros((len(points), self.dimensions), dtype=np.float32)
+        flags = np.full(len(points), ALIVE, dtype=np.uint8)
+        for i, (_, vector, sparse, _) in enumerate(points):
+            if vector is not None:
+                if len(vector) != self.dimensions:
+                    raise _error(
+                        400,
+                        f"Wrong input: Vector dimension error: expected dim: "
+                        f"{self.dimensions}, got {len(vector)}",
+                    )
+                dense[i] = vector
+                flags[i] |= DENSE
+            if sparse is not None:
+                flags[i] |= SPARSE
+        if self.distance == models.Distance.COSINE:
+            # Stored normalized, so cosine similarity is a dot product
+            norms = np.linalg.norm(dense, axis=1, keepdims=True)
+            dense /= np.maximum(norms, 1e-12)
+        end = start + len(points)
+        self.vectors[start:end] = dense
+        self.norms[start:end] = np.einsum("ij,ij->i", dense, dense)
+        self.flags[start:end] = flags
+        position = self._records.seek(0, os.SEEK_END)
+        chunks = []
+        for i, (point_id, _, sparse, payload) in enumerate(points):
+            record = orjson.dumps([point_id, payload, sparse])
+            self.offsets[start + i] = (position, len(record))
+            position += len(record)
+            chunks.append(record)
+        self._records.write(b"".join(chunks))
+        self._records.flush()
+        added = []
+        for i, (point_id, _, sparse, payload) in enumerate(points):
+            row = start + i
+            self.ids.append(point_id)
+            previous = self.index.get(point_id)
+            if previous is not None:
+                self._tombstone(previous)
+                if self._order is not None:
+                    position = self._position(point_id)
+                    self._order[position] = (self._order[position][0], row)
+            else:
+                added.append((_id_key(point_id), row))
+            self.index[point_id] = row
+            for key, column in self._columns.items():
+                column.append(_field_values(payload, key))
+            if self._postings is not None and sparse is not None:
+                self._index_sparse(row, sparse)
+        self.rows = end
+        if self._order is not None and added:
+            # Two sorted runs, which sort() merges in linear time
+            self._order.extend(sorted(added))
+            self._order.sort()
+        self._masks.clear()
+        self._save_meta()
+        self.maybe_compact()
+
+    def _tombstone(self, row: int) -> None:
+        self.flags[row] &= ~np.uint8(ALIVE)
+        self.tombstones += 1
+
+    def delete(self, rows: List[int]) -> None:
+        for row in rows:
+            if self.flags[row] & ALIVE:
+                self._tombstone(row)
+                del self.index[self.ids[row]]
+                if self._order is not None:
+                    del self._order[self._position(self.ids[row])]
+        self.maybe_compact()
+
+    def maybe_compact(self) -> None:
+        if (
+            self.rows >= COMPACT_MIN_ROWS
+            and self.tombstones >= self.compact_ratio * self.rows
+        ):
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrites the collection without its tombstoned rows.
+
+        The new copy is written next to the collection, then swapped in by
+        renaming the old directory aside and the new one into place, so a
+        crash at any point leaves one complete copy (see finish_compaction).
+        """
+        alive = np.flatnonzero(self.flags[: self.rows] & ALIVE)
+        logger.info(
+            f"Compacting {self.path}: {self.tombstones} of {self.rows} rows removed"
+        )
+        partial = self.path + COMPACTING
+        shutil.rmtree(partial, ignore_errors=True)
+        capacity = max(1024, 1 << max(len(alive) - 1, 0).bit_length())
+        target = EmbeddedCollection.create(
+            partial,
+            self.dimensions,
+            self.distance,
+            sparse=self.sparse,
+            config=self.meta["config"],
+            compact_ratio=self.compact_ratio,
+            capacity=capacity,
+        )
+        for start in range(0, len(alive), BLOCK_ROWS):
+            rows = alive[start : start + BLOCK_ROWS]
+            end = start + len(rows)
+            target.vectors[start:end] = self.vectors[rows]
+            target.norms[start:end] = self.norms[rows]
+            target.flags[start:end] = self.flags[rows]
+        with open(self._file("records.bin"), "rb") as f:
+            data = f.read()
+        position = 0
+        for i, row in enumerate(alive):
+            start, length = self.offsets[row]
+            target._records.write(data[start : start + length])
+            target.offsets[i] = (position, length)
+            position += int(length)
+        target.rows = len(alive)
+        target._save_meta()
+        target.close()
+        self.close()
+        os.replace(self.path, self.path + REPLACED)
+        os.replace(partial, self.path)
+        shutil.rmtree(self.path + REPLACED)
+        self.__init__(self.path, compact_ratio=self.compact_ratio)
+
+    # Filters
+
+    def _column(self, key: str) -> list:
+        column = self._columns.get(key)
+        if column is None:
+            column = [MISSING] * self.rows
+            alive = np.flatnonzero(self.flags[: self.rows] & ALIVE)
+            for row, record in self._iter_records(alive):
+                column[row] = _field_values(record[1], key)
+            self._columns[key] = column
+        return column
+
+    def index_field(self, key: str) -> None:
+        """Builds the column of a payload field now rather than on first filter."""
+        self._column(key)
+
+    def has(self, flag: int) -> np.ndarray:
+        """The alive rows having a flag, as a boolean mask."""
+        flags = self.flags[: self.rows]
+        return (flags & (ALIVE | flag)) == ALIVE | flag
+
+    def filter_mask(self, query_filter: Optional[models.Filter]) -> np.ndarray:
+        """The alive rows matching a filter, as a boolean mask."""
+        mask = self.has(ALIVE)
+        if query_filter is not None:
+            mask &= self._eval_filter(query_filter)
+        return mask
+
+    def _eval_filter(self, query_filter: models.Filter) -> np.ndarray:
+        mask = np.ones(self.rows, dtype=bool)
+        for condition in _as_list(query_filter.must):
+            mask &= self._eval_condition(condition)
+        for condition in _as_list(query_filter.must_not):
+            mask &= ~self._eval_condition(condition)
+        should = _as_list(query_filter.should)
+        if should:
+            mask &= np.logical_or.reduce([self._eval_condition(c) for c in should])
+        if query_filter.min_should is not None:
+            raise ValueError("min_should is not supported by the embedded store")
+        return mask
+
+    def _eval_condition(self, condition) -> np.ndarray:
+        if isinstance(
+            condition,
+            (models.FieldCondition, models.IsEmptyCondition, models.IsNullCondition),
+        ):
+            key = condition.model_dump_json()
+            mask = self._masks.get(key)
+            if mask is None:
+                mask = self._masks[key] = self._eval_payload_condition(condition)
+            return mask
+        if isinstance(condition, models.Filter):
+            return self._eval_filter(condition)
+        if isinstance(condition, models.HasIdCondition):
+            mask = np.zeros(self.rows, dtype=bool)
+            rows = [self.index.get(_point_id(i)) for i in condition.has_id]
+            mask[[row for row in rows if row is not None]] = True
+            return mask
+        raise ValueError(
+            f"{type(condition).__name__} is not supported by the embedded store"
+        )
+
+    def _eval_payload_condition(self, condition) -> np.ndarray:
+        if isinstance(condition, models.IsEmptyCondition):
+            return self._map_column(
+                condition.is_empty.key,
+                lambda v: v is MISSING or v is None or v == [],
+            )
+        if isinstance(condition, models.IsNullCondition):
+            return self._map_column(condition.is_null.key, lambda v: v is None)
+        if condition.match is not None:
+            predicate = _match_predicate(condition.match)
+        elif isinstance(condition.range, models.Range):
+            predicate = _range_predicate(condition.range)
+        else:
+            raise ValueError(
+                "Only match and range field conditions are supported by the "
+                "embedded store"
+            )
+        return self._map_column(condition.key, lambda v: _any_value(v, predicate))
+
+    def _map_column(self, key: str, predicate: Callable[[Any], bool]) -> np.ndarray:
+        column = self._column(key)
+        return np.fromiter(map(predicate, column), dtype=bool, count=len(column))
+
+    # Dense search
+
+    def _prepare_queries(self, queries: np.ndarray) -> np.ndarray:
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if queries.shape[1] != self.dimensions:
+            raise _error(
+                400,
+                f"Wrong input: Vector dimension error: expected dim: "
+                f"{self.dimensions}, got {queries.shape[1]}",
+            )
+        if self.distance == models.Distance.COSINE:
+            norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            queries = queries / np.maximum(norms, 1e-12)
+        return queries
+
+    def _block_scores(self, start: int, end: int, queries: np.ndarray) -> np.ndarray:
+        """Scores of rows start:end against every query, higher is better."""
+        block = self.vectors[start:end]
+        if self.distance == models.Distance.MANHATTAN:
+            step = max(MANHATTAN_BLOCK_BYTES // (4 * self.dimensions), 1)
+            scores = np.empty((end - start, len(queries)), dtype=np.float32)
+            for i in range(0, end - start, step):
+                chunk = block[i : i + step]
+                for j, query in enumerate(queries):
+                    scores[i : i + step, j] = -np.abs(chunk - query).sum(axis=1)
+            return scores
+        products = block @ queries.T
+        if self.distance == models.Distance.EUCLID:
+            # -|v - q|^2 without the |q|^2 term, which is the same for all rows
+            return 2 * products - self.norms[start:end, None]
+        return products
+
+    def _displayed(self, scores: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """Turns internal scores into the scores Qdrant reports."""
+        if self.distance == models.Distance.EUCLID:
+            squared = np.einsum("ij,ij->i", queries, queries)
+            return np.sqrt(np.maximum(squared[None, :] - scores, 0))
+        if self.distance == models.Distance.MANHATTAN:
+            return -scores
+        return scores
+
+    def search(
+        self,
+        queries: np.ndarray,
+        mask: np.ndarray,
+        limit: int,
+        score_threshold: Optional[float] = None,
+    ) -> List[List[Tuple[int, float]]]:
+        """Exact top-``limit`` rows for each query among the masked rows.
+
+        Returns:
+            List[list]: (row, score) pairs per query, best first.
+        """
+        queries = self._prepare_queries(queries)
+        mask = mask & self.has(DENSE)
+        candidates: List[List[Tuple[np.ndarray, np.ndarray]]] = [
+            [] for _ in range(len(queries))
+        ]
+        for start in range(0, self.rows, BLOCK_ROWS):
+            end = min(start + BLOCK_ROWS, self.rows)
+            block_mask = mask[start:end]
+            if limit <= 0 or not block_mask.any():
+                continue
+            scores = self._block_scores(start, end, queries)
+            scores[~block_mask] = -np.inf
+            k = min(limit, int(block_mask.sum()))
+            top = np.argpartition(-scores, k - 1, axis=0)[:k]
+            for j in range(len(queries)):
+                candidates[j].append((top[:, j] + start, scores[top[:, j], j]))
+        results = []
+        for j, parts in enumerate(candidates):
+            if not parts:
+                results.append([])
+                continue
+            rows = np.concatenate([p[0] for p in parts])
+            scores = np.concatenate([p[1] for p in parts])
+            order = np.argsort(-scores, kind="stable")[:limit]
+            rows, scores = rows[order], scores[order]
+            displayed = self._displayed(scores[:, None], queries[j : j + 1])[:, 0]
+            hits = list(zip(rows.tolist(), displayed.tolist()))
+            if score_threshold is not None:
+                hits = self.threshold(hits, score_threshold)
+            results.append(hits)
+        return results
+
+    def threshold(self, hits: list, score_threshold: float) -> list:
+        """Drops hits scoring worse than a threshold; distances must be at
+        most the threshold, similarities at least."""
+        if self.distance in (models.Distance.EUCLID, models.Distance.MANHATTAN):
+            return [(row, score) for row, score in hits if score <= score_threshold]
+        return [(row, score) for row, score in hits if score >= score_threshold]
+
+    # Sparse search
+
+    def _index_sparse(self, row: int, sparse: dict) -> None:
+        for term, value in zip(sparse["indices"], sparse["values"]):
+            rows, values = self._postings.setdefault(term, ([], []))
+            rows.append(row)
+            values.append(value)
+
+    def search_sparse(
+        self, query: models.SparseVector, mask: np.ndarray, limit: int
+    ) -> List[Tuple[int, float]]:
+        """Top rows by sparse dot product, with terms weighted by BM25 IDF.
+
+        Returns:
+            list: (row, score) pairs, best first.
+        """
+        if self._postings is None:
+            self._postings = {}
+            for row, record in self._iter_records(np.flatnonzero(self.has(SPARSE))):
+                self._index_sparse(row, record[2])
+        indexed = self.has(SPARSE)
+        mask = mask & indexed
+        total = int(indexed.sum())
+        scores = np.zeros(self.rows, dtype=np.float32)
+        for term, weight in zip(query.indices, query.values):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            rows = np.asarray(posting[0])
+            values = np.asarray(posting[1], dtype=np.float32)
+            live = indexed[rows]
+            rows, values = rows[live], values[live]
+            frequency = len(rows)
+            idf = math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            np.add.at(scores, rows, weight * idf * values)
+        scores[~mask] = 0
+        hits = np.flatnonzero(scores > 0)
+        if not len(hits) or limit <= 0:
+            return []
+        k = min(limit, len(hits))
+        top = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return list(zip(top.tolist(), scores[top].tolist()))
+
+    # Reads
+
+    def order(self) -> List[Tuple[Tuple[bool, Any], int]]:
+        """Alive rows sorted by point id, built on first use and kept up to
+        date by writes."""
+        if self._order is None:
+            self._order = sorted(
+                (_id_key(point_id), row) for point_id, row in self.index.items()
+            )
+        return self._order
+
+    def _position(self, point_id) -> int:
+        """Position of an alive point in the scroll order."""
+        return bisect.bisect_left(self._order, (_id_key(point_id),))
+
+    def vector(self, row: int, with_vectors):
+        if not with_vectors:
+            return None
+        dense = self.vectors[row].tolist() if self.flags[row] & DENSE else None
+        if not self.flags[row] & SPARSE:
+            return dense
+        vectors = {}
+        if dense is not None:
+            vectors[""] = dense
+        if self.flags[row] & SPARSE:
+            vectors[SPARSE_VECTOR] = self.sparse_vector(row)
+        return vectors
+
+    def record(self, row: int, with_payload, with_vectors) -> models.Record:
+        return models.Record(
+            id=self.ids[row],
+            payload=_select_payload(self.payload(row), with_payload),
+            vector=self.vector(row, with_vectors),
+        )
+
+    def scored_point(
+        self, row: int, score: float, with_payload, with_vectors
+    ) -> models.ScoredPoint:
+        return models.ScoredPoint(
+            id=self.ids[row],
+            version=0,
+            score=score,
+            payload=_select_payload(self.payload(row), with_payload),
+            vector=self.vector(row, with_vectors),
+        )
+
+    def info(self) -> models.CollectionInfo:
+        config = self.meta["config"]
+        return models.CollectionInfo(
+            status=models.CollectionStatus.GREEN,
+            optimizer_status=models.OptimizersStatusOneOf.OK,
+            indexed_vectors_count=0,
+            points_count=len(self.index),
+            segments_count=1,
+            payload_schema={},
+            config=models.CollectionConfig(
+                params=models.CollectionParams(
+                    vectors=models.VectorParams(
+                        size=self.dimensions,
+                        distance=self.distance,
+                        on_disk=True,
+                    ),
+                    shard_number=1,
+                    replication_factor=1,
+                    on_disk_payload=True,
+                    sparse_vectors=(
+                        {SPARSE_VECTOR: models.SparseVectorParams()}
+                        if self.sparse
+                        else None
+                    ),
+                ),
+                hnsw_config=models.HnswConfig(
+                    m=16, ef_construct=100, full_scan_threshold=10000
+                ),
+                wal_config=models.WalConfig(wal_capacity_mb=32, wal_segments_ahead=0),
+                optimizer_config=models.OptimizersConfig(
+                    deleted_threshold=self.compact_ratio,
+                    vacuum_min_vector_number=COMPACT_MIN_ROWS,
+                    default_segment_number=1,
+                    flush_interval_sec=0,
+                ),
+                metadata=config.get("metadata"),
+            ),
+        )
+
+    def flush(self) -> None:
+        for array in (self.vectors, self.norms, self.flags, self.offsets):
+            array.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._save_meta()
+        self._records.close()
+
+
+def finish_compaction(path: str) -> None:
+    """Completes or rolls back a compaction of the collection at ``path``
+    that was interrupted by a crash.
+
+    The new copy is only moved into place once it is complete, so when the
+    old copy has been moved aside the new one is used; otherwise the
+    leftover copies are removed.
+    """
+    compacting, replaced = path + COMPACTING, path + REPLACED
+    if not os.path.exists(path):
+        if os.path.exists(compacting) and os.path.exists(replaced):
+            os.replace(compacting, path)
+        elif os.path.exists(replaced):
+            os.replace(replaced, path)
+    for leftover in (compacting, replaced):
+        if os.path.exists(leftover):
+            logger.info(f"Removing {leftover} left by an interrupted compaction")
+            shutil.rmtree(leftover)
+
+
+class EmbeddedClient:
+    """An in-process vector store answering the AsyncQdrantClient calls that
+    QdrantService makes.
+
+    Each collection is an EmbeddedCollection in its own directory under
+    ``path``; ``":memory:"`` uses a temporary directory removed on close.
+    Results are returned as the same Qdrant models, and errors raised as
+    the same UnexpectedResponse, so QdrantService works unchanged on top.
+    Calls run on a worker thread; each collection is used by one at a time.
+
+    The store is single-process: the client holds an exclusive lock on
+    ``path`` while open, and a second process (e.g. another server worker)
+    opening the same path fails rather than corrupting it.
+
+    Args:
+        path (str): The directory holding the collections.
+        compact_ratio (float): Share of tombstoned rows that triggers a
+            compaction.
+    """
+
+    def __init__(self, path: str, compact_ratio: float = 0.2):
+        self._temporary = path == ":memory:"
+        self.path = (
+            tempfile.mkdtemp(prefix="embedded-store-") if self._temporary else path
+        )
+        self.compact_ratio = compact_ratio
+        os.makedirs(self.path, exist_ok=True)
+        self._store_lock = open(os.path.join(self.path, ".lock"), "w")
+        try:
+            fcntl.flock(self._store_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._store_lock.close()
+            raise RuntimeError(
+                f"The embedded store at {self.path} is open in another process; "
+                "it can only be used by one process (run a single worker)"
+            ) from None
+        self._collections: Dict[str, EmbeddedCollection] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._operation_ids = itertools.count()
+        names = os.listdir(self.path)
+        for name in {n.removesuffix(COMPACTING).removesuffix(REPLACED) for n in names}:
+            finish_compaction(os.path.join(self.path, name))
+        for name in sorted(os.listdir(self.path)):
+            if os.path.exists(os.path.join(self.path, name, "meta.json")):
+                self._collections[name] = EmbeddedCollection(
+                    os.path.join(self.path, name), compact_ratio=compact_ratio
+                )
+                self._locks[name] = threading.Lock()
+
+    def _update_result(self) -> models.UpdateResult:
+        return models.UpdateResult(
+            operation_id=next(self._operation_ids),
+            status=models.UpdateStatus.COMPLETED,
+        )
+
+    async def _run(self, collection_name: str, operation: Callable):
+        """Runs ``operation(collection)`` on a thread, holding the collection."""
+
+        def run():
+            with self._lock:
+                collection = self._collections.get(collection_name)
+                lock = self._locks.get(collection_name)
+            if collection is None:
+                raise _error(
+                    404, f"Not found: Collection `{collection_name}` doesn't exist!"
+                )
+            with lock:
+                return operation(collection)
+
+        return await asyncio.to_thread(run)
+
+    # Collections
+
+    async def create_collection(
+        self,
+        collection_name: str,
+        vectors_config: models.VectorParams,
+        sparse_vectors_config: Optional[dict] = None,
+        **settings,
+    ) -> bool:
+        """Creates a collection. HNSW, quantization, sharding and optimizer
+        settings have no meaning for exact search and are only recorded."""
+
+        def create():
+            with self._lock:
+                if collection_name in self._collections:
+                    raise _error(
+                        400,
+                        f"Wrong input: Collection `{collection_name}` already exists!",
+                    )
+                self._collections[collection_name] = EmbeddedCollection.create(
+                    os.path.join(self.path, collection_name),
+                    dimensions=vectors_config.size,
+                    distance=models.Distance(vectors_config.distance),
+                    sparse=bool(sparse_vectors_config),
+                    compact_ratio=self.compact_ratio,
+                )
+                self._locks[collection_name] = threading.Lock()
+            return True
+
+        return await asyncio.to_thread(create)
+
+    async def update_collection(self, collection_name: str, **settings) -> bool:
+        await self._run(collection_name, lambda collection: None)
+        return True
+
+    async def create_payload_index(
+        self, collection_name: str, field_name: str, **settings
+    ) -> models.UpdateResult:
+        await self._run(collection_name, lambda c: c.index_field(field_name))
+        return self._update_result()
+
+    async def get_collections(self) -> models.CollectionsResponse:
+        with self._lock:
+            names = list(self._collections)
+        return models.CollectionsResponse(
+            collections=[models.CollectionDescription(name=name) for name in names]
+        )
+
+    async def get_collection(self, collection_name: str) -> models.CollectionInfo:
+        return await self._run(collection_name, lambda c: c.info())
+
+    async def delete_collection(self, collection_name: str, **kwargs) -> bool:
+        def delete():
+            with self._lock:
+                collection = self._collections.pop(collection_name, None)
+                lock = self._locks.pop(collection_name, None)
+            if collection is None:
+                return False
+            with lock:
+                collection.close()
+                shutil.rmtree(collection.path)
+            return True
+
+        return await asyncio.to_thread(delete)
+
+    # Points
+
+    @staticmethod
+    def _split_vectors(vector) -> Tuple[Optional[list], Optional[dict]]:
+        """Splits a point's vectors into the dense and the sparse one."""
+        if vector is None:
+            return None, None
+        if isinstance(vector, dict):
+            sparse = vector.get(SPARSE_VECTOR)
+            if sparse is not None:
+                sparse = {
+                    "indices": list(sparse.indices),
+                    "values": list(sparse.values),
+                }
+            return vector.get(""), sparse
+        return list(vector), None
+
+    async def upsert(
+        self,
+        collection_name: str,
+        points: List[models.PointStruct],
+        wait: bool = True,
+        **kwargs,
+    ) -> models.UpdateResult:
+        if isinstance(points, models.Batch):
+            points = [
+                models.PointStruct(id=i, vector=v, payload=p)
+                for i, v, p in zip(
+                    points.ids,
+                    points.vectors,
+                    points.payloads or [None] * len(points.ids),
+                )
+            ]
+        rows = []
+        for point in points:
+            dense, sparse = self._split_vectors(point.vector)
+            rows.append((_point_id(point.id), dense, sparse, point.payload))
+        await self._run(collection_name, lambda c: c.append(rows))
+        return self._update_result()
+
+    async def update_vectors(
+        self,
+        collection_name: str,
+        points: List[models.PointVectors],
+        wait: bool = True,
+        **kwargs,
+    ) -> models.UpdateResult:
+        def update(collection: EmbeddedCollection):
+            rows = []
+            for point in points:
+                point_id = _point_id(point.id)
+                row = collection.index.get(point_id)
+                if row is None:
+                    raise _error(404, f"Not found: No point with id {point_id} found")
+                dense, sparse = self._split_vectors(point.vector)
+                _, payload, old_sparse = collection._read_record(row)
+                if dense is None and collection.flags[row] & DENSE:
+                    dense = collection.vectors[row].tolist()
+                if sparse is None:
+                    sparse = old_sparse
+                # The point is written again with its payload; the old row
+                # becomes a tombstone
+                rows.append((point_id, dense, sparse, payload))
+            collection.append(rows)
+
+        await self._run(collection_name, update)
+        return self._update_result()
+
+    async def retrieve(
+        self,
+        collection_name: str,
+        ids: List[Any],
+        with_payload=True,
+        with_vectors=False,
+        **kwargs,
+    ) -> List[models.Record]:
+        def retrieve(collection: EmbeddedCollection):
+            rows = [collection.index.get(_point_id(i)) for i in ids]
+            return [
+                collection.record(row, with_payload, with_vectors)
+                for row in dict.fromkeys(rows)
+                if row is not None
+            ]
+
+        return await self._run(collection_name, retrieve)
+
+    async def delete(
+        self, collection_name: str, points_selector, wait: bool = True, **kwargs
+    ) -> models.UpdateResult:
+        def delete(collection: EmbeddedCollection):
+            if isinstance(points_selector, models.FilterSelector):
+                mask = collection.filter_mask(points_selector.filter)
+                rows = np.flatnonzero(mask).tolist()
+            else:
+                ids = (
+                    points_selector.points
+                    if isinstance(points_selector, models.PointIdsList)
+                    else points_selector
+                )
+                rows = [collection.index.get(_point_id(i)) for i in ids]
+            collection.delete([row for row in rows if row is not None])
+
+        await self._run(collection_name, delete)
+        return self._update_result()
+
+    async def count(
+        self, collection_name: str, count_filter=None, exact: bool = True, **kwargs
+    ) -> models.CountResult:
+        def count(collection: EmbeddedCollection):
+            if count_filter is None:
+                return len(collection.index)
+            return int(collection.filter_mask(count_filter).sum())
+
+        return models.CountResult(count=await self._run(collection_name, count))
+
+    async def scroll(
+        self,
+        collection_name: str,
+        scroll_filter=None,
+        limit: int = 10,
+        offset=None,
+        with_payload=True,
+        with_vectors=False,
+        **kwargs,
+    ):
+        def scroll(collection: EmbeddedCollection):
+            order = collection.order()
+            position = 0
+            if offset is not None:
+                position = bisect.bisect_left(order, (_id_key(_point_id(offset)),))
+            mask = (
+                collection.filter_mask(scroll_filter)
+                if scroll_filter is not None
+                else None
+            )
+            rows = []
+            next_offset = None
+            for i in range(position, len(order)):
+                key, row = order[i]
+                if mask is not None and not mask[row]:
+                    continue
+                if len(rows) == limit:
+                    next_offset = key[1]
+                    break
+                rows.append(row)
+            records = [collection.record(r, with_payload, with_vectors) for r in rows]
+            return records, next_offset
+
+        return await self._run(collection_name, scroll)
+
+    # Search
+
+    def _query(
+        self, collection: EmbeddedCollection, request
+    ) -> List[Tuple[int, float]]:
+        """Runs one query (a dense or sparse vector, or an RRF fusion of
+        prefetches) and returns its (row, score) pairs, best first."""
+        limit = (request.limit or 10) + (getattr(request, "offset", None) or 0)
+        mask = collection.filter_mask(request.filter)
+        query = request.query
+        if isinstance(query, models.FusionQuery):
+            if query.fusion != models.Fusion.RRF:
+                raise ValueError(f"{query.fusion} fusion is not supported")
+            scores: Dict[int, float] = {}
+            for prefetch in _as_list(request.prefetch):
+                for rank, (row, _) in enumerate(self._query(collection, prefetch)):
+                    if mask[row]:
+                        scores[row] = scores.get(row, 0) + 1 / (rank + RRF_K)
+            fused = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+            threshold = getattr(request, "score_threshold", None)
+            if threshold is not None:
+                fused = [(row, score) for row, score in fused if score >= threshold]
+            return fused
+        if isinstance(query, models.SparseVector):
+            return collection.search_sparse(query, mask, limit)
+        if isinstance(query, models.NearestQuery):
+            query = query.nearest
+        if query is None or isinstance(query, (dict, models.Document)):
+            raise ValueError("Only vector, sparse vector and RRF queries are supported")
+        return collection.search(
+            np.asarray(query, dtype=np.float32),
+            mask,
+            limit,
+            getattr(request, "score_threshold", None),
+        )[0]
+
+    def _response(
+        self, collection: EmbeddedCollection, hits, request
+    ) -> models.QueryResponse:
+        offset = request.offset or 0
+        with_vectors = getattr(request, "with_vector", None)
+        if with_vectors is None:
+            with_vectors = getattr(request, "with_vectors", False)
+        return models.QueryResponse(
+            points=[
+                collection.scored_point(row, score, request.with_payload, with_vectors)
+                for row, score in hits[offset:]
+            ]
+        )
+
+    async def query_points(
+        self,
+        collection_name: str,
+        query=None,
+        prefetch=None,
+        query_filter=None,
+        search_params=None,
+        limit: int = 10,
+        offset: Optional[int] = None,
+        score_threshold: Optional[float] = None,
+        with_payload=True,
+        with_vectors=False,
+        **kwargs,
+    ) -> models.QueryResponse:
+        request = models.QueryRequest(
+            query=query,
+            prefetch=prefetch,
+            filter=query_filter,
+            limit=limit,
+            offset=offset,
+            score_threshold=score_threshold,
+            with_payload=with_payload,
+            with_vector=with_vectors,
+        )
+
+        def run(collection: EmbeddedCollection):
+            return self._response(collection, self._query(collection, request), request)
+
+        return await self._run(collection_name, run)
+
+    async def query_batch_points(
+        self, collection_name: str, requests: List[models.QueryRequest], **kwargs
+    ) -> List[models.QueryResponse]:
+        def run(collection: EmbeddedCollection):
+            responses: List[Optional[models.QueryResponse]] = [None] * len(requests)
+            # Plain vector queries sharing a filter are scored by one matrix
+            # product
+            groups: Dict[str, List[int]] = {}
+            for i, request in enumerate(requests):
+                if isinstance(request.query, list) and not request.prefetch:
+                    key = request.filter.model_dump_json() if request.filter else ""
+                    groups.setdefault(key, []).append(i)
+                else:
+                    hits = self._query(collection, request)
+                    responses[i] = self._response(collection, hits, request)
+            for indices in groups.values():
+                batch = [requests[i] for i in indices]
+                limit = max((r.limit or 10) + (r.offset or 0) for r in batch)
+                results = collection.search(
+                    np.asarray([r.query for r in batch], dtype=np.float32),
+                    collection.filter_mask(batch[0].filter),
+                    limit,
+                )
+                for i, request, hits in zip(indices, batch, results):
+                    hits = hits[: (request.limit or 10) + (request.offset or 0)]
+                    if request.score_threshold is not None:
+                        hits = collection.threshold(hits, request.score_threshold)
+                    responses[i] = self._response(collection, hits, request)
+            return responses
+
+        return await self._run(collection_name, run)
+
+    async def close(self, **kwargs) -> None:
+        def close():
+            with self._lock:
+                for name, collection in self._collections.items():
+                    with self._locks[name]:
+                        collection.close()
+                self._collections.clear()
+            if self._temporary:
+                shutil.rmtree(self.path, ignore_errors=True)
+            self._store_lock.close()
+
+        await asyncio.to_thread(close)
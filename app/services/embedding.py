@@ -0,0 +1,325 @@
+from typing import TYPE_CHECKING, Dict, List, Optional
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from app.core.config import settings
+from app.core.deadlines import within_deadline
+from app.core.profiling import record_stage
+from app.services.batching import MicroBatcher
+from app.services.embedding_cache import EmbeddingCache, cache_key
+from app.services.sparse import SparseEncoder
+
+if TYPE_CHECKING:
+    from app.services.text_processing import TextEncoder
+
+logger = logging.getLogger("uvicorn")
+
+# TextEncoders loaded in this process, by their options, so services (and a
+# preload before workers fork) share one copy of the weights
+_encoders: Dict[tuple, "TextEncoder"] = {}
+_encoders_lock = threading.Lock()
+
+
+def load_encoder(model_name: str, **options) -> "TextEncoder":
+    """Returns the process-wide TextEncoder for a model, loading it once.
+
+    Args:
+        model_name (str): The Hugging Face model name or local directory.
+        **options: TextEncoder keyword arguments.
+
+    Returns:
+        TextEncoder: The shared encoder.
+    """
+    key = (model_name, tuple(sorted(options.items())))
+    with _encoders_lock:
+        if key not in _encoders:
+            from app.services import text_processing
+
+            logger.info(f"Loading embedding model '{model_name}'")
+            _encoders[key] = text_processing.TextEncoder(
+                model_name=model_name, **options
+            )
+        return _encoders[key]
+
+
+class EmbeddingService:
+    """Runs TextEncoder inference in a dedicated thread pool, off the event loop.
+
+    The encoder (and with it torch and transformers) is only loaded on first
+    use, so applications that never embed text do not pay for it. With dynamic
+    batching enabled, concurrent calls to ``embed`` share forward passes, and
+    with the cache enabled texts that were embedded before are not re-encoded.
+    With ``processes`` set, inference runs in an EmbeddingProcessPool instead
+    and the model is not loaded in this process.
+    """
+
+    # Must match how TextEncoder pools token embeddings; part of the cache key
+    pooling = "mean"
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        max_length: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        workers: Optional[int] = None,
+        torch_threads: Optional[int] = None,
+        dynamic_batching: Optional[bool] = None,
+        cache: Optional[EmbeddingCache] = None,
+        backend: Optional[str] = None,
+        quantize: Optional[bool] = None,
+        processes: Optional[int] = None,
+    ):
+        self.model_name = model_name or settings.EMBEDDING_MODEL
+        self.backend = backend or settings.EMBEDDING_BACKEND
+        self.quantize = settings.EMBEDDING_QUANTIZE if quantize is None else quantize
+        # Backends and quantization give slightly different vectors, so cached
+        # vectors are only reused by the same combination
+        self.model_id = f"{self.model_name}:{self.backend}" + (
+            ":int8" if self.quantize else ""
+        )
+        self.max_length = max_length or settings.EMBEDDING_MAX_LENGTH
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.torch_threads = torch_threads or settings.EMBEDDING_TORCH_THREADS
+        workers = workers or settings.EMBEDDING_WORKERS
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="embedding"
+        )
+        if processes is None:
+            processes = settings.EMBEDDING_PROCESSES
+        self.pool = None
+        if processes > 0:
+            from app.services.embedding_pool import EmbeddingProcessPool
+
+            self.pool = EmbeddingProcessPool(
+                self.model_name,
+                processes=processes,
+                torch_threads=self.torch_threads,
+                batch_size=self.batch_size,
+                max_rows=settings.EMBEDDING_PROCESS_MAX_ROWS,
+                **self._encoder_options(),
+            )
+            # One batch in flight per process
+            workers = processes
+        if dynamic_batching is None:
+            dynamic_batching = settings.EMBEDDING_DYNAMIC_BATCHING
+        self.batcher = (
+            MicroBatcher(
+                self._embed_in_executor,
+                max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+                max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+                workers=workers,
+            )
+            if dynamic_batching
+            else None
+        )
+        if cache is None and settings.EMBEDDING_CACHE_MAX_BYTES > 0:
+            cache = EmbeddingCache(
+                max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+                path=settings.EMBEDDING_CACHE_PATH,
+                disk_rows=settings.EMBEDDING_CACHE_DISK_ROWS,
+                model_id=settings.EMBEDDING_MODEL,
+            )
+        self.cache = cache
+        self._encoder = None
+        self._tokenizer = None
+        self._sparse_encoder = None
+        self._lock = threading.Lock()
+        self.warm = False
+        self.error: Optional[str] = None
+
+    @property
+    def encoder(self):
+        """The TextEncoder, loaded on first access."""
+        if self._encoder is None:
+            with self._lock:
+                if self._encoder is None:
+                    import torch
+
+                    torch.set_num_threads(self.torch_threads)
+                    self._encoder = load_encoder(
+                        self.model_name, **self._encoder_options()
+                    )
+        return self._encoder
+
+    def _encoder_options(self) -> Dict:
+        return {
+            "max_length": self.max_length,
+            "backend": self.backend,
+            "quantize": self.quantize,
+            "torch_compile": settings.EMBEDDING_TORCH_COMPILE,
+            "onnx_dir": settings.EMBEDDING_ONNX_DIR,
+            "threads": self.torch_threads,
+            "local_files_only": settings.EMBEDDING_LOCAL_FILES_ONLY,
+            "mmap_weights": settings.EMBEDDING_MMAP_WEIGHTS,
+        }
+
+    @property
+    def tokenizer(self):
+        """The model tokenizer. With a process pool, the model itself is not
+        loaded in this process."""
+        if self.pool is None:
+            return self.encoder.tokenizer
+        if self._tokenizer is None:
+            from transformers import BertTokenizerFast
+
+            self._tokenizer = BertTokenizerFast.from_pretrained(
+                self.model_name,
+                local_files_only=settings.EMBEDDING_LOCAL_FILES_ONLY,
+            )
+        return self._tokenizer
+
+    @classmethod
+    def preload(cls) -> None:
+        """Loads the configured model into the shared encoders now.
+
+        Services created later reuse it. No batcher, cache or inference thread
+        is started, so this is safe before the process forks. With embedding
+        processes, they load the model themselves when the pool starts, so
+        nothing is loaded here.
+        """
+        if settings.EMBEDDING_PROCESSES > 0:
+            logger.info("Embedding runs in separate processes, not preloading")
+            return
+        service = cls(
+            dynamic_batching=False, cache=EmbeddingCache(max_bytes=0), processes=0
+        )
+        dimensions = service.encoder.dimensions
+        service.executor.shutdown()
+        logger.info(f"Preloaded '{service.model_name}' ({dimensions} dimensions)")
+
+    @property
+    def status(self) -> str:
+        """The model state: warm, loaded, failed or not_loaded."""
+        if self.warm:
+            return "warm"
+        if self.error is not None:
+            return "failed"
+        loaded = self.pool.started if self.pool is not None else self._encoder
+        return "loaded" if loaded else "not_loaded"
+
+    async def warm_up(self) -> None:
+        """Loads the encoder and runs one forward pass, off the event loop.
+
+        The first pass initializes the intra-op thread pool (and compiles the
+        model with torch.compile), so the first request does not pay for it.
+        A failure is recorded in ``error`` rather than raised.
+        """
+        try:
+            await self._embed_in_executor(["warm up"])
+        except Exception as exc:
+            logger.exception("Embedding model warm-up failed")
+            self.error = repr(exc)
+        else:
+            self.warm = True
+
+    @property
+    def sparse_encoder(self) -> SparseEncoder:
+        """The BM25 SparseEncoder over the TextEncoder tokenizer."""
+        if self._sparse_encoder is None:
+            self._sparse_encoder = SparseEncoder(
+                self.tokenizer,
+                k1=settings.SPARSE_BM25_K1,
+                b=settings.SPARSE_BM25_B,
+                avg_length=settings.SPARSE_AVG_DOC_TOKENS,
+            )
+        return self._sparse_encoder
+
+    async def sparse_embed(self, texts: List[str]) -> List[Dict[str, list]]:
+        """Builds the BM25 sparse vectors of documents, off the event loop.
+
+        Returns:
+            List[dict]: One sparse vector ("indices" and "values") per text.
+        """
+        return await within_deadline(
+            asyncio.to_thread(lambda: self.sparse_encoder.encode_documents(texts)),
+            "sparse_embedding",
+            shield=True,
+        )
+
+    async def sparse_embed_query(self, text: str) -> Dict[str, list]:
+        """Builds the sparse vector of a search query, off the event loop.
+
+        Returns:
+            dict: The sparse vector, as "indices" and "values".
+        """
+        return await within_deadline(
+            asyncio.to_thread(lambda: self.sparse_encoder.encode_query(text)),
+            "sparse_embedding",
+            shield=True,
+        )
+
+    def embed_sync(self, texts: List[str]) -> np.ndarray:
+        """Embeds texts on the calling thread.
+
+        Returns:
+            np.ndarray: Unit-length float32 embeddings, one row per text.
+        """
+        return self.encoder.encode_batch(texts, batch_size=self.batch_size)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Embeds texts on the embedding thread pool.
+
+        Returns:
+            np.ndarray: Unit-length float32 embeddings, one row per text.
+        """
+        if self.cache is None or not texts:
+            return await self._embed_uncached(texts)
+        keys = [
+            cache_key(self.model_id, text, self.max_length, self.pooling)
+            for text in texts
+        ]
+        vectors = [self.cache.get(key) for key in keys]
+        # Texts repeated within the request are only encoded once
+        missing = {key: text for key, text, v in zip(keys, texts, vectors) if v is None}
+        if missing:
+            encoded = await self._embed_uncached(list(missing.values()))
+            for key, vector in zip(missing, encoded):
+                self.cache.put(key, vector)
+            fresh = dict(zip(missing, encoded))
+            vectors = [fresh[k] if v is None else v for k, v in zip(keys, vectors)]
+        return np.stack(vectors)
+
+    async def _embed_uncached(self, texts: List[str]) -> np.ndarray:
+        start = time.perf_counter()
+        # Inference already started is left to finish; only the wait is cut
+        # short by the request deadline
+        try:
+            if self.batcher is not None:
+                work = self.batcher.submit(texts)
+            else:
+                work = self._embed_in_executor(texts)
+            return await within_deadline(work, "embedding", shield=True)
+        finally:
+            record_stage("embedding", time.perf_counter() - start)
+
+    async def _embed_in_executor(self, texts: List[str]) -> np.ndarray:
+        if self.pool is not None:
+            return await self.pool.embed(texts)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.embed_sync, texts)
+
+    def stats(self) -> Dict:
+        """Reports the dynamic batching and cache statistics.
+
+        Returns:
+            dict: The batcher, cache and process pool statistics, each None
+            when disabled.
+        """
+        return {
+            "batching": self.batcher.stats() if self.batcher is not None else None,
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "processes": self.pool.health() if self.pool is not None else None,
+        }
+
+    async def close(self) -> None:
+        """Waits for running inference to finish and stops the thread pool."""
+        if self.batcher is not None:
+            await self.batcher.close()
+        if self.pool is not None:
+            await self.pool.close()
+        self.executor.shutdown(wait=True)
+        if self.cache is not None:
+            self.cache.close()
@@ -0,0 +1,245 @@
+from collections import OrderedDict
+from typing import Dict, Optional
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import unicodedata
+import numpy as np
+
+logger = logging.getLogger("uvicorn")
+
+# Row layout of the on-disk index: a 16 byte content key and a write sequence
+# number; sequence 0 marks an empty row
+INDEX_DTYPE = np.dtype([("key", "V16"), ("seq", "<u8")])
+
+
+def cache_key(model_name: str, text: str, max_length: int, pooling: str) -> bytes:
+    """Hashes everything that determines an embedding into a 16 byte key.
+
+    Unicode normalization and whitespace runs do not change the tokens BERT
+    sees, so they are normalized away before hashing.
+    """
+    normalized = " ".join(unicodedata.normalize("NFC", text).split())
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (model_name, str(max_length), pooling, normalized):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.digest()
+
+
+class StoreInUse(RuntimeError):
+    """The disk store is open in another process."""
+
+
+class DiskEmbeddingStore:
+    """A fixed-size ring of float32 embeddings in memory-mapped files.
+
+    ``vectors.f32`` holds one row per embedding and ``index.bin`` the key and
+    write sequence of each row, so the key-to-row map is rebuilt on restart.
+    When all rows are used the oldest row is overwritten. ``meta.json``
+    records the model and dimensions the store was written for; a store left
+    by another model is recreated rather than reused.
+
+    The key-to-row map lives in the process, so the store holds an exclusive
+    lock on ``path`` while open and other processes cannot share it.
+
+    Raises:
+        StoreInUse: Another process has the store open.
+    """
+
+    def __init__(self, path: str, max_rows: int, model_id: Optional[str] = None):
+        os.makedirs(path, exist_ok=True)
+        self._lock = open(os.path.join(path, ".lock"), "w")
+        try:
+            fcntl.flock(self._lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock.close()
+            raise StoreInUse(
+                f"The embedding cache at {path} is open in another process"
+            ) from None
+        self.path = path
+        self.max_rows = max_rows
+        self.model_id = model_id
+        self.evictions = 0
+        self.vectors: Optional[np.memmap] = None
+        self.index: Optional[np.memmap] = None
+        self.rows: Dict[bytes, int] = {}
+        self._cursor = 0
+        self._seq = 1
+        if os.path.exists(self._file("meta.json")):
+            with open(self._file("meta.json")) as f:
+                meta = json.load(f)
+            if meta.get("model_id") == model_id:
+                self.max_rows = meta["max_rows"]
+                self._open(meta["dimensions"], mode="r+")
+            else:
+                logger.info(
+                    f"Embedding cache at {path} was written for model "
+                    f"{meta.get('model_id')}, recreating it for {model_id}"
+                )
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _open(self, dimensions: int, mode: str) -> None:
+        self.vectors = np.memmap(
+            self._file("vectors.f32"),
+            dtype=np.float32,
+            mode=mode,
+            shape=(self.max_rows, dimensions),
+        )
+        self.index = np.memmap(
+            self._file("index.bin"),
+            dtype=INDEX_DTYPE,
+            mode=mode,
+            shape=(self.max_rows,),
+        )
+        used = np.flatnonzero(self.index["seq"])
+        self.rows = {bytes(self.index["key"][row]): int(row) for row in used}
+        if used.size:
+            newest = used[np.argmax(self.index["seq"][used])]
+            self._seq = int(self.index["seq"][newest]) + 1
+            self._cursor = (int(newest) + 1) % self.max_rows
+
+    def _create(self, dimensions: int) -> None:
+        self.vectors = self.index = None
+        self._cursor = 0
+        self._seq = 1
+        meta = {
+            "model_id": self.model_id,
+            "dimensions": dimensions,
+            "max_rows": self.max_rows,
+        }
+        with open(self._file("meta.json"), "w") as f:
+            json.dump(meta, f)
+        self._open(dimensions, mode="w+")
+        logger.info(f"Created embedding cache of {self.max_rows} rows at {self.path}")
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        row = self.rows.get(key)
+        return None if row is None else np.array(self.vectors[row])
+
+    def put(self, key: bytes, vector: np.ndarray) -> None:
+        if self.vectors is None or self.vectors.shape[1] != vector.shape[0]:
+            self._create(vector.shape[0])
+        if key in self.rows:
+            return
+        row = self._cursor
+        if self.index["seq"][row]:
+            del self.rows[bytes(self.index["key"][row])]
+            self.evictions += 1
+        self.vectors[row] = vector
+        self.index[row] = (key, self._seq)
+        self.rows[key] = row
+        self._seq += 1
+        self._cursor = (row + 1) % self.max_rows
+
+    def flush(self) -> None:
+        if self.vectors is not None:
+            self.vectors.flush()
+            self.index.flush()
+
+    def close(self) -> None:
+        """Flushes the store and releases its lock."""
+        self.flush()
+        self._lock.close()
+
+
+class EmbeddingCache:
+    """An in-process LRU of embeddings bounded by bytes, over an optional disk tier.
+
+    Lookups check memory first, then disk; disk hits are promoted to memory.
+    New embeddings are written to both tiers. Only one process can use the
+    disk tier at a time: with several workers on one ``path``, the first to
+    start uses it and the others cache in memory only.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        path: Optional[str] = None,
+        disk_rows: int = 1_000_000,
+        model_id: Optional[str] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.disk = None
+        if path:
+            try:
+                self.disk = DiskEmbeddingStore(path, disk_rows, model_id)
+            except StoreInUse as e:
+                logger.warning(f"{e}, caching embeddings in memory only")
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        vector = self._entries.get(key)
+        if vector is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+        if self.disk is not None:
+            vector = self.disk.get(key)
+            if vector is not None:
+                self.disk_hits += 1
+                self._remember(key, vector)
+                return vector
+        self.misses += 1
+        return None
+
+    def put(self, key: bytes, vector: np.ndarray) -> None:
+        # Copy so a row does not keep the whole batch array it came from alive
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        self._remember(key, vector)
+        if self.disk is not None:
+            self.disk.put(key, vector)
+
+    def _remember(self, key: bytes, vector: np.ndarray) -> None:
+        size = vector.nbytes + len(key)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key).nbytes + len(key)
+        self._entries[key] = vector
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            old_key, old_vector = self._entries.popitem(last=False)
+            self._bytes -= old_vector.nbytes + len(old_key)
+            self.evictions += 1
+
+    def stats(self) -> Dict:
+        """Reports hit, miss and eviction counters for both tiers.
+
+        Returns:
+            dict: The current cache statistics.
+        """
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0,
+            "evictions": self.evictions,
+            "disk_entries": len(self.disk.rows) if self.disk else None,
+            "disk_evictions": self.disk.evictions if self.disk else None,
+        }
+
+    def flush(self) -> None:
+        """Writes the disk tier to its files."""
+        if self.disk is not None:
+            self.disk.flush()
+
+    def close(self) -> None:
+        """Writes the disk tier to its files and releases it to other processes."""
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
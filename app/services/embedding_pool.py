@@ -0,0 +1,392 @@
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import multiprocessing
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+logger = logging.getLogger("uvicorn")
+
+
+def _worker_main(conn, model_name: str, options: Dict, torch_threads: int) -> None:
+    """Entry point of an embedding process: loads the model and serves jobs.
+
+    A job is the name of the shared memory block to write into and a list of
+    texts; the embeddings are written there as float32 rows and only the row
+    count is sent back. ``None`` (or the parent going away) stops the loop.
+    """
+    # The parent decides when to stop; Ctrl-C reaches the whole process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import torch
+    from app.services.embedding import load_encoder
+
+    torch.set_num_threads(torch_threads)
+    try:
+        encoder = load_encoder(model_name, **options)
+    except Exception as exc:
+        conn.send(("error", repr(exc)))
+        return
+    conn.send(("ready", encoder.dimensions))
+    buffers: Dict[str, SharedMemory] = {}
+    try:
+        while True:
+            try:
+                job = conn.recv()
+            except EOFError:
+                break
+            if job is None:
+                break
+            name, texts, batch_size = job
+            try:
+                if name not in buffers:
+                    buffers[name] = SharedMemory(name=name)
+                embeddings = encoder.encode_batch(texts, batch_size=batch_size)
+                out = np.ndarray(
+                    embeddings.shape, dtype=np.float32, buffer=buffers[name].buf
+                )
+                out[:] = embeddings
+                conn.send(("ok", len(texts)))
+            except Exception as exc:
+                conn.send(("error", repr(exc)))
+    finally:
+        for buffer in buffers.values():
+            buffer.close()
+        conn.close()
+
+
+class _Worker:
+    """One embedding process, its pipe and its shared output buffer."""
+
+    def __init__(self, index: int, context, target_args: tuple):
+        self.index = index
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn,) + target_args,
+            name=f"embedding-{index}",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.buffer: Optional[SharedMemory] = None
+        self.dimensions = 0
+        self.busy = False
+        self.jobs = 0
+        self.texts = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.started_at = time.time()
+
+    def wait_ready(self, max_rows: int) -> None:
+        """Blocks until the model is loaded, then allocates the output buffer."""
+        try:
+            status, value = self.conn.recv()
+        except EOFError:
+            status, value = "error", "exited during start-up"
+        if status != "ready":
+            raise RuntimeError(f"Embedding worker {self.index} failed: {value}")
+        self.dimensions = value
+        self.buffer = SharedMemory(create=True, size=max_rows * value * 4)
+
+    @property
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def call(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """Embeds texts in the worker process; blocks until it is done."""
+        try:
+            self.conn.send((self.buffer.name, texts, batch_size))
+            status, value = self.conn.recv()
+        except (EOFError, OSError) as exc:
+            raise RuntimeError(f"Embedding worker {self.index} exited") from exc
+        if status != "ok":
+            raise RuntimeError(f"Embedding worker {self.index} failed: {value}")
+        # Copy the rows out so the buffer can take the next job
+        return np.ndarray(
+            (value, self.dimensions), dtype=np.float32, buffer=self.buffer.buf
+        ).copy()
+
+    def stop(self, timeout: float) -> None:
+        """Asks the process to exit, kills it after ``timeout`` seconds."""
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            logger.warning(f"Killing embedding worker {self.index}")
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer.unlink()
+            self.buffer = None
+
+    def health(self) -> Dict:
+        return {
+            "index": self.index,
+            "pid": self.process.pid,
+            "alive": self.alive,
+            "busy": self.busy,
+            "jobs": self.jobs,
+            "texts": self.texts,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+        }
+
+
+class EmbeddingProcessPool:
+    """Runs TextEncoder inference in a pool of separate processes.
+
+    Each process loads its own encoder and owns a shared memory block that
+    the parent allocates for its output, so embeddings come back as raw
+    float32 rows rather than pickled lists. Requests larger than
+    ``max_rows`` are split across processes. A process that dies is replaced
+    and the job it was running fails. A replacement that fails to start is
+    retried with exponential backoff; while every process is down and a
+    restart has failed, jobs fail at once rather than wait.
+
+    Args:
+        model_name (str): The Hugging Face model name or local directory.
+        processes (int): How many embedding processes to run.
+        torch_threads (int): Torch intra-op threads in each process.
+        batch_size (int): Texts per forward pass inside a process.
+        max_rows (int): Texts per job, which sizes the output buffers.
+        restart_backoff (float): Seconds before retrying a failed restart,
+            doubled after each failure up to a minute.
+        **options: TextEncoder keyword arguments.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        processes: int,
+        torch_threads: int = 1,
+        batch_size: int = 32,
+        max_rows: int = 256,
+        restart_backoff: float = 1.0,
+        **options,
+    ):
+        self.model_name = model_name
+        self.processes = processes
+        self.torch_threads = torch_threads
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+        self.restart_backoff = restart_backoff
+        self.options = options
+        # spawn: workers must not inherit torch thread pools or the event loop
+        self._context = multiprocessing.get_context("spawn")
+        # Threads waiting on the worker pipes, one per worker
+        self._threads = ThreadPoolExecutor(
+            max_workers=processes, thread_name_prefix="embedding-pool"
+        )
+        self._workers: List[_Worker] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._start_lock = asyncio.Lock()
+        self._replacements: set = set()
+        # Workers alive or idle, restarts that failed, and whether the pool is
+        # down: no worker left and a restart failed
+        self._live = 0
+        self._failing: set = set()
+        self._down = asyncio.Event()
+        self._closing = asyncio.Event()
+        self.restarts = 0
+        self.started = False
+        self.closed = False
+
+    async def _spawn(self, index: int) -> _Worker:
+        worker = _Worker(
+            index,
+            self._context,
+            (self.model_name, self.options, self.torch_threads),
+        )
+        try:
+            await asyncio.to_thread(worker.wait_ready, self.max_rows)
+        except Exception:
+            await asyncio.to_thread(worker.stop, 1)
+            raise
+        return worker
+
+    async def start(self) -> None:
+        """Starts the processes and waits for their models to load."""
+        async with self._start_lock:
+            if self.started:
+                return
+            if self.closed:
+                raise RuntimeError("The embedding pool is closed")
+            logger.info(f"Starting {self.processes} embedding processes")
+            self._idle = asyncio.Queue()
+            results = await asyncio.gather(
+                *(self._spawn(i) for i in range(self.processes)),
+                return_exceptions=True,
+            )
+            errors = [r for r in results if isinstance(r, BaseException)]
+            self._workers = [r for r in results if not isinstance(r, BaseException)]
+            if errors:
+                await asyncio.gather(
+                    *(asyncio.to_thread(worker.stop, 1) for worker in self._workers)
+                )
+                self._workers = []
+                raise errors[0]
+            for worker in self._workers:
+                self._idle.put_nowait(worker)
+            self._live = len(self._workers)
+            self.started = True
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Embeds texts on the pool, starting it on first use.
+
+        Returns:
+            np.ndarray: Unit-length float32 embeddings, one row per text.
+        """
+        if not self.started:
+            await self.start()
+        chunks = [
+            texts[start : start + self.max_rows]
+            for start in range(0, len(texts), self.max_rows)
+        ]
+        results = await asyncio.gather(*(self._run(chunk) for chunk in chunks))
+        if not results:
+            return np.zeros((0, self._workers[0].dimensions), dtype=np.float32)
+        return np.concatenate(results)
+
+    async def _acquire(self) -> _Worker:
+        """Waits for an idle worker.
+
+        Raises:
+            RuntimeError: The pool is down, now or while waiting.
+        """
+        if not self._down.is_set():
+            get = asyncio.ensure_future(self._idle.get())
+            down = asyncio.ensure_future(self._down.wait())
+            try:
+                await asyncio.wait({get, down}, return_when=asyncio.FIRST_COMPLETED)
+            except BaseException:
+                # Cancelled just as a worker was handed over: give it back
+                if get.done() and not get.cancelled():
+                    self._idle.put_nowait(get.result())
+                raise
+            finally:
+                down.cancel()
+                if not get.done():
+                    get.cancel()
+            if not get.cancelled():
+                return get.result()
+        raise RuntimeError("No embedding process is running, restarting them")
+
+    def _update_down(self) -> None:
+        if self._live == 0 and self._failing:
+            self._down.set()
+        else:
+            self._down.clear()
+
+    async def _run(self, texts: List[str]) -> np.ndarray:
+        worker = await self._acquire()
+        worker.busy = True
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(
+                self._threads, worker.call, texts, self.batch_size
+            )
+        except Exception as exc:
+            worker.errors += 1
+            worker.last_error = repr(exc)
+            raise
+        else:
+            worker.jobs += 1
+            worker.texts += len(texts)
+            return result
+        finally:
+            worker.busy = False
+            if worker.alive:
+                self._idle.put_nowait(worker)
+            elif not self.closed:
+                self._live -= 1
+                task = asyncio.create_task(self._replace(worker))
+                self._replacements.add(task)
+                task.add_done_callback(self._replacements.discard)
+
+    async def _replace(self, worker: _Worker) -> None:
+        logger.warning(
+            f"Embedding worker {worker.index} (pid {worker.process.pid}) died, "
+            "restarting it"
+        )
+        await asyncio.to_thread(worker.stop, 0)
+        delay = self.restart_backoff
+        while True:
+            try:
+                replacement = await self._spawn(worker.index)
+                break
+            except Exception:
+                logger.exception(
+                    f"Could not restart embedding worker {worker.index}, "
+                    f"retrying in {delay:.1f}s"
+                )
+                self._failing.add(worker.index)
+                self._update_down()
+            # Back off, unless the pool closes meanwhile
+            try:
+                await asyncio.wait_for(self._closing.wait(), delay)
+                return
+            except asyncio.TimeoutError:
+                delay = min(delay * 2, 60)
+        self._failing.discard(worker.index)
+        self._workers[self._workers.index(worker)] = replacement
+        self.restarts += 1
+        if self.closed:
+            await asyncio.to_thread(replacement.stop, 1)
+        else:
+            self._live += 1
+            self._update_down()
+            self._idle.put_nowait(replacement)
+
+    @property
+    def healthy(self) -> bool:
+        """Whether the pool is started and every process is alive."""
+        return self.started and all(worker.alive for worker in self._workers)
+
+    def health(self) -> Dict:
+        """Reports the state of every embedding process.
+
+        Returns:
+            dict: Pool totals and one entry per process.
+        """
+        return {
+            "processes": self.processes,
+            "started": self.started,
+            "healthy": self.healthy,
+            "restarts": self.restarts,
+            "down": self._down.is_set(),
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            "workers": [worker.health() for worker in self._workers],
+        }
+
+    async def close(self, timeout: float = 10) -> None:
+        """Lets running jobs finish, then stops the processes.
+
+        Processes still running after ``timeout`` seconds are killed.
+        """
+        self.closed = True
+        self._closing.set()
+        if self._replacements:
+            await asyncio.gather(*self._replacements, return_exceptions=True)
+        if self.started:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            # A worker is idle once its job is done; dead ones never return
+            for _ in [w for w in self._workers if w.alive]:
+                try:
+                    await asyncio.wait_for(
+                        self._idle.get(), max(deadline - loop.time(), 0)
+                    )
+                except asyncio.TimeoutError:
+                    break
+            await asyncio.gather(
+                *(asyncio.to_thread(worker.stop, 1) for worker in self._workers)
+            )
+        self._threads.shutdown(wait=True)
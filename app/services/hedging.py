@@ -0,0 +1,167 @@
+from collections import deque
+from typing import Dict, Optional, Sequence
+import asyncio
+import functools
+import inspect
+import itertools
+import time
+import numpy as np
+from app.core.deadlines import within_deadline
+from app.core.metrics import HEDGED_CALLS
+
+# Client calls that only read, so sending them twice is safe
+HEDGED_OPERATIONS = frozenset({"query_points", "query_batch_points", "retrieve"})
+
+
+class LatencyTracker:
+    """Recent latencies of one operation and a percentile of them.
+
+    The percentile is recomputed every ``refresh`` samples rather than on
+    every call.
+    """
+
+    def __init__(self, window: int = 1000, refresh: int = 16):
+        self.samples: deque = deque(maxlen=window)
+        self.refresh = refresh
+        self._since_refresh = 0
+        self._percentiles: Dict[float, float] = {}
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self._since_refresh += 1
+        if self._since_refresh >= self.refresh:
+            self._since_refresh = 0
+            self._percentiles.clear()
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        if q not in self._percentiles:
+            self._percentiles[q] = float(np.percentile(self.samples, q))
+        return self._percentiles[q]
+
+
+class ResilientClient:
+    """Wraps Qdrant clients to bound every call by the request deadline and
+    to hedge slow reads.
+
+    Every coroutine call is cancelled once the current request's deadline
+    passes (see app.core.deadlines), raising DeadlineExceeded. Searches and
+    retrieves (HEDGED_OPERATIONS) still running after the ``percentile``
+    latency of recent calls, and at least ``min_delay`` seconds, are sent a
+    second time, to the next replica client when there are some, and the
+    first answer wins; the other attempt is cancelled. Hedges are limited to
+    about ``budget`` of the reads (plus a small burst) so a slow Qdrant is
+    not sent twice the load. Other attributes are those of the first client.
+
+    Args:
+        client: The Qdrant client calls are sent to first.
+        replicas (list): Clients of other Qdrant nodes serving the same
+            collections, tried in turn for hedges. Hedges go to ``client``
+            itself when empty.
+        hedge (bool): Hedge reads at all.
+        percentile (float): Latency percentile after which a read is hedged.
+        min_delay (float): Seconds a read runs before it may be hedged.
+        budget (float): Hedges allowed per read, on average.
+        min_samples (int): Reads of an operation observed before hedging it.
+    """
+
+    def __init__(
+        self,
+        client,
+        replicas: Sequence = (),
+        hedge: bool = True,
+        percentile: float = 95,
+        min_delay: float = 0.01,
+        budget: float = 0.1,
+        min_samples: int = 20,
+    ):
+        self._client = client
+        self._replicas = list(replicas)
+        self._next_replica = itertools.cycle(self._replicas or [client])
+        self.hedge = hedge
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.budget = budget
+        self.min_samples = min_samples
+        self._tokens = 10 * budget
+        self._latency: Dict[str, LatencyTracker] = {}
+        self.hedges = 0
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if not inspect.iscoroutinefunction(attribute):
+            return attribute
+        if self.hedge and name in HEDGED_OPERATIONS:
+            self._latency[name] = LatencyTracker()
+
+            @functools.wraps(attribute)
+            async def call(*args, **kwargs):
+                return await within_deadline(
+                    self._hedged(name, args, kwargs), f"qdrant.{name}"
+                )
+
+        else:
+
+            @functools.wraps(attribute)
+            async def call(*args, **kwargs):
+                return await within_deadline(
+                    attribute(*args, **kwargs), f"qdrant.{name}"
+                )
+
+        # Cache the wrapper so later calls skip __getattr__
+        setattr(self, name, call)
+        return call
+
+    def hedge_delay(self, name: str) -> Optional[float]:
+        """Seconds after which a read is hedged, None while it may not be."""
+        tracker = self._latency[name]
+        if len(tracker.samples) < self.min_samples or self._tokens < 1:
+            return None
+        return max(tracker.percentile(self.percentile), self.min_delay)
+
+    async def _attempt(self, client, name: str, args, kwargs):
+        start = time.perf_counter()
+        try:
+            return await getattr(client, name)(*args, **kwargs)
+        finally:
+            # Cancelled attempts count with the time they ran, a lower bound
+            self._latency[name].add(time.perf_counter() - start)
+
+    async def _hedged(self, name: str, args, kwargs):
+        # Each read earns a fraction of a hedge, up to a small burst
+        self._tokens = min(self._tokens + self.budget, 10 * self.budget + 1)
+        delay = self.hedge_delay(name)
+        if delay is None:
+            return await self._attempt(self._client, name, args, kwargs)
+        primary = asyncio.ensure_future(self._attempt(self._client, name, args, kwargs))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary.result()
+            self._tokens -= 1
+            self.hedges += 1
+            replica = next(self._next_replica)
+            tasks.add(asyncio.ensure_future(self._attempt(replica, name, args, kwargs)))
+            error = None
+            # The first answer wins; an error only counts once both failed
+            while tasks:
+                done, tasks = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        winner = "primary" if task is primary else "hedge"
+                        HEDGED_CALLS.labels(name, winner).inc()
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def close(self, **kwargs) -> None:
+        await self._client.close(**kwargs)
+        for replica in self._replicas:
+            await replica.close(**kwargs)
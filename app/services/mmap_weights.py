@@ -0,0 +1,100 @@
+from typing import Dict
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+
+logger = logging.getLogger("uvicorn")
+
+SAFETENSORS_FILE = "model.safetensors"
+
+# safetensors dtype names -> torch dtype attribute names
+DTYPES = {
+    "F64": "float64",
+    "F32": "float32",
+    "F16": "float16",
+    "BF16": "bfloat16",
+    "I64": "int64",
+    "I32": "int32",
+    "I16": "int16",
+    "I8": "int8",
+    "U8": "uint8",
+    "BOOL": "bool",
+}
+
+
+def safetensors_path(model_name: str, local_files_only: bool = False) -> str:
+    """Finds the safetensors weights of a local model directory or Hub model."""
+    if os.path.isdir(model_name):
+        path = os.path.join(model_name, SAFETENSORS_FILE)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No {SAFETENSORS_FILE} in {model_name}")
+        return path
+    from huggingface_hub import hf_hub_download
+
+    return hf_hub_download(
+        model_name, SAFETENSORS_FILE, local_files_only=local_files_only
+    )
+
+
+def mmap_safetensors(path: str) -> Dict[str, "torch.Tensor"]:
+    """Maps the tensors of a safetensors file into memory without copying them.
+
+    The file is mapped copy-on-write, so the tensors are backed by the page
+    cache: every process mapping the same file shares one copy of the weights
+    until a tensor is written to.
+    """
+    import torch
+
+    with open(path, "rb") as f:
+        (header_size,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_size))
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    header.pop("__metadata__", None)
+    tensors = {}
+    for name, info in header.items():
+        dtype = getattr(torch, DTYPES[info["dtype"]])
+        begin, end = info["data_offsets"]
+        tensor = torch.frombuffer(
+            buffer,
+            dtype=torch.uint8,
+            count=end - begin,
+            offset=8 + header_size + begin,
+        )
+        tensors[name] = tensor.view(dtype).reshape(info["shape"])
+    return tensors
+
+
+def load_mmap_model(model_name: str, local_files_only: bool = False):
+    """Loads a BertModel whose weights are memory-mapped from safetensors.
+
+    Checkpoints saved from a task model (e.g. BertForPreTraining) have their
+    encoder weights under a "bert." prefix; it is stripped, head weights are
+    dropped and legacy LayerNorm "gamma"/"beta" names are renamed.
+
+    Returns:
+        BertModel: The model, in eval mode.
+    """
+    from transformers import BertConfig, BertModel
+
+    config = BertConfig.from_pretrained(model_name, local_files_only=local_files_only)
+    model = BertModel(config)
+    path = safetensors_path(model_name, local_files_only=local_files_only)
+    logger.info(f"Memory-mapping weights from {path}")
+    expected = model.state_dict()
+    state = {}
+    for name, tensor in mmap_safetensors(path).items():
+        name = name.removeprefix("bert.")
+        name = re.sub(r"\.gamma$", ".weight", re.sub(r"\.beta$", ".bias", name))
+        if name in expected:
+            state[name] = tensor
+    missing = {name for name, _ in model.named_parameters()} - set(state)
+    if missing:
+        raise ValueError(f"{path} is missing weights: {', '.join(sorted(missing))}")
+    # assign=True makes the parameters the mapped tensors instead of copying
+    # them into the randomly initialised ones, which are then freed. Buffers
+    # missing from the file (e.g. position_ids) keep their initial values.
+    model.load_state_dict(state, strict=False, assign=True)
+    return model.eval()
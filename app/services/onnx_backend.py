@@ -0,0 +1,224 @@
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+import fcntl
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+
+logger = logging.getLogger("uvicorn")
+
+# Inputs of the exported graph, in the order BertModel takes them
+ONNX_INPUTS = ("input_ids", "attention_mask", "token_type_ids")
+# ONNX operator set the model is exported with
+ONNX_OPSET = 18
+# Files whose contents identify the weights of a local model directory
+WEIGHT_FILES = ("config.json", "*.safetensors", "*.bin")
+
+
+def default_onnx_dir(model_name: str) -> str:
+    """Where the ONNX export of a model is kept when EMBEDDING_ONNX_DIR is unset.
+
+    Next to the weights for a local model directory, otherwise in a per-model
+    directory under ~/.cache/rag-api/onnx.
+    """
+    if os.path.isdir(model_name):
+        return os.path.join(model_name, "onnx")
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]", "--", model_name)
+    return os.path.join(os.path.expanduser("~/.cache/rag-api/onnx"), safe_name)
+
+
+@contextmanager
+def _partial_file(path: str) -> Iterator[str]:
+    """A uniquely named file next to ``path``, renamed onto it on success.
+
+    Concurrent writers each get their own file, so one never renames away
+    another's, and a failed write leaves nothing behind.
+    """
+    fd, partial = tempfile.mkstemp(
+        dir=os.path.dirname(path),
+        prefix=f".{os.path.basename(path)}.",
+        suffix=".partial",
+    )
+    os.close(fd)
+    try:
+        yield partial
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+@contextmanager
+def _export_lock(onnx_dir: str) -> Iterator[None]:
+    """Holds an exclusive lock on an export directory across processes.
+
+    Embedding processes and API workers starting together take turns, so
+    the model is exported once and the others load the finished file.
+    """
+    os.makedirs(onnx_dir, exist_ok=True)
+    with open(os.path.join(onnx_dir, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def model_revision(model_name: str, local_files_only: bool = False) -> str:
+    """Identifies the weights an export is made from.
+
+    The commit hash for a Hugging Face model, and a hash of the config and
+    weight files for a local directory, so changed weights are noticed.
+    """
+    if os.path.isdir(model_name):
+        digest = hashlib.blake2b(digest_size=16)
+        for pattern in WEIGHT_FILES:
+            for name in sorted(glob.glob(os.path.join(model_name, pattern))):
+                digest.update(os.path.basename(name).encode("utf-8") + b"\0")
+                with open(name, "rb") as f:
+                    while chunk := f.read(1 << 20):
+                        digest.update(chunk)
+        return digest.hexdigest()
+    from transformers.utils.hub import cached_file, extract_commit_hash
+
+    config = cached_file(model_name, "config.json", local_files_only=local_files_only)
+    return extract_commit_hash(config, None) or "unknown"
+
+
+def _read_export_meta(onnx_dir: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(onnx_dir, "model.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_export_meta(onnx_dir: str, meta: Dict) -> None:
+    with _partial_file(os.path.join(onnx_dir, "model.json")) as partial:
+        with open(partial, "w") as f:
+            json.dump(meta, f)
+
+
+def export_onnx(model, path: str) -> None:
+    """Exports the last hidden state of a BertModel to ONNX.
+
+    Batch size and sequence length stay dynamic. The file is written next to
+    ``path`` and renamed into place, so a partial export is never loaded.
+    """
+    import torch
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                token_type_ids=token_type_ids,
+            ).last_hidden_state
+
+    # Separate tensors per input: the exporter merges inputs that alias each
+    # other, which would make input_ids an alias of attention_mask
+    input_ids = torch.full((2, 8), 5, dtype=torch.long)
+    attention_mask = torch.ones((2, 8), dtype=torch.long)
+    token_type_ids = torch.zeros((2, 8), dtype=torch.long)
+    batch, sequence = torch.export.Dim("batch"), torch.export.Dim("sequence")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _partial_file(path) as partial:
+        torch.onnx.export(
+            LastHiddenState(model).eval(),
+            (input_ids, attention_mask, token_type_ids),
+            partial,
+            input_names=list(ONNX_INPUTS),
+            opset_version=ONNX_OPSET,
+            output_names=["last_hidden_state"],
+            dynamic_shapes={name: {0: batch, 1: sequence} for name in ONNX_INPUTS},
+            dynamo=True,
+            external_data=False,
+            verbose=False,
+        )
+
+
+def quantize_onnx(path: str, quantized_path: str) -> None:
+    """Writes a dynamically int8-quantized copy of an ONNX model.
+
+    Weights are stored as int8 and activations are quantized on the fly, so
+    no calibration data is needed.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    with _partial_file(quantized_path) as partial:
+        quantize_dynamic(path, partial, weight_type=QuantType.QInt8)
+
+
+def load_session(
+    model_name: str,
+    onnx_dir: Optional[str] = None,
+    quantize: bool = False,
+    threads: Optional[int] = None,
+    local_files_only: bool = False,
+    max_length: Optional[int] = None,
+):
+    """Opens an ONNX Runtime session for a model, exporting it on first use.
+
+    The PyTorch model is only loaded when no export exists yet; later starts
+    read the ONNX file alone. ``model.json`` records the model, revision
+    (see model_revision), max_length and opset an export was made for, and
+    an export that does not match is made again. Processes starting
+    together export under a file lock, so only the first one exports.
+
+    Args:
+        model_name (str): The Hugging Face model name or local directory.
+        onnx_dir (str, optional): Where exports are kept.
+            Default: see default_onnx_dir.
+        quantize (bool): Use the dynamically int8-quantized export.
+        threads (int, optional): Intra-op threads. Default: ONNX Runtime's.
+        local_files_only (bool): Never download model files.
+        max_length (int, optional): The encoder's maximum sequence length.
+
+    Returns:
+        onnxruntime.InferenceSession: The session.
+    """
+    import onnxruntime
+
+    onnx_dir = onnx_dir or default_onnx_dir(model_name)
+    path = os.path.join(onnx_dir, "model.onnx")
+    quantized_path = os.path.join(onnx_dir, "model.int8.onnx")
+    meta = {
+        "model": model_name,
+        "revision": model_revision(model_name, local_files_only),
+        "max_length": max_length,
+        "opset": ONNX_OPSET,
+    }
+    current = _read_export_meta(onnx_dir) == meta
+    if not (current and os.path.exists(quantized_path if quantize else path)):
+        with _export_lock(onnx_dir):
+            if _read_export_meta(onnx_dir) != meta or not os.path.exists(path):
+                from transformers import BertModel
+
+                logger.info(f"Exporting '{model_name}' to {path}")
+                model = BertModel.from_pretrained(
+                    model_name, local_files_only=local_files_only
+                )
+                export_onnx(model.eval(), path)
+                # The quantized copy was made from the previous export
+                if os.path.exists(quantized_path):
+                    os.remove(quantized_path)
+                _write_export_meta(onnx_dir, meta)
+            if quantize and not os.path.exists(quantized_path):
+                logger.info(f"Quantizing {path} to int8")
+                quantize_onnx(path, quantized_path)
+    if quantize:
+        path = quantized_path
+    options = onnxruntime.SessionOptions()
+    if threads:
+        options.intra_op_num_threads = threads
+    return onnxruntime.InferenceSession(
+        path, sess_options=options, providers=["CPUExecutionProvider"]
+    )
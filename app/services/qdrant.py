@@ -1,21 +1,130 @@
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict, Optional
+import asyncio
 import logging
 import json
+import httpx
 from fastapi import HTTPException
 from app.core.config import settings
-from app.models.models import Collection, CollectionCreate, Document
-from qdrant_client import QdrantClient
+from app.core.deadlines import DeadlineExceeded
+from app.core.metrics import InstrumentedClient
+from app.services.embedded_store import EmbeddedClient
+from app.services.hedging import ResilientClient
+from app.services.search_cache import SearchCache
+from app.services.sparse import SPARSE_VECTOR
+from app.models.models import (
+    Collection,
+    CollectionCreate,
+    CollectionUpdate,
+    Document,
+    DocumentCount,
+    DocumentIdList,
+    DocumentRetrieve,
+    ExportQuery,
+    HybridSearchQuery,
+    PayloadFilter,
+    SearchQuery,
+)
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.http import models
+from qdrant_client.http.exceptions import (
+    ResponseHandlingException,
+    UnexpectedResponse,
+)
 
 logger = logging.getLogger("uvicorn")
 
 
+def create_client(host: Optional[str] = None) -> AsyncQdrantClient:
+    """Builds the AsyncQdrantClient described by the application settings.
+
+    The client owns a single connection pool (HTTP keep-alive connections, or
+    gRPC channels when QDRANT_PREFER_GRPC is set) that is shared by every
+    request, so it should be created once per process. With VECTOR_BACKEND set
+    to "embedded", an EmbeddedClient answering the same calls is returned
+    instead.
+
+    Args:
+        host (str): Connect to this "host" or "host:port" instead of
+            QDRANT_HOST and QDRANT_PORT, e.g. a replica.
+
+    Returns:
+        AsyncQdrantClient: A client connected to the configured Qdrant instance.
+    """
+    if settings.VECTOR_BACKEND == "embedded":
+        return EmbeddedClient(
+            settings.EMBEDDED_STORE_PATH,
+            compact_ratio=settings.EMBEDDED_COMPACT_RATIO,
+        )
+    if settings.VECTOR_BACKEND != "qdrant":
+        raise ValueError(
+            f"Unknown VECTOR_BACKEND '{settings.VECTOR_BACKEND}', "
+            "expected 'qdrant' or 'embedded'"
+        )
+    port = settings.QDRANT_PORT
+    if host is None:
+        host = settings.QDRANT_HOST
+    elif ":" in host:
+        host, port = host.rsplit(":", 1)
+    if settings.QDRANT_LOCATION:
+        return AsyncQdrantClient(location=settings.QDRANT_LOCATION)
+    if settings.QDRANT_PREFER_GRPC:
+        return AsyncQdrantClient(
+            host=host,
+            port=int(port),
+            grpc_port=settings.QDRANT_GRPC_PORT,
+            prefer_grpc=True,
+            timeout=settings.QDRANT_TIMEOUT,
+            pool_size=settings.QDRANT_POOL_SIZE,
+            grpc_options={
+                "grpc.keepalive_time_ms": int(settings.QDRANT_KEEPALIVE_EXPIRY * 1000),
+            },
+        )
+    return AsyncQdrantClient(
+        host=host,
+        port=int(port),
+        timeout=settings.QDRANT_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=settings.QDRANT_POOL_SIZE,
+            max_keepalive_connections=settings.QDRANT_POOL_SIZE,
+            keepalive_expiry=settings.QDRANT_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def create_replica_clients() -> List[AsyncQdrantClient]:
+    """Builds a client for each of QDRANT_REPLICA_HOSTS, for hedged reads."""
+    if settings.VECTOR_BACKEND != "qdrant" or settings.QDRANT_LOCATION:
+        return []
+    hosts = [h.strip() for h in settings.QDRANT_REPLICA_HOSTS.split(",")]
+    return [create_client(host) for host in hosts if host]
+
+
 class QdrantService:
-    def __init__(self):
+    def __init__(self, client: Optional[AsyncQdrantClient] = None):
         # Initialize Qdrant client
-        self.client = QdrantClient(
-            host=settings.QDRANT_HOST,
-            port=settings.QDRANT_PORT,
+        replicas = []
+        if client is None:
+            client = create_client()
+            replicas = create_replica_clients()
+        # Calls are bounded by the request deadline; reads are hedged unless
+        # the store runs in-process, where a second attempt cannot be faster
+        self.client = ResilientClient(
+            client,
+            replicas=replicas,
+            hedge=settings.HEDGE_ENABLED
+            and settings.VECTOR_BACKEND == "qdrant"
+            and not settings.QDRANT_LOCATION,
+            percentile=settings.HEDGE_PERCENTILE,
+            min_delay=settings.HEDGE_MIN_DELAY_MS / 1000,
+            budget=settings.HEDGE_BUDGET,
+        )
+        if settings.METRICS_ENABLED or settings.PROFILING_ENABLED:
+            self.client = InstrumentedClient(self.client)
+        self.search_cache = SearchCache(
+            max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS,
+            enabled=settings.SEARCH_CACHE_ENABLED,
+            settle_seconds=settings.SEARCH_CACHE_SETTLE_SECONDS,
         )
         self.distance = {
             "cosine": models.Distance.COSINE,
@@ -24,6 +133,10 @@ class QdrantService:
             "manhattan": models.Distance.MANHATTAN,
         }
 
+    async def close(self) -> None:
+        """Closes the underlying client and releases its connection pool."""
+        await self.client.close()
+
     async def create_collection(self, collection_data: CollectionCreate) -> Dict:
         """
         Creates a new collection in Qdrant using the provided collection data.
@@ -44,26 +157,156 @@ class QdrantService:
                     }
                 },
             }
+        optimizer = collection_data.optimizer
         try:
-            self.client.create_collection(
+            await self.client.create_collection(
                 collection_name=collection_data.name,
                 vectors_config=models.VectorParams(
                     size=collection_data.dimensions,
                     distance=self.distance[collection_data.distance],
+                    on_disk=collection_data.on_disk,
+                ),
+                shard_number=collection_data.shard_number,
+                replication_factor=collection_data.replication_factor,
+                on_disk_payload=collection_data.on_disk_payload,
+                hnsw_config=(
+                    models.HnswConfigDiff(**collection_data.hnsw.model_dump())
+                    if collection_data.hnsw
+                    else None
+                ),
+                optimizers_config=(
+                    models.OptimizersConfigDiff(**optimizer.model_dump())
+                    if optimizer
+                    else None
+                ),
+                quantization_config=self._quantization_config(
+                    collection_data.quantization
+                ),
+                # Qdrant applies the IDF part of BM25 from its own statistics
+                sparse_vectors_config=(
+                    {
+                        SPARSE_VECTOR: models.SparseVectorParams(
+                            modifier=models.Modifier.IDF
+                        )
+                    }
+                    if collection_data.sparse
+                    else None
+                ),
+            )
+        except Exception as e:
+            logger.warning(f"Could not create collection: {e}")
+            return self._error_response(e)
+        try:
+            await self._create_payload_indexes(
+                collection_data.name, collection_data.payload_indexes
+            )
+        except Exception as e:
+            # Remove the half-configured collection so the request can be retried
+            logger.warning(f"Could not index collection, removing it: {e}")
+            try:
+                await self.client.delete_collection(collection_data.name)
+            except Exception as cleanup_error:
+                logger.warning(f"Could not remove collection: {cleanup_error}")
+            return self._error_response(e)
+        logger.info(f"Collection {collection_data.name} successfully created!")
+        return {"success": True}
+
+    async def update_collection(
+        self, collection: Collection, update: CollectionUpdate
+    ) -> Dict:
+        """Changes the performance settings of an existing collection
+
+        Only the settings given in the update are changed. Qdrant applies them
+        in the background by re-optimizing the collection's segments.
+
+        Returns:
+            dict: A dictionary containing the status of the operation and
+                any details.
+        """
+        # HNSW parameters are set for the whole collection, as on creation
+        vector_update = None
+        if update.on_disk is not None:
+            vector_update = {"": models.VectorParamsDiff(on_disk=update.on_disk)}
+        collection_params = None
+        if update.replication_factor is not None or update.on_disk_payload is not None:
+            collection_params = models.CollectionParamsDiff(
+                replication_factor=update.replication_factor,
+                on_disk_payload=update.on_disk_payload,
+            )
+        try:
+            await self.client.update_collection(
+                collection_name=collection.name,
+                vectors_config=vector_update,
+                collection_params=collection_params,
+                hnsw_config=(
+                    models.HnswConfigDiff(**update.hnsw.model_dump())
+                    if update.hnsw
+                    else None
                 ),
+                optimizers_config=(
+                    models.OptimizersConfigDiff(**update.optimizer.model_dump())
+                    if update.optimizer
+                    else None
+                ),
+                quantization_config=self._quantization_config(update.quantization),
             )
-            logger.info(f"Collection {collection_data.name} successfully created!")
+            await self._create_payload_indexes(collection.name, update.payload_indexes)
             return {"success": True}
         except Exception as e:
-            content = e.__dict__
-            status_code = content["status_code"]
-            status_info = json.loads(content["content"])
-            logger.warning(f"Could not retrieve collection: {e.__dict__}")
-            return {
-                "success": False,
-                "status_code": status_code,
-                "content": status_info,
-            }
+            logger.warning(f"Could not update collection: {e}")
+            return self._error_response(e)
+
+    @staticmethod
+    def _quantization_config(quantization):
+        """Translates a QuantizationConfig into its Qdrant configuration."""
+        if quantization is None:
+            return None
+        if quantization.type == "scalar":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8,
+                    quantile=quantization.quantile,
+                    always_ram=quantization.always_ram,
+                )
+            )
+        if quantization.type == "product":
+            return models.ProductQuantization(
+                product=models.ProductQuantizationConfig(
+                    compression=models.CompressionRatio(quantization.compression),
+                    always_ram=quantization.always_ram,
+                )
+            )
+        if quantization.type == "binary":
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(
+                    always_ram=quantization.always_ram
+                )
+            )
+        return models.Disabled.DISABLED
+
+    async def _create_payload_indexes(self, collection_name: str, indexes) -> None:
+        for index in indexes:
+            await self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name=index.field,
+                field_schema=models.PayloadSchemaType(index.schema_type),
+            )
+
+    @staticmethod
+    def _error_response(e: Exception) -> Dict:
+        """Builds a failed operation from an exception raised by the client."""
+        if isinstance(e, DeadlineExceeded):
+            return {"success": False, "status_code": 504, "content": str(e)}
+        if isinstance(e, (ResponseHandlingException, ConnectionError, TimeoutError)):
+            # Qdrant could not be reached, or did not answer in time
+            return {"success": False, "status_code": 503, "content": str(e)}
+        if isinstance(e, UnexpectedResponse):
+            try:
+                content = json.loads(e.content)
+            except ValueError:
+                content = e.content.decode("utf-8", errors="replace")
+            return {"success": False, "status_code": e.status_code, "content": content}
+        return {"success": False, "status_code": 400, "content": str(e)}
 
     async def list_collections(self) -> Dict:
         """Lists all collections in the Qdrant database
@@ -74,13 +317,13 @@ class QdrantService:
                 successful.
         """
         try:
-            response = self.client.get_collections()
+            response = await self.client.get_collections()
             collections = [c.name for c in response.collections]
             return {"success": True, "content": collections}
 
         except Exception as e:
             logger.warning(f"Could not retrieve collections: {e}")
-            return {"success": False, "content": e}
+            return self._error_response(e)
 
     async def get_collection_info(self, collection_data: Collection) -> Dict:
         """Lists details about a collection in the Qdrant database
@@ -91,103 +334,597 @@ class QdrantService:
                 successful.
         """
         try:
-            response = self.client.get_collection(collection_data.name)
-            info = json.loads(response.model_dump_json())
+            response = await self.client.get_collection(collection_data.name)
+            info = response.model_dump(mode="json")
             return {"success": True, "content": info}
 
         except Exception as e:
-            content = e.__dict__
-            status_code = content["status_code"]
-            status_info = json.loads(content["content"])
-            logger.warning(f"Could not retrieve collection: {e.__dict__}")
-            return {
-                "success": False,
-                "status_code": status_code,
-                "content": status_info,
-            }
+            logger.warning(f"Could not retrieve collection: {e}")
+            return self._error_response(e)
 
     async def delete_collection(self, collection_data: Collection) -> Dict:
         """Removes a collection in the Qdrant database
 
         Returns:
             dict: A dictionary containing the status of the operation and
-                any details.
+                any details; not successful if the collection was not found.
         """
-        success = self.client.delete_collection(collection_data.name)
-        return success
+        try:
+            if await self.client.delete_collection(collection_data.name):
+                return {"success": True}
+            return {
+                "success": False,
+                "status_code": 400,
+                "content": "Collection not found.",
+            }
+        except Exception as e:
+            logger.warning(f"Could not delete collection: {e}")
+            return self._error_response(e)
+        finally:
+            self.search_cache.forget(collection_data.name)
 
     async def upload_document(self, collection: Collection, document: Document) -> Dict:
 
         try:
-            response = self.client.upsert(
+            response = await self.client.upsert(
                 collection_name=collection.name,
                 points=[
                     models.PointStruct(
                         id=document.id,
-                        vector=document.vector,
+                        vector=self._vectors(document),
                         payload=document.metadata,
                     )
                 ],
             )
-            return {"success": True, "content": json.loads(response.model_dump_json())}
+            return {"success": True, "content": dict(response)}
         except Exception as e:
-            content = e.__dict__
-            status_info = content
-            logger.warning(f"Could not add document: {content}")
-            return {
-                "success": False,
-                "status_code": 400,
-                "content": status_info,
-            }
+            logger.warning(f"Could not add document: {e}")
+            return self._error_response(e)
+        finally:
+            self.search_cache.invalidate(collection.name)
+
+    async def upload_documents(
+        self,
+        collection: Collection,
+        documents: List[Document],
+        chunk_size: Optional[int] = None,
+        wait: bool = True,
+    ) -> Dict:
+        """Upserts many documents as fixed-size chunks sent to Qdrant concurrently.
+
+        Each chunk is a single upsert call, and at most INGEST_MAX_CONCURRENCY
+        chunks are in flight at once. A failing chunk does not stop the others,
+        so the caller only needs to retry the chunks reported as failed.
+
+        Args:
+            collection (Collection): The collection to upload to.
+            documents (List[Document]): The documents to upload.
+            chunk_size (int, optional): Documents per upsert call.
+                Default: INGEST_CHUNK_SIZE.
+            wait (bool): Wait for each chunk to be applied before returning.
+
+        Returns:
+            dict: The status of the operation and a per-chunk report.
+        """
+        chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+        semaphore = asyncio.Semaphore(settings.INGEST_MAX_CONCURRENCY)
+
+        async def upload_chunk(index: int, start: int) -> Dict:
+            chunk = documents[start : start + chunk_size]
+            async with semaphore:
+                return await self._upsert_chunk(collection, chunk, index, start, wait)
+
+        chunks = await asyncio.gather(
+            *(
+                upload_chunk(i, start)
+                for i, start in enumerate(range(0, len(documents), chunk_size))
+            )
+        )
+        return self._ingest_report(chunks, total=len(documents))
+
+    async def ingest_stream(
+        self,
+        collection: Collection,
+        documents: AsyncIterator[Document],
+        chunk_size: Optional[int] = None,
+        wait: bool = True,
+    ) -> Dict:
+        """Upserts documents from an async iterator in bounded, pipelined chunks.
+
+        The iterator is consumed while earlier chunks are still being written.
+        Full chunks go through a queue holding at most INGEST_MAX_CONCURRENCY
+        chunks, so a slow Qdrant stops the iterator from being read further and
+        memory stays bounded no matter how many documents the iterator yields.
+
+        Args:
+            collection (Collection): The collection to upload to.
+            documents (AsyncIterator[Document]): The documents to upload.
+            chunk_size (int, optional): Documents per upsert call.
+                Default: INGEST_CHUNK_SIZE.
+            wait (bool): Wait for each chunk to be applied before returning.
+
+        Returns:
+            dict: The status of the operation and a per-chunk report.
+        """
+        chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.INGEST_MAX_CONCURRENCY)
+        chunks = []
+
+        async def writer():
+            while (item := await queue.get()) is not None:
+                chunks.append(await self._upsert_chunk(collection, *item, wait))
+
+        writers = [
+            asyncio.create_task(writer())
+            for _ in range(settings.INGEST_MAX_CONCURRENCY)
+        ]
+        total = index = 0
+        try:
+            chunk = []
+            async for document in documents:
+                chunk.append(document)
+                if len(chunk) == chunk_size:
+                    await queue.put((chunk, index, total))
+                    total, index, chunk = total + len(chunk), index + 1, []
+            if chunk:
+                await queue.put((chunk, index, total))
+                total += len(chunk)
+            for _ in writers:
+                await queue.put(None)
+            await asyncio.gather(*writers)
+        finally:
+            for task in writers:
+                task.cancel()
+        chunks.sort(key=lambda c: c["chunk"])
+        return self._ingest_report(chunks, total=total)
+
+    async def _upsert_chunk(
+        self,
+        collection: Collection,
+        chunk: List[Document],
+        index: int,
+        offset: int,
+        wait: bool,
+    ) -> Dict:
+        """Upserts one chunk of documents and reports the outcome."""
+        report = {"chunk": index, "offset": offset, "count": len(chunk)}
+        try:
+            response = await self.client.upsert(
+                collection_name=collection.name,
+                points=[
+                    models.PointStruct(
+                        id=d.id, vector=self._vectors(d), payload=d.metadata
+                    )
+                    for d in chunk
+                ],
+                wait=wait,
+            )
+            report.update(success=True, status=response.status)
+        except Exception as e:
+            logger.warning(f"Could not add chunk {index}: {e}")
+            report.update(
+                success=False,
+                status_code=self._error_response(e)["status_code"],
+                error=str(e),
+            )
+        finally:
+            self.search_cache.invalidate(collection.name, applied=wait)
+        return report
+
+    @staticmethod
+    def _ingest_report(chunks: List[Dict], total: int) -> Dict:
+        uploaded = sum(c["count"] for c in chunks if c["success"])
+        return {
+            "success": uploaded == total,
+            "status_code": 400 if uploaded == 0 and total else 207,
+            "content": {
+                "uploaded": uploaded,
+                "failed": total - uploaded,
+                "chunks": chunks,
+            },
+        }
 
     async def get_document(self, collection: Collection, document: Document) -> Dict:
         try:
-            response = self.client.retrieve(
+            response = await self.client.retrieve(
                 collection_name=collection.name,
                 ids=[document.id],
                 with_vectors=True,
             )
             return {
                 "success": True,
-                "content": json.loads(response[0].model_dump_json()),
+                "content": self._point_dict(response[0]),
             }
         except Exception as e:
             logger.warning(f"Could not get document: {e}")
-            return {
-                "success": False,
-                "status_code": 400,
-                "content": e,
-            }
+            return self._error_response(e)
+
+    async def get_documents(
+        self, collection: Collection, selection: DocumentRetrieve
+    ) -> Dict:
+        """Retrieves many documents by id in a single request.
+
+        Returns:
+            dict: A dictionary containing the status of the operation and
+                the documents that were found, in no particular order.
+        """
+        try:
+            response = await self.client.retrieve(
+                collection_name=collection.name,
+                ids=selection.ids,
+                with_payload=selection.with_payload,
+                with_vectors=selection.with_vectors,
+            )
+            return {"success": True, "content": [self._point_dict(p) for p in response]}
+        except Exception as e:
+            logger.warning(f"Could not get documents: {e}")
+            return self._error_response(e)
+
+    async def delete_documents(
+        self, collection: Collection, selection: DocumentIdList
+    ) -> Dict:
+        """Deletes many documents by id in a single request.
+
+        Returns:
+            dict: A dictionary containing the status of the operation and
+                any details.
+        """
+        return await self._delete(collection, models.PointIdsList(points=selection.ids))
+
+    async def delete_by_filter(
+        self, collection: Collection, selection: PayloadFilter
+    ) -> Dict:
+        """Deletes every document matching a payload filter in a single request.
+
+        Returns:
+            dict: A dictionary containing the status of the operation and
+                any details.
+        """
+        try:
+            selector = models.FilterSelector(
+                filter=self._parse_filter(selection.filter)
+            )
+        except ValueError as e:
+            return {"success": False, "status_code": 400, "content": str(e)}
+        return await self._delete(collection, selector)
+
+    async def _delete(self, collection: Collection, selector) -> Dict:
+        try:
+            response = await self.client.delete(
+                collection_name=collection.name, points_selector=selector
+            )
+            return {"success": True, "content": dict(response)}
+        except Exception as e:
+            logger.warning(f"Could not delete documents: {e}")
+            return self._error_response(e)
+        finally:
+            self.search_cache.invalidate(collection.name)
+
+    async def count_documents(
+        self, collection: Collection, query: DocumentCount
+    ) -> Dict:
+        """Counts the documents in a collection, optionally matching a filter.
+
+        Returns:
+            dict: A dictionary containing the status of the operation and
+                the count if the operation was successful.
+        """
+        try:
+            count_filter = self._parse_filter(query.filter)
+        except ValueError as e:
+            return {"success": False, "status_code": 400, "content": str(e)}
+        try:
+            response = await self.client.count(
+                collection_name=collection.name,
+                count_filter=count_filter,
+                exact=query.exact,
+            )
+            return {"success": True, "content": {"count": response.count}}
+        except Exception as e:
+            logger.warning(f"Could not count documents: {e}")
+            return self._error_response(e)
+
+    async def scroll_documents(
+        self, collection: Collection, query: ExportQuery
+    ) -> AsyncIterator[List[Dict]]:
+        """Walks a whole collection in id order, one page per scroll call.
+
+        Only one page is held at a time, so any collection can be walked in
+        constant memory.
+
+        Raises:
+            ValueError: The filter is not a valid Qdrant filter.
+            Exception: Any error from the client, e.g. an unknown collection.
+
+        Yields:
+            List[dict]: The next page of documents.
+        """
+        scroll_filter = self._parse_filter(query.filter)
+        offset = query.offset
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=collection.name,
+                scroll_filter=scroll_filter,
+                limit=query.batch_size,
+                offset=offset,
+                with_payload=query.with_payload,
+                with_vectors=query.with_vectors,
+            )
+            if points:
+                yield [self._point_dict(p) for p in points]
+            if offset is None:
+                return
+
+    async def export_documents(
+        self, collection: Collection, query: ExportQuery
+    ) -> Dict:
+        """Starts walking a collection with scroll_documents.
+
+        The first page is fetched right away, so an unknown collection or an
+        invalid filter is reported before anything is streamed.
+
+        Returns:
+            dict: A dictionary containing the status of the operation and,
+                if it was successful, an async iterator over the pages.
+        """
+        pages = self.scroll_documents(collection, query)
+        try:
+            first_page = await anext(pages, None)
+        except Exception as e:
+            logger.warning(f"Could not export collection: {e}")
+            return self._error_response(e)
+
+        async def all_pages():
+            if first_page is not None:
+                yield first_page
+            async for page in pages:
+                yield page
+
+        return {"success": True, "content": all_pages()}
 
     async def update_document(self, collection: Collection, document: Document) -> Dict:
         try:
-            response = self.client.update_vectors(
+            response = await self.client.update_vectors(
                 collection_name=collection.name,
-                points=[models.PointVectors(id=document.id, vector=document.vector)],
+                points=[
+                    models.PointVectors(id=document.id, vector=self._vectors(document))
+                ],
             )
-            return {"success": True, "content": json.loads(response.model_dump_json())}
+            return {"success": True, "content": dict(response)}
         except Exception as e:
             logger.warning(f"Could not update document: {e}")
-            return {
-                "success": False,
-                "status_code": 400,
-                "content": str(e),
-            }
+            return self._error_response(e)
+        finally:
+            self.search_cache.invalidate(collection.name)
+
+    async def update_documents(
+        self, collection: Collection, documents: List[Document], wait: bool = True
+    ) -> Dict:
+        """Replaces the vectors of many documents in one call.
+
+        Returns:
+            dict: The status of the operation.
+        """
+        try:
+            response = await self.client.update_vectors(
+                collection_name=collection.name,
+                points=[
+                    models.PointVectors(id=d.id, vector=self._vectors(d))
+                    for d in documents
+                ],
+                wait=wait,
+            )
+            return {"success": True, "content": dict(response)}
+        except Exception as e:
+            logger.warning(f"Could not update documents: {e}")
+            return self._error_response(e)
+        finally:
+            self.search_cache.invalidate(collection.name, applied=wait)
 
     async def delete_document(self, collection: Collection, document: Document) -> Dict:
         try:
-            response = self.client.delete(
+            response = await self.client.delete(
                 collection_name=collection.name,
                 points_selector=models.PointIdsList(points=[document.id]),
             )
-            return {"success": True, "content": json.loads(response.model_dump_json())}
+            return {"success": True, "content": dict(response)}
+        except Exception as e:
+            logger.warning(f"Could not delete document: {e}")
+            return self._error_response(e)
+        finally:
+            self.search_cache.invalidate(collection.name)
+
+    async def search(self, collection: Collection, query: SearchQuery) -> Dict:
+        """Finds the points closest to a query vector.
+
+        Returns:
+            dict: A dictionary containing the status of the operation and
+                the scored points if the operation was successful.
+        """
+        try:
+            request = self._query_request(query)
+        except ValueError as e:
+            return {"success": False, "status_code": 400, "content": str(e)}
+        key = self.search_cache.key(collection.name, query)
+        if key is not None and (points := self.search_cache.get(key)) is not None:
+            return {"success": True, "content": points}
+        try:
+            response = await self.client.query_points(
+                collection_name=collection.name,
+                query=request.query,
+                query_filter=request.filter,
+                search_params=request.params,
+                limit=request.limit,
+                offset=request.offset,
+                score_threshold=request.score_threshold,
+                with_payload=request.with_payload,
+                with_vectors=request.with_vector,
+            )
+            points = [self._point_dict(p) for p in response.points]
+            if key is not None:
+                self.search_cache.put(key, points)
+            return {"success": True, "content": points}
         except Exception as e:
-            content = e.__dict__
-            logger.warning(content)
-            status_info = content
-            logger.warning(f"Could not delete document: {content}")
+            logger.warning(f"Could not search collection: {e}")
+            return self._error_response(e)
+
+    async def search_batch(
+        self, collection: Collection, queries: List[SearchQuery]
+    ) -> Dict:
+        """Runs several searches against a collection in a single request.
+
+        Returns:
+            dict: A dictionary containing the status of the operation and
+                one list of scored points per query if the operation was
+                successful.
+        """
+        try:
+            requests = [self._query_request(q) for q in queries]
+        except ValueError as e:
+            return {"success": False, "status_code": 400, "content": str(e)}
+        keys = [self.search_cache.key(collection.name, q) for q in queries]
+        results = [
+            self.search_cache.get(key) if key is not None else None for key in keys
+        ]
+        # Only the queries that missed the cache are sent to Qdrant
+        missing = [i for i, points in enumerate(results) if points is None]
+        try:
+            if missing:
+                responses = await self.client.query_batch_points(
+                    collection_name=collection.name,
+                    requests=[requests[i] for i in missing],
+                )
+                for i, r in zip(missing, responses):
+                    results[i] = [self._point_dict(p) for p in r.points]
+                    if keys[i] is not None:
+                        self.search_cache.put(keys[i], results[i])
+            return {"success": True, "content": results}
+        except Exception as e:
+            logger.warning(f"Could not search collection: {e}")
+            return self._error_response(e)
+
+    async def hybrid_search(
+        self,
+        collection: Collection,
+        vector: List[float],
+        sparse_vector: Dict[str, list],
+        query: HybridSearchQuery,
+    ) -> Dict:
+        """Fuses a dense and a BM25 sparse search with reciprocal rank fusion.
+
+        Both searches run as prefetches of a single query, each fetching
+        ``prefetch_limit`` candidates that match the filter, and Qdrant ranks
+        the union by RRF. The collection must have been created with sparse
+        vectors. Results are not cached.
+
+        Returns:
+            dict: A dictionary containing the status of the operation and
+                the fused points, best first, if the operation was successful.
+        """
+        try:
+            query_filter = self._parse_filter(query.filter)
+        except ValueError as e:
+            return {"success": False, "status_code": 400, "content": str(e)}
+        limit = query.prefetch_limit or 4 * (query.top_k + query.offset)
+        try:
+            response = await self.client.query_points(
+                collection_name=collection.name,
+                prefetch=[
+                    models.Prefetch(
+                        query=vector,
+                        filter=query_filter,
+                        params=(
+                            models.SearchParams(
+                                hnsw_ef=query.hnsw_ef, exact=query.exact
+                            )
+                            if query.hnsw_ef or query.exact
+                            else None
+                        ),
+                        limit=limit,
+                    ),
+                    models.Prefetch(
+                        query=models.SparseVector(**sparse_vector),
+                        using=SPARSE_VECTOR,
+                        filter=query_filter,
+                        limit=limit,
+                    ),
+                ],
+                query=models.FusionQuery(fusion=models.Fusion.RRF),
+                limit=query.top_k,
+                offset=query.offset,
+                score_threshold=query.score_threshold,
+                with_payload=query.with_payload,
+                with_vectors=query.with_vectors,
+            )
             return {
-                "success": False,
-                "status_code": 400,
-                "content": status_info,
+                "success": True,
+                "content": [self._point_dict(p) for p in response.points],
             }
+        except Exception as e:
+            logger.warning(f"Could not search collection: {e}")
+            return self._error_response(e)
+
+    @staticmethod
+    def _vectors(document: Document):
+        """The vectors of a point: the dense vector, plus the sparse one if any."""
+        if document.sparse_vector is None:
+            return document.vector
+        vectors = {
+            SPARSE_VECTOR: models.SparseVector(**document.sparse_vector.model_dump())
+        }
+        if document.vector is not None:
+            vectors[""] = document.vector
+        return vectors
+
+    @staticmethod
+    def _point_dict(point) -> Dict:
+        """Converts a client point model to a dict.
+
+        Points holding a sparse vector come back with named vectors; the dense
+        vector is kept under "vector" and the sparse one moved to
+        "sparse_vector", the way Documents are uploaded.
+        """
+        point = dict(point)
+        vectors = point.get("vector")
+        if isinstance(vectors, dict):
+            sparse = vectors.get(SPARSE_VECTOR)
+            point["vector"] = vectors.get("")
+            if sparse is not None:
+                point["sparse_vector"] = {
+                    "indices": sparse.indices,
+                    "values": sparse.values,
+                }
+        return point
+
+    @staticmethod
+    def _parse_filter(payload_filter: Optional[dict]) -> Optional[models.Filter]:
+        """Validates a payload filter given as a dict.
+
+        Raises:
+            ValueError: The filter is not a valid Qdrant filter.
+        """
+        if not payload_filter:
+            return None
+        return models.Filter.model_validate(payload_filter)
+
+    @staticmethod
+    def _query_request(query: SearchQuery) -> models.QueryRequest:
+        """Translates a SearchQuery into a Qdrant QueryRequest.
+
+        Raises:
+            ValueError: The filter is not a valid Qdrant filter.
+        """
+        return models.QueryRequest(
+            query=query.vector,
+            limit=query.top_k,
+            offset=query.offset,
+            score_threshold=query.score_threshold,
+            filter=QdrantService._parse_filter(query.filter),
+            with_payload=query.with_payload,
+            with_vector=query.with_vectors,
+            params=(
+                models.SearchParams(hnsw_ef=query.hnsw_ef, exact=query.exact)
+                if query.hnsw_ef or query.exact
+                else None
+            ),
+        )
@@ -0,0 +1,152 @@
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def mmr_select(
+    query: np.ndarray,
+    candidates: np.ndarray,
+    k: int,
+    mmr_lambda: float = 0.5,
+    duplicate_threshold: Optional[float] = None,
+) -> Tuple[List[int], int]:
+    """Orders candidates by maximal marginal relevance.
+
+    Each step picks the candidate maximizing
+    ``mmr_lambda * sim(query, c) - (1 - mmr_lambda) * max sim(c, selected)``,
+    with cosine similarities. The candidate-to-candidate similarities are one
+    matrix product, and the similarity of every candidate to the selection is
+    kept as a running maximum, so a step is one vectorized update rather than
+    a loop over the selection. Candidates at least ``duplicate_threshold``
+    similar to a selected one are suppressed as near-duplicates.
+
+    Args:
+        query (np.ndarray): The query vector.
+        candidates (np.ndarray): One candidate vector per row.
+        k (int): The number of candidates to select.
+        mmr_lambda (float): 1 ranks by relevance only, 0 by diversity only.
+        duplicate_threshold (float): Cosine similarity above which a candidate
+            is a near-duplicate of a selected one. None keeps duplicates.
+
+    Returns:
+        tuple: The selected row indices, in order, and the number of
+            candidates suppressed as near-duplicates.
+    """
+    if len(candidates) == 0 or k <= 0:
+        return [], 0
+    vectors = _normalized(np.asarray(candidates, dtype=np.float32))
+    relevance = vectors @ _normalized(np.asarray(query, dtype=np.float32))
+    similarity = vectors @ vectors.T
+    redundancy = np.zeros(len(vectors), dtype=np.float32)
+    available = np.ones(len(vectors), dtype=bool)
+    duplicates = np.zeros(len(vectors), dtype=bool)
+    selected: List[int] = []
+    while len(selected) < k and available.any():
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+        if duplicate_threshold is not None:
+            near = available & (similarity[best] >= duplicate_threshold)
+            duplicates |= near
+            available &= ~near
+    return selected, int(duplicates.sum())
+
+
+def pack_to_budget(
+    token_counts: List[int], max_tokens: int, limit: Optional[int] = None
+) -> List[int]:
+    """Greedily keeps items, in order, while their tokens fit the budget.
+
+    An item too large for what is left is skipped, and the items after it
+    can still fill the remaining budget, up to ``limit`` items.
+
+    Returns:
+        List[int]: The indices of the items kept.
+    """
+    kept, used = [], 0
+    for i, count in enumerate(token_counts):
+        if limit is not None and len(kept) == limit:
+            break
+        if used + count <= max_tokens:
+            kept.append(i)
+            used += count
+    return kept
+
+
+def postprocess(
+    points: List[Dict],
+    query_vector: np.ndarray,
+    top_k: int,
+    mmr_lambda: float = 0.5,
+    duplicate_threshold: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    tokenizer=None,
+    text_field: str = "text",
+) -> Dict:
+    """Diversifies search candidates and packs them into a token budget.
+
+    Candidates are ordered by maximal marginal relevance (see mmr_select)
+    and near-duplicates dropped. Without ``max_tokens`` the first ``top_k``
+    are kept. With it, the payload text of every candidate is tokenized,
+    without special tokens, and candidates are taken in order while they fit
+    the budget, skipping any too long for what is left, up to ``top_k``.
+
+    Args:
+        points (list): Search results as point dicts, with their vectors.
+            Points without a dense vector count as unrelated to everything.
+        query_vector (np.ndarray): The query embedding.
+        top_k (int): The most points to return.
+        mmr_lambda (float): Trade-off between relevance (1) and diversity (0).
+        duplicate_threshold (float): Similarity marking near-duplicates.
+        max_tokens (int): The token budget, or None for no budget.
+        tokenizer: The tokenizer counting tokens; required with max_tokens.
+        text_field (str): The payload field holding each point's text.
+
+    Returns:
+        dict: The kept points, best first, the tokens they use, and how many
+            candidates were dropped as duplicates or skipped for the budget.
+    """
+    vectors = np.zeros((len(points), len(query_vector)), dtype=np.float32)
+    for i, point in enumerate(points):
+        if point.get("vector") is not None:
+            vectors[i] = point["vector"]
+    order, duplicates = mmr_select(
+        query_vector,
+        vectors,
+        top_k if max_tokens is None else len(points),
+        mmr_lambda=mmr_lambda,
+        duplicate_threshold=duplicate_threshold,
+    )
+    ranked = [points[i] for i in order]
+    if max_tokens is None:
+        return {
+            "points": ranked,
+            "candidates": len(points),
+            "duplicates": duplicates,
+            "over_budget": 0,
+            "tokens": None,
+        }
+    texts = [(p.get("payload") or {}).get(text_field) for p in ranked]
+    present = [i for i, text in enumerate(texts) if isinstance(text, str)]
+    counts = [0] * len(ranked)
+    if present:
+        encoded = tokenizer([texts[i] for i in present], add_special_tokens=False)
+        for i, ids in zip(present, encoded["input_ids"]):
+            counts[i] = len(ids)
+    kept = pack_to_budget(counts, max_tokens, limit=top_k)
+    # Candidates passed over because they did not fit, before the last kept
+    over_budget = kept[-1] + 1 - len(kept) if kept else len(ranked)
+    return {
+        "points": [ranked[i] for i in kept],
+        "candidates": len(points),
+        "duplicates": duplicates,
+        "over_budget": over_budget,
+        "tokens": sum(counts[i] for i in kept),
+    }
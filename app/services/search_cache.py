@@ -0,0 +1,144 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Set
+import hashlib
+import itertools
+import json
+import time
+import numpy as np
+from app.models.models import SearchQuery
+
+
+class SearchCache:
+    """A TTL + LRU cache of search results, invalidated by collection writes.
+
+    Every collection has a generation that is part of each cache key.
+    QdrantService changes it after every write to the collection, so results
+    cached before the write are never served again and simply age out, and
+    results of searches that overlapped a write are not cached.
+
+    Writes sent with wait=False are acknowledged before Qdrant applies them,
+    so searches right after them may still see the old points. For
+    ``settle_seconds`` after such a write, results of the collection are not
+    cached; a write still unapplied after that can leave stale results
+    cached for up to the TTL.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl_seconds: float = 60.0,
+        enabled: bool = True,
+        settle_seconds: float = 5.0,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.enabled = enabled
+        self.settle_seconds = settle_seconds
+        self.disabled_collections: Set[str] = set()
+        self._entries: OrderedDict = OrderedDict()
+        # Generations come from one counter so a recreated collection never
+        # reuses the generation of a deleted one
+        self._counter = itertools.count(1)
+        self._generations: Dict[str, int] = {}
+        # Collections with wait=False writes, and when they are settled
+        self._unsettled: Dict[str, float] = {}
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+
+    def is_enabled(self, collection: str) -> bool:
+        return self.enabled and collection not in self.disabled_collections
+
+    def set_enabled(self, collection: str, enabled: bool) -> None:
+        """Turns caching on or off for one collection."""
+        if enabled:
+            self.disabled_collections.discard(collection)
+        else:
+            self.disabled_collections.add(collection)
+            self.invalidate(collection)
+
+    def invalidate(self, collection: str, applied: bool = True) -> None:
+        """Makes every cached result for the collection unreachable.
+
+        Args:
+            collection (str): The collection written to.
+            applied (bool): The write was applied before it was acknowledged,
+                i.e. it was not sent with wait=False.
+        """
+        self._generations[collection] = next(self._counter)
+        if not applied:
+            self._unsettled[collection] = time.monotonic() + self.settle_seconds
+
+    def forget(self, collection: str) -> None:
+        """Drops the cached results and statistics of a deleted collection.
+
+        The collection still moves to a new generation, so a search that
+        started before the delete cannot cache its results for a collection
+        recreated under the same name.
+        """
+        for key in [key for key in self._entries if key[0] == collection]:
+            del self._entries[key]
+        self._generations[collection] = next(self._counter)
+        for values in (self._unsettled, self._hits, self._misses):
+            values.pop(collection, None)
+
+    def _settling(self, collection: str) -> bool:
+        settled = self._unsettled.get(collection)
+        if settled is not None and settled <= time.monotonic():
+            del self._unsettled[collection]
+            settled = None
+        return settled is not None
+
+    def key(self, collection: str, query: SearchQuery) -> Optional[Hashable]:
+        """Builds the cache key of a search, or None if caching is off.
+
+        The query vector is quantized to float16, so queries that differ only
+        in insignificant digits share an entry.
+        """
+        if not self.is_enabled(collection) or self._settling(collection):
+            return None
+        vector = np.asarray(query.vector, dtype=np.float16).tobytes()
+        options = query.model_dump(exclude={"vector"})
+        digest = hashlib.blake2b(vector, digest_size=16)
+        digest.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+        return (collection, self._generations.get(collection, 0), digest.digest())
+
+    def get(self, key: Hashable):
+        collection = key[0]
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self._hits[collection] = self._hits.get(collection, 0) + 1
+            return entry[1]
+        if entry is not None:
+            del self._entries[key]
+        self._misses[collection] = self._misses.get(collection, 0) + 1
+        return None
+
+    def put(self, key: Hashable, value) -> None:
+        collection, generation, _ = key
+        if generation != self._generations.get(collection, 0):
+            # The collection was written to while the search ran
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self, collection: str) -> Dict:
+        """Reports whether caching is on for a collection and its hit rate.
+
+        Returns:
+            dict: The cache statistics of the collection.
+        """
+        hits = self._hits.get(collection, 0)
+        misses = self._misses.get(collection, 0)
+        return {
+            "enabled": self.is_enabled(collection),
+            "generation": self._generations.get(collection, 0),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+        }
@@ -0,0 +1,63 @@
+from collections import Counter
+from typing import Dict, List
+
+# Name of the sparse vector holding BM25 term weights in hybrid collections
+SPARSE_VECTOR = "bm25"
+
+
+class SparseEncoder:
+    """Builds BM25 sparse vectors over the vocabulary of a tokenizer.
+
+    A document vector holds the BM25 term-frequency part of each token's
+    weight, saturated by ``k1`` and normalized by document length with ``b``.
+    The IDF part is left to Qdrant, which keeps collection-wide document
+    frequencies when the sparse vector is configured with the IDF modifier.
+    Special tokens ([CLS], [SEP]) are not counted and texts are not truncated.
+
+    Args:
+        tokenizer: The Hugging Face tokenizer of the TextEncoder.
+        k1 (float): Term frequency saturation.
+        b (float): Document length normalization, from 0 (none) to 1 (full).
+        avg_length (float): The expected average document length, in tokens.
+    """
+
+    def __init__(
+        self, tokenizer, k1: float = 1.2, b: float = 0.75, avg_length: float = 256
+    ):
+        self.tokenizer = tokenizer
+        self.k1 = k1
+        self.b = b
+        self.avg_length = avg_length
+
+    def _token_ids(self, texts: List[str]) -> List[List[int]]:
+        return self.tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+
+    def encode_documents(self, texts: List[str]) -> List[Dict[str, list]]:
+        """Computes the BM25 term weights of documents.
+
+        Returns:
+            List[dict]: One sparse vector ("indices" and "values") per text.
+        """
+        vectors = []
+        for ids in self._token_ids(texts):
+            counts = Counter(ids)
+            norm = self.k1 * (1 - self.b + self.b * len(ids) / self.avg_length)
+            indices = sorted(counts)
+            vectors.append(
+                {
+                    "indices": indices,
+                    "values": [
+                        counts[i] * (self.k1 + 1) / (counts[i] + norm) for i in indices
+                    ],
+                }
+            )
+        return vectors
+
+    def encode_query(self, text: str) -> Dict[str, list]:
+        """Builds the sparse vector of a query: weight 1 for every distinct token.
+
+        Returns:
+            dict: The sparse vector, as "indices" and "values".
+        """
+        indices = sorted(set(self._token_ids([text])[0]))
+        return {"indices": indices, "values": [1.0] * len(indices)}
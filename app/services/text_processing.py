@@ -1,11 +1,100 @@
-from transformers import BertTokenizer, BertModel
+from typing import Dict, List, Optional
+import time
+from transformers import BertConfig, BertTokenizerFast, BertModel
+import numpy as np
 import torch
+from app.core.metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_LATENCY
+
+BACKENDS = ("torch", "onnx")
 
 
 class TextEncoder:
-    def __init__(self, model_name: str = "bert-base-uncased"):
-        self.tokenizer = BertTokenizer.from_pretrained(model_name)
-        self.model = BertModel.from_pretrained(model_name)
+    """Embeds text with a BERT model, on PyTorch or ONNX Runtime.
+
+    Args:
+        model_name (str): A Hugging Face model name or a local model directory.
+        max_length (int): Texts are truncated to this many tokens.
+        backend (str): "torch" for eager (or compiled) PyTorch, "onnx" for
+            ONNX Runtime on an export of the model.
+        quantize (bool): Run a dynamically int8-quantized model; onnx only.
+        torch_compile (bool): Compile the PyTorch model with torch.compile.
+        onnx_dir (str, optional): Where ONNX exports are kept.
+        threads (int, optional): ONNX Runtime intra-op threads.
+        local_files_only (bool): Never download model files, for offline use.
+        mmap_weights (bool): Memory-map the safetensors weights instead of
+            copying them, so processes loading the same model share them;
+            torch only.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "bert-base-uncased",
+        max_length: int = 512,
+        backend: str = "torch",
+        quantize: bool = False,
+        torch_compile: bool = False,
+        onnx_dir: Optional[str] = None,
+        threads: Optional[int] = None,
+        local_files_only: bool = False,
+        mmap_weights: bool = False,
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {list(BACKENDS)}")
+        if quantize and backend != "onnx":
+            raise ValueError("int8 quantization needs the onnx backend")
+        if mmap_weights and backend != "torch":
+            raise ValueError("memory-mapped weights need the torch backend")
+        self.tokenizer = BertTokenizerFast.from_pretrained(
+            model_name, local_files_only=local_files_only
+        )
+        self.backend = backend
+        self.max_length = max_length
+        self.model = self.session = None
+        if backend == "onnx":
+            from app.services.onnx_backend import load_session
+
+            self.config = BertConfig.from_pretrained(
+                model_name, local_files_only=local_files_only
+            )
+            self.session = load_session(
+                model_name,
+                onnx_dir=onnx_dir,
+                quantize=quantize,
+                threads=threads,
+                local_files_only=local_files_only,
+                max_length=max_length,
+            )
+            self._input_names = [i.name for i in self.session.get_inputs()]
+        else:
+            if mmap_weights:
+                from app.services.mmap_weights import load_mmap_model
+
+                self.model = load_mmap_model(
+                    model_name, local_files_only=local_files_only
+                )
+            else:
+                self.model = BertModel.from_pretrained(
+                    model_name, local_files_only=local_files_only
+                )
+                self.model.eval()
+            self.config = self.model.config
+            self._forward = (
+                torch.compile(self.model, dynamic=True) if torch_compile else self.model
+            )
+
+    @property
+    def dimensions(self) -> int:
+        """The size of the embeddings produced by the model."""
+        return self.config.hidden_size
+
+    def _hidden_states(self, inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        """Runs the model on tokenized inputs and returns its last hidden state."""
+        if self.session is not None:
+            feed = {name: inputs[name].astype(np.int64) for name in self._input_names}
+            return self.session.run(None, feed)[0]
+        with torch.inference_mode():
+            tensors = {key: torch.from_numpy(value) for key, value in inputs.items()}
+            return self._forward(**tensors).last_hidden_state.numpy()
 
     def encode(self, text: str) -> torch.Tensor:
         """
@@ -18,12 +107,57 @@ class TextEncoder:
             torch.Tensor: The embedding of the text document.
         """
         inputs = self.tokenizer(
-            text, return_tensors="pt", padding=True, truncation=True, max_length=512
+            text,
+            return_tensors="np",
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
         )
-        with torch.no_grad():
-            outputs = self.model(**inputs)
+        hidden = torch.from_numpy(self._hidden_states(dict(inputs)))
         # Using the mean pooled output for simplicity; other strategies might be more suitable depending on the use case
-        embeddings = outputs.last_hidden_state.mean(dim=1)
+        embeddings = hidden.mean(dim=1)
+        return embeddings
+
+    def encode_batch(
+        self, texts: List[str], batch_size: int = 32, normalize: bool = True
+    ) -> np.ndarray:
+        """
+        Encodes many texts at once, in micro-batches of similar length.
+
+        The texts are tokenized together, sorted by token count and padded per
+        micro-batch, so short texts are not padded up to the longest one. Mean
+        pooling ignores padding, so each row matches ``encode`` for that text.
+
+        Args:
+            texts (List[str]): The plain text documents to encode.
+            batch_size (int): The number of texts per forward pass.
+            normalize (bool): Scale each embedding to unit length.
+
+        Returns:
+            np.ndarray: A float32 array of shape (len(texts), dimensions), in
+                the order of ``texts``.
+        """
+        embeddings = np.empty((len(texts), self.dimensions), dtype=np.float32)
+        if not texts:
+            return embeddings
+        encoded = self.tokenizer(texts, truncation=True, max_length=self.max_length)
+        order = np.argsort([len(ids) for ids in encoded["input_ids"]], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            indices = order[start : start + batch_size]
+            inputs = self.tokenizer.pad(
+                {key: [encoded[key][i] for i in indices] for key in encoded},
+                return_tensors="np",
+            )
+            start_time = time.perf_counter()
+            hidden = self._hidden_states(dict(inputs))
+            EMBEDDING_LATENCY.observe(time.perf_counter() - start_time)
+            EMBEDDING_BATCH_SIZE.observe(len(indices))
+            mask = inputs["attention_mask"][..., None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1)
+            embeddings[indices] = pooled
+        if normalize:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.maximum(norms, 1e-12)
         return embeddings
 
 
@@ -0,0 +1,677 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import itertools
+import logging
+import os
+import time
+import uuid
+import orjson
+from app.core.config import settings
+from app.core.metrics import (
+    WRITE_BUFFER_DOCUMENTS,
+    WRITE_BUFFER_FLUSH_LAG,
+    WRITE_BUFFER_REJECTED,
+)
+from app.models.models import Collection, Document
+
+logger = logging.getLogger("uvicorn")
+
+OPERATIONS = ("upsert", "update")
+# Errors kept per job; the rest are only counted
+MAX_JOB_ERRORS = 10
+# Longest wait, in seconds, before retrying writes that failed temporarily
+MAX_RETRY_DELAY = 30.0
+
+
+class BufferFull(Exception):
+    """Raised when a write does not fit in the write buffer."""
+
+
+class WriteTooLarge(Exception):
+    """Raised when a write has more documents than the buffer can ever hold."""
+
+
+def _transient(status_code: Optional[int]) -> bool:
+    """Whether a failed write may succeed when retried.
+
+    No status code means Qdrant could not be reached. Timeouts, rate limits
+    and server errors are retried; other 4xx errors would fail again.
+    """
+    return status_code is None or status_code >= 500 or status_code in (408, 429)
+
+
+class WriteJob:
+    """Progress of one accepted write request."""
+
+    def __init__(self, job_id: str, collection: str, operation: str, total: int):
+        self.id = job_id
+        self.collection = collection
+        self.operation = operation
+        self.total = total
+        self.written = 0
+        self.superseded = 0
+        self.failed = 0
+        self.errors: List[str] = []
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def pending(self) -> int:
+        return self.total - self.written - self.superseded - self.failed
+
+    @property
+    def status(self) -> str:
+        if self.pending:
+            return "queued" if self.pending == self.total else "running"
+        if not self.failed:
+            return "done"
+        return "failed" if self.failed == self.total else "partial"
+
+    def record(self, outcome: str, error: Optional[str] = None) -> None:
+        """Counts one document as written, superseded or failed."""
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        if error is not None and len(self.errors) < MAX_JOB_ERRORS:
+            self.errors.append(error)
+        if not self.pending:
+            self.finished_at = time.time()
+
+    def report(self) -> Dict:
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "collection": self.collection,
+            "operation": self.operation,
+            "status": self.status,
+            "total": self.total,
+            "pending": self.pending,
+            "written": self.written,
+            "superseded": self.superseded,
+            "failed": self.failed,
+            "errors": self.errors,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "lag_seconds": round(end - self.created_at, 3),
+        }
+
+
+class _Entry:
+    """A buffered document, the jobs waiting on it and its log records."""
+
+    __slots__ = ("document", "jobs", "seqs", "accepted_at")
+
+    def __init__(self, document: Document, job: WriteJob, seq: int):
+        self.document = document
+        self.jobs = [job]
+        self.seqs = [seq]
+        self.accepted_at = time.time()
+
+
+class WriteBuffer:
+    """Accepts document writes into memory and flushes them to Qdrant later.
+
+    Writes are coalesced per collection: a document written again before it
+    is flushed replaces the buffered copy, and an update of a buffered
+    upsert is folded into it. Background workers flush a collection once it
+    holds ``flush_size`` documents or its oldest one has waited
+    ``flush_interval_ms``, one batch per collection at a time so writes to
+    the same document stay ordered. Documents count against ``max_documents``
+    until Qdrant has acknowledged them; beyond that ``submit`` raises
+    BufferFull.
+
+    Writes that fail temporarily (Qdrant unreachable, timeouts, 5xx) go back
+    into the buffer and are retried with exponential backoff. Writes Qdrant
+    rejects (4xx) fail their jobs; a rejected batch is split until the
+    rejected documents are isolated, so one bad document does not fail the
+    others.
+
+    With ``log_path`` set, every accepted write is appended to a local log
+    before ``submit`` returns, and acknowledged once it is written or has
+    failed for good. Writes still unacknowledged when the process stops are
+    replayed by ``start``. The log is rewritten without its acknowledged
+    writes once ``max_documents`` of them have accumulated.
+
+    Args:
+        qdrant_service (QdrantService): Where the writes are flushed to.
+        max_documents (int): Buffered and in-flight documents at most.
+        flush_size (int): Documents per flush.
+        flush_interval_ms (float): Longest a document waits to be flushed.
+        workers (int): Collections flushed concurrently.
+        log_path (str, optional): The append-only log file.
+        max_jobs (int): Finished jobs kept for status queries.
+    """
+
+    def __init__(
+        self,
+        qdrant_service,
+        max_documents: Optional[int] = None,
+        flush_size: Optional[int] = None,
+        flush_interval_ms: Optional[float] = None,
+        workers: Optional[int] = None,
+        log_path: Optional[str] = None,
+        max_jobs: Optional[int] = None,
+    ):
+        self.qdrant_service = qdrant_service
+        self.max_documents = max_documents or settings.WRITE_BUFFER_MAX_DOCUMENTS
+        self.flush_size = flush_size or settings.WRITE_BUFFER_FLUSH_SIZE
+        self.flush_interval = (
+            flush_interval_ms or settings.WRITE_BUFFER_FLUSH_INTERVAL_MS
+        ) / 1000
+        self.workers = workers or settings.WRITE_BUFFER_WORKERS
+        self.log_path = log_path or settings.WRITE_BUFFER_LOG_PATH
+        self.max_jobs = max_jobs or settings.WRITE_BUFFER_MAX_JOBS
+        # collection -> operation -> document id -> entry, oldest first
+        self._pending: Dict[str, Dict[str, OrderedDict]] = {}
+        # collection -> acceptance time of the oldest document being flushed
+        self._flushing: Dict[str, float] = {}
+        # collection -> (time before which it is not retried, current delay)
+        self._backoff: Dict[str, Tuple[float, float]] = {}
+        self._jobs: OrderedDict = OrderedDict()
+        self._size = 0
+        self._seq = itertools.count(1)
+        self._log = None
+        self._acked = 0
+        self._compacting = False
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._closing = False
+        self.flushes = 0
+        self.written = 0
+        self.failed = 0
+        self.retried = 0
+        self.rejected = 0
+
+    async def start(self) -> None:
+        """Replays the log, if any, and starts the flush workers."""
+        if self.log_path:
+            await asyncio.to_thread(self._open_log)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(
+        self, collection: str, operation: str, documents: List[Document]
+    ) -> WriteJob:
+        """Accepts documents for writing and returns the job tracking them.
+
+        Raises:
+            ValueError: A document has no id, or the operation is unknown
+            WriteTooLarge: There are more documents than the buffer holds
+            BufferFull: The buffer cannot take this many more documents
+        """
+        if operation not in OPERATIONS:
+            raise ValueError(f"operation must be one of {list(OPERATIONS)}")
+        if any(document.id is None for document in documents):
+            raise ValueError("Buffered writes need a document id")
+        if len(documents) > self.max_documents:
+            raise WriteTooLarge(
+                f"The write buffer holds at most {self.max_documents} documents"
+            )
+        if self._closing or self._size + len(documents) > self.max_documents:
+            self.rejected += len(documents)
+            WRITE_BUFFER_REJECTED.inc(len(documents))
+            raise BufferFull(
+                f"The write buffer holds {self._size} of {self.max_documents} "
+                "documents; retry later"
+            )
+        job = self._new_job(uuid.uuid4().hex, collection, operation, len(documents))
+        for document in documents:
+            seq = next(self._seq)
+            if self._log is not None:
+                self._log.write(
+                    orjson.dumps(
+                        {
+                            "seq": seq,
+                            "job": job.id,
+                            "collection": collection,
+                            "operation": operation,
+                            "document": document.model_dump(mode="json"),
+                        }
+                    )
+                    + b"\n"
+                )
+            self._add(collection, operation, document, job, seq)
+        if self._log is not None:
+            self._log.flush()
+        # Idle workers recompute when the next flush is due
+        self._wakeup.set()
+        return job
+
+    def job(self, job_id: str) -> Optional[WriteJob]:
+        return self._jobs.get(job_id)
+
+    def _new_job(
+        self, job_id: str, collection: str, operation: str, total: int
+    ) -> WriteJob:
+        job = WriteJob(job_id, collection, operation, total)
+        self._jobs[job_id] = job
+        # Forget the oldest finished jobs; unfinished ones are bounded by the
+        # buffer size
+        while len(self._jobs) > self.max_jobs:
+            oldest = next(iter(self._jobs.values()))
+            if oldest.pending:
+                break
+            self._jobs.popitem(last=False)
+        return job
+
+    def _add(
+        self,
+        collection: str,
+        operation: str,
+        document: Document,
+        job: WriteJob,
+        seq: int,
+    ) -> None:
+        pending = self._pending.setdefault(
+            collection, {name: OrderedDict() for name in OPERATIONS}
+        )
+        upserts, updates = pending["upsert"], pending["update"]
+        if operation == "update" and document.id in upserts:
+            # Fold the new vectors into the buffered upsert
+            entry = upserts[document.id]
+            entry.document = entry.document.model_copy(
+                update={
+                    "vector": document.vector,
+                    "sparse_vector": document.sparse_vector,
+                }
+            )
+            entry.jobs.append(job)
+            entry.seqs.append(seq)
+            return
+        entry = _Entry(document, job, seq)
+        # A later write replaces the buffered one; an upsert also replaces a
+        # buffered vector update, since it sets the vectors itself
+        replaced = [updates] if operation == "update" else [upserts, updates]
+        for buffered in replaced:
+            previous = buffered.pop(document.id, None)
+            if previous is not None:
+                for earlier in previous.jobs:
+                    earlier.record("superseded")
+                entry.seqs = previous.seqs + entry.seqs
+                self._size -= 1
+        pending[operation][document.id] = entry
+        self._size += 1
+        WRITE_BUFFER_DOCUMENTS.set(self._size)
+
+    def _collection_size(self, collection: str) -> int:
+        pending = self._pending.get(collection)
+        return sum(map(len, pending.values())) if pending else 0
+
+    def _oldest(self, collection: str) -> Optional[float]:
+        entries = [
+            next(iter(buffered.values()))
+            for buffered in self._pending[collection].values()
+            if buffered
+        ]
+        return min((e.accepted_at for e in entries), default=None)
+
+    def _take(self):
+        """Picks the due collection waiting longest and takes a batch from it.
+
+        Returns:
+            tuple: The collection, the operation and the entries, or None
+                when nothing is due.
+        """
+        now = time.time()
+        due = []
+        for collection in self._pending:
+            if collection in self._flushing or self._retry_at(collection) > now:
+                continue
+            oldest = self._oldest(collection)
+            if oldest is None:
+                continue
+            if (
+                self._closing
+                or self._collection_size(collection) >= self.flush_size
+                or now - oldest >= self.flush_interval
+            ):
+                due.append((oldest, collection))
+        if not due:
+            return None
+        _, collection = min(due)
+        pending = self._pending[collection]
+        operation = "upsert" if pending["upsert"] else "update"
+        buffered = pending[operation]
+        entries = [
+            buffered.popitem(last=False)[1]
+            for _ in range(min(len(buffered), self.flush_size))
+        ]
+        self._flushing[collection] = min(e.accepted_at for e in entries)
+        return collection, operation, entries
+
+    def _next_due(self) -> Optional[float]:
+        """Seconds until the next collection is due, None if none is waiting."""
+        due = []
+        for collection in self._pending:
+            oldest = self._oldest(collection)
+            if collection not in self._flushing and oldest is not None:
+                due.append(
+                    max(oldest + self.flush_interval, self._retry_at(collection))
+                )
+        if not due:
+            return None
+        return max(min(due) - time.time(), 0)
+
+    def _retry_at(self, collection: str) -> float:
+        return self._backoff.get(collection, (0.0, 0.0))[0]
+
+    async def _worker(self) -> None:
+        while True:
+            batch = self._take()
+            if batch is not None:
+                await self._flush(*batch)
+                continue
+            if self._closing and not self._size:
+                return
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._next_due())
+            except asyncio.TimeoutError:
+                pass
+
+    async def _write(
+        self, collection: str, operation: str, documents: List[Document]
+    ) -> List[Optional[Tuple[Optional[int], str]]]:
+        """Sends documents to Qdrant in one call.
+
+        Returns:
+            list: None for each document written, else the status code (None
+                when Qdrant could not be reached) and the error.
+        """
+        outcomes: List[Optional[Tuple[Optional[int], str]]] = [None] * len(documents)
+        try:
+            if operation == "upsert":
+                response = await self.qdrant_service.upload_documents(
+                    collection=Collection(name=collection),
+                    documents=documents,
+                    chunk_size=settings.INGEST_CHUNK_SIZE,
+                )
+                for chunk in response["content"]["chunks"]:
+                    if not chunk["success"]:
+                        start = chunk["offset"]
+                        end = start + chunk["count"]
+                        outcomes[start:end] = [
+                            (chunk["status_code"], chunk["error"])
+                        ] * chunk["count"]
+            else:
+                response = await self.qdrant_service.update_documents(
+                    collection=Collection(name=collection), documents=documents
+                )
+                if not response["success"]:
+                    outcomes = [
+                        (response["status_code"], str(response["content"]))
+                    ] * len(documents)
+        except Exception as e:
+            logger.exception(
+                f"Writing {len(documents)} documents to {collection} failed"
+            )
+            outcomes = [(None, repr(e))] * len(documents)
+        return outcomes
+
+    async def _write_isolated(
+        self, collection: str, operation: str, documents: List[Document]
+    ) -> List[Optional[Tuple[Optional[int], str]]]:
+        """Writes documents, splitting rejected batches to find the culprits.
+
+        Qdrant rejects a whole call for one bad document (e.g. an update of a
+        missing id), so the rejected documents are written again in halves
+        until each rejection is down to the documents that caused it.
+        """
+        outcomes = await self._write(collection, operation, documents)
+        rejected = [
+            i
+            for i, outcome in enumerate(outcomes)
+            if outcome is not None and not _transient(outcome[0])
+        ]
+        if len(documents) > 1 and rejected:
+            half = (len(rejected) + 1) // 2
+            for part in (rejected[:half], rejected[half:]):
+                retried = await self._write_isolated(
+                    collection, operation, [documents[i] for i in part]
+                )
+                for i, outcome in zip(part, retried):
+                    outcomes[i] = outcome
+        return outcomes
+
+    async def _flush(
+        self, collection: str, operation: str, entries: List[_Entry]
+    ) -> None:
+        outcomes = await self._write_isolated(
+            collection, operation, [entry.document for entry in entries]
+        )
+        now = time.time()
+        done, retry = [], []
+        for entry, outcome in zip(entries, outcomes):
+            if outcome is not None and _transient(outcome[0]):
+                retry.append(entry)
+                continue
+            done.append(entry)
+            for job in entry.jobs:
+                if outcome is None:
+                    job.record("written")
+                else:
+                    job.record("failed", outcome[1])
+            WRITE_BUFFER_FLUSH_LAG.observe(now - entry.accepted_at)
+        failed = sum(outcome is not None for outcome in outcomes) - len(retry)
+        self.flushes += 1
+        self.failed += failed
+        self.written += len(done) - failed
+        self._size -= len(done)
+        if retry:
+            _, delay = self._backoff.get(collection, (0.0, 0.0))
+            delay = min(max(2 * delay, self.flush_interval, 0.1), MAX_RETRY_DELAY)
+            self._backoff[collection] = (now + delay, delay)
+            self.retried += len(retry)
+            logger.warning(
+                f"Retrying {len(retry)} writes to {collection} in {delay:.1f}s: "
+                f"{next(o for o in outcomes if o is not None)[1]}"
+            )
+            done.extend(self._requeue(collection, operation, retry))
+        else:
+            self._backoff.pop(collection, None)
+        WRITE_BUFFER_DOCUMENTS.set(self._size)
+        del self._flushing[collection]
+        if not self._collection_size(collection):
+            del self._pending[collection]
+        if self._log is not None and done:
+            # Failed writes are acknowledged too: they are reported on their
+            # job, and replaying them would fail the same way
+            self._ack(itertools.chain.from_iterable(e.seqs for e in done))
+            try:
+                await asyncio.to_thread(os.fsync, self._log.fileno())
+            except (OSError, ValueError):
+                # A compaction replaced the log meanwhile, and synced the new one
+                pass
+            if self._acked >= self.max_documents and not self._compacting:
+                await self._compact_log()
+        self._wakeup.set()
+
+    def _requeue(
+        self, collection: str, operation: str, entries: List[_Entry]
+    ) -> List[_Entry]:
+        """Puts writes that failed temporarily back at the front of the buffer.
+
+        Writes of the same documents accepted during the flush are newer, so
+        they supersede the requeued ones (or, for a vector update of a
+        requeued upsert, are folded into it).
+
+        Returns:
+            list: The requeued entries that were superseded, whose log records
+                can be acknowledged.
+        """
+        pending = self._pending.setdefault(
+            collection, {name: OrderedDict() for name in OPERATIONS}
+        )
+        superseded = []
+        for entry in reversed(entries):
+            document_id = entry.document.id
+            newer = pending["upsert"].get(document_id)
+            if newer is None and operation == "update":
+                newer = pending["update"].get(document_id)
+            if newer is not None:
+                for job in entry.jobs:
+                    job.record("superseded")
+                self._size -= 1
+                superseded.append(entry)
+                continue
+            update = pending["update"].pop(document_id, None)
+            if update is not None:
+                # A vector update accepted during the flush of this upsert
+                entry.document = entry.document.model_copy(
+                    update={
+                        "vector": update.document.vector,
+                        "sparse_vector": update.document.sparse_vector,
+                    }
+                )
+                entry.jobs.extend(update.jobs)
+                entry.seqs.extend(update.seqs)
+                self._size -= 1
+            pending[operation][document_id] = entry
+            pending[operation].move_to_end(document_id, last=False)
+        return superseded
+
+    def _ack(self, seqs: Iterable[int]) -> None:
+        if not self._size and not self._compacting:
+            # Nothing is pending, so the whole log can go
+            self._log.seek(0)
+            self._log.truncate()
+            self._acked = 0
+        else:
+            seqs = list(seqs)
+            self._log.write(orjson.dumps({"ack": seqs}) + b"\n")
+            self._acked += len(seqs)
+        self._log.flush()
+
+    async def _compact_log(self) -> None:
+        """Rewrites the log with only its unacknowledged writes.
+
+        The rewrite runs on a thread over the log as it was; records appended
+        meanwhile are copied over before the new file replaces the old one.
+        """
+        self._compacting = True
+        try:
+            self._log.flush()
+            end = self._log.tell()
+            records = await asyncio.to_thread(self._read_log, end)
+            partial = await asyncio.to_thread(self._write_log, records)
+            with open(self.log_path, "rb") as log, open(partial, "ab") as f:
+                log.seek(end)
+                f.write(log.read())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(partial, self.log_path)
+            self._log.close()
+            self._log = open(self.log_path, "ab")
+            self._acked = 0
+        except OSError as e:
+            logger.warning(f"Could not compact the write log: {e}")
+        finally:
+            self._compacting = False
+
+    def _read_log(self, end: Optional[int] = None) -> List[Dict]:
+        """Reads the unacknowledged writes of the log, up to byte ``end``."""
+        records, acked = [], set()
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "rb") as f:
+                data = f.read() if end is None else f.read(end)
+            for line in data.splitlines():
+                try:
+                    record = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    # A write torn by a crash; it was never acknowledged
+                    continue
+                if "ack" in record:
+                    acked.update(record["ack"])
+                else:
+                    records.append(record)
+        return [r for r in records if r["seq"] not in acked]
+
+    def _write_log(self, records: List[Dict]) -> str:
+        """Writes records to a new log file next to the log and returns its path."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+        partial = f"{self.log_path}.partial"
+        with open(partial, "wb") as f:
+            for record in records:
+                f.write(orjson.dumps(record) + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return partial
+
+    def _open_log(self) -> None:
+        """Re-buffers the unacknowledged writes of the log and compacts it."""
+        records = self._read_log()
+        os.replace(self._write_log(records), self.log_path)
+        self._log = open(self.log_path, "ab")
+        if records:
+            logger.info(f"Replaying {len(records)} buffered writes from the log")
+        jobs: Dict[str, WriteJob] = {}
+        totals: Dict[str, int] = {}
+        for record in records:
+            totals[record["job"]] = totals.get(record["job"], 0) + 1
+        for record in records:
+            job = jobs.get(record["job"])
+            if job is None:
+                job = jobs[record["job"]] = self._new_job(
+                    record["job"],
+                    record["collection"],
+                    record["operation"],
+                    totals[record["job"]],
+                )
+            self._add(
+                record["collection"],
+                record["operation"],
+                Document.model_validate(record["document"]),
+                job,
+                record["seq"],
+            )
+        self._seq = itertools.count(max((r["seq"] for r in records), default=0) + 1)
+
+    def stats(self) -> Dict:
+        """Reports the buffer fill, flush lag and job counts.
+
+        Returns:
+            dict: Buffer and per-collection statistics.
+        """
+        now = time.time()
+        oldest = [o for o in map(self._oldest, self._pending) if o is not None] + list(
+            self._flushing.values()
+        )
+        statuses: Dict[str, int] = {}
+        for job in self._jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            "documents": self._size,
+            "max_documents": self.max_documents,
+            "flush_lag_seconds": round(now - min(oldest), 3) if oldest else 0.0,
+            "collections": {
+                collection: {
+                    "pending": self._collection_size(collection),
+                    "flushing": collection in self._flushing,
+                }
+                for collection in self._pending
+                if self._collection_size(collection) or collection in self._flushing
+            },
+            "flushes": self.flushes,
+            "written": self.written,
+            "failed": self.failed,
+            "retried": self.retried,
+            "rejected": self.rejected,
+            "jobs": statuses,
+            "log_path": self.log_path,
+        }
+
+    async def close(self, timeout: float = 30) -> None:
+        """Flushes everything buffered, then stops the workers.
+
+        Writes still buffered after ``timeout`` seconds stay in the log, if
+        any, for the next start.
+        """
+        self._closing = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(asyncio.gather(*self._tasks), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self._size} buffered writes were not flushed")
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._log is not None:
+            self._log.close()
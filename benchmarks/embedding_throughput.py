@@ -0,0 +1,84 @@
+"""Micro-benchmark: TextEncoder texts/sec on CPU by batch size.
+
+Encodes the same synthetic corpus (texts of mixed length) once per batch
+size with TextEncoder.encode_batch, and once text-by-text with
+TextEncoder.encode as the baseline.
+
+Usage:
+    python -m benchmarks.embedding_throughput --texts 512 --batch-sizes 1,8,32,64
+    python -m benchmarks.embedding_throughput --model /path/to/local/model
+"""
+
+import argparse
+import json
+import random
+import time
+import torch
+from app.services.text_processing import TextEncoder
+
+WORDS = (
+    "the vector database stores embeddings for retrieval augmented generation "
+    "queries documents chunks payload filters search index cosine distance"
+).split()
+
+
+def make_corpus(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 300)))
+        for _ in range(n)
+    ]
+
+
+def main(args) -> None:
+    torch.set_num_threads(args.threads)
+    encoder = TextEncoder(model_name=args.model, max_length=args.max_length)
+    texts = make_corpus(args.texts)
+    encoder.encode_batch(texts[:8])  # warm-up
+
+    results = []
+    start = time.perf_counter()
+    for text in texts[: args.baseline_texts]:
+        encoder.encode(text)
+    elapsed = time.perf_counter() - start
+    results.append(
+        {
+            "method": "encode",
+            "batch_size": 1,
+            "texts": args.baseline_texts,
+            "texts_per_second": round(args.baseline_texts / elapsed, 2),
+        }
+    )
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        encoder.encode_batch(texts, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        results.append(
+            {
+                "method": "encode_batch",
+                "batch_size": batch_size,
+                "texts": len(texts),
+                "texts_per_second": round(len(texts) / elapsed, 2),
+            }
+        )
+    print(
+        json.dumps(
+            {"model": args.model, "threads": args.threads, "results": results},
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="bert-base-uncased")
+    parser.add_argument("--texts", type=int, default=256)
+    parser.add_argument("--baseline-texts", type=int, default=64)
+    parser.add_argument("--max-length", type=int, default=512)
+    parser.add_argument("--threads", type=int, default=torch.get_num_threads())
+    parser.add_argument(
+        "--batch-sizes",
+        type=lambda s: [int(b) for b in s.split(",")],
+        default=[1, 8, 16, 32, 64],
+    )
+    main(parser.parse_args())
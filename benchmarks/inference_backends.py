@@ -0,0 +1,150 @@
+"""Benchmark: TextEncoder inference backends on CPU.
+
+Runs each backend (eager PyTorch, torch.compile, ONNX Runtime fp32 and int8)
+in its own subprocess, so peak RSS is measured per backend, and reports
+model load time, texts/sec with encode_batch, peak RSS and the cosine
+similarity of its embeddings to the eager PyTorch fp32 baseline.
+
+Usage:
+    python -m benchmarks.inference_backends --model /path/to/local/model
+    python -m benchmarks.inference_backends --backends torch,onnx,onnx-int8
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from benchmarks.embedding_throughput import make_corpus
+
+# name -> TextEncoder keyword arguments
+BACKENDS = {
+    "torch": {"backend": "torch"},
+    "torch-compile": {"backend": "torch", "torch_compile": True},
+    "onnx": {"backend": "onnx"},
+    "onnx-int8": {"backend": "onnx", "quantize": True},
+}
+
+
+def run_backend(args) -> None:
+    """Benchmarks one backend in this process and prints the result as JSON."""
+    import torch
+    from app.services.text_processing import TextEncoder
+
+    torch.set_num_threads(args.threads)
+    start = time.perf_counter()
+    encoder = TextEncoder(
+        model_name=args.model,
+        max_length=args.max_length,
+        threads=args.threads,
+        onnx_dir=args.onnx_dir,
+        local_files_only=True,
+        **BACKENDS[args.run],
+    )
+    load_seconds = time.perf_counter() - start
+    texts = make_corpus(args.texts)
+    encoder.encode_batch(texts[: args.batch_size])  # warm-up (and compile)
+
+    start = time.perf_counter()
+    embeddings = encoder.encode_batch(texts, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+    np.save(args.output, embeddings)
+    # ru_maxrss is in KiB on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(
+        json.dumps(
+            {
+                "backend": args.run,
+                "load_seconds": round(load_seconds, 2),
+                "texts_per_second": round(len(texts) / elapsed, 2),
+                "peak_rss_mb": round(peak_rss / 1024, 1),
+            }
+        )
+    )
+
+
+def main(args) -> None:
+    results = []
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        onnx_dir = args.onnx_dir or os.path.join(tmp, "onnx")
+        # The baseline runs first so every backend can be compared to it
+        for name in ["torch"] + [b for b in args.backends if b != "torch"]:
+            output = os.path.join(tmp, f"{name}.npy")
+            command = [
+                sys.executable,
+                "-m",
+                "benchmarks.inference_backends",
+                "--run",
+                name,
+                "--output",
+                output,
+                "--onnx-dir",
+                onnx_dir,
+                "--model",
+                args.model,
+                "--texts",
+                str(args.texts),
+                "--batch-size",
+                str(args.batch_size),
+                "--max-length",
+                str(args.max_length),
+                "--threads",
+                str(args.threads),
+            ]
+            completed = subprocess.run(
+                command, capture_output=True, text=True, check=True
+            )
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            embeddings = np.load(output)
+            if baseline is None:
+                baseline = embeddings
+            # Embeddings are unit length, so row-wise dot products are cosines
+            similarity = (embeddings * baseline).sum(axis=1)
+            result["min_cosine_to_fp32"] = round(float(similarity.min()), 5)
+            result["mean_cosine_to_fp32"] = round(float(similarity.mean()), 5)
+            if name in args.backends:
+                results.append(result)
+    print(
+        json.dumps(
+            {
+                "model": args.model,
+                "threads": args.threads,
+                "texts": args.texts,
+                "batch_size": args.batch_size,
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="bert-base-uncased")
+    parser.add_argument(
+        "--backends",
+        type=lambda s: s.split(","),
+        default=list(BACKENDS),
+        help=f"Comma-separated, from {','.join(BACKENDS)}",
+    )
+    parser.add_argument("--texts", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-length", type=int, default=512)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--onnx-dir", help="Reuse ONNX exports kept here")
+    # Internal: benchmark a single backend in this process
+    parser.add_argument("--run", choices=list(BACKENDS), help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        run_backend(args)
+    else:
+        unknown = set(args.backends) - set(BACKENDS)
+        if unknown:
+            parser.error(f"unknown backends: {', '.join(sorted(unknown))}")
+        main(args)
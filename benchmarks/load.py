@@ -0,0 +1,286 @@
+"""Load test: the FastAPI app end to end against in-memory Qdrant.
+
+Boots the application in-process (lifespan included) behind an httpx
+ASGITransport, with QdrantService pointed at local in-memory mode unless
+QDRANT_LOCATION is set, or QDRANT_HOST is set to run against a real Qdrant. Every scenario runs once per
+combination of vector dimensions, payload size and concurrency:
+
+    upsert     POST /qdrant/{collection} with one document
+    batch      POST /qdrant/batch with --batch-size documents
+    retrieve   GET /qdrant/{collection}/{id}
+    search     POST /qdrant/{collection}/search with a random query vector
+    embedding  POST /qdrant/{collection}/search/text with a unique text, so
+               the embedding cache never hits (EMBEDDING_MODEL or --model;
+               only run when listed in --scenarios)
+
+Throughput and p50/p95/p99 latency are printed as JSON. With --compare, the
+run is checked against an earlier output file and the process exits with
+status 1 when a scenario's p95 latency rose, or its throughput fell, by more
+than --max-regression.
+
+Usage:
+    python -m benchmarks.load --dims 128,768 --concurrency 1,16,64 > run.json
+    python -m benchmarks.load --compare baseline.json --max-regression 0.2
+    python -m benchmarks.load --scenarios embedding --model /path/to/local/model
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import numpy as np
+
+# Settings are read on import; fill in what a bare environment lacks. Local
+# in-memory mode is only the default when no Qdrant host was given
+if "QDRANT_HOST" not in os.environ:
+    os.environ.setdefault("QDRANT_LOCATION", ":memory:")
+for name, default in {
+    "QDRANT_HOST": "localhost",
+    "QDRANT_PORT": "6333",
+    "QDRANT_API_KEY": "",
+    "APP_NAME": "rag-load",
+    "APP_VERSION": "bench",
+    "APP_DESCRIPTION": "load test",
+    "CORS_ORIGINS": "[]",
+}.items():
+    os.environ.setdefault(name, default)
+
+import httpx  # noqa: E402
+
+SCENARIOS = ("upsert", "batch", "retrieve", "search", "embedding")
+
+
+def random_vector(dim: int) -> list:
+    return [random.random() for _ in range(dim)]
+
+
+def make_document(i: int, dim: int, payload_bytes: int) -> dict:
+    return {
+        "id": i,
+        "vector": random_vector(dim),
+        "metadata": {"i": i, "text": "x" * payload_bytes},
+    }
+
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if len(ms) else (0, 0, 0)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(float(ms.mean()) if len(ms) else 0.0, 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+    }
+
+
+async def run_scenario(request, requests: int, concurrency: int) -> dict:
+    """Calls ``request(i)`` ``requests`` times, at most ``concurrency`` at once."""
+    latencies, errors = [], 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            response = await request(i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def delete_collection(client, name: str) -> None:
+    await client.delete(f"/qdrant/collections/{name}")
+
+
+async def create_collection(client, name: str, dim: int) -> None:
+    await delete_collection(client, name)
+    response = await client.post(
+        "/qdrant/collections/",
+        json={"name": name, "dimensions": dim, "distance": "cosine"},
+    )
+    response.raise_for_status()
+
+
+async def fill(client, collection: str, dim: int, payload_bytes: int, n: int):
+    for start in range(0, n, 256):
+        documents = [
+            make_document(i, dim, payload_bytes)
+            for i in range(start, min(start + 256, n))
+        ]
+        response = await client.post(
+            "/qdrant/batch",
+            json={"collection_name": collection, "documents": documents},
+        )
+        response.raise_for_status()
+
+
+def vector_scenarios(client, collection: str, dim: int, args, payload_bytes: int):
+    # Written ids start past the prefilled points so retrieve stays on hits
+    base = args.points
+
+    def upsert(i):
+        return client.post(
+            f"/qdrant/{collection}", json=make_document(base + i, dim, payload_bytes)
+        )
+
+    def batch(i):
+        first = base + args.requests + i * args.batch_size
+        documents = [
+            make_document(first + j, dim, payload_bytes) for j in range(args.batch_size)
+        ]
+        return client.post(
+            "/qdrant/batch",
+            json={"collection_name": collection, "documents": documents},
+        )
+
+    def retrieve(i):
+        return client.get(f"/qdrant/{collection}/{i % args.points}")
+
+    def search(i):
+        return client.post(
+            f"/qdrant/{collection}/search",
+            json={"vector": random_vector(dim), "top_k": args.top_k},
+        )
+
+    return {"upsert": upsert, "batch": batch, "retrieve": retrieve, "search": search}
+
+
+async def main(args) -> list:
+    from app.main import app
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://load", timeout=None
+        ) as client:
+            vector_names = [s for s in args.scenarios if s != "embedding"]
+            for dim in args.dims if vector_names else []:
+                for payload_bytes in args.payload_bytes:
+                    collection = f"load_{dim}_{payload_bytes}"
+                    for concurrency in args.concurrency:
+                        await create_collection(client, collection, dim)
+                        await fill(client, collection, dim, payload_bytes, args.points)
+                        scenarios = vector_scenarios(
+                            client, collection, dim, args, payload_bytes
+                        )
+                        for name in vector_names:
+                            summary = await run_scenario(
+                                scenarios[name], args.requests, concurrency
+                            )
+                            results.append(
+                                {
+                                    "scenario": name,
+                                    "dimensions": dim,
+                                    "payload_bytes": payload_bytes,
+                                    "concurrency": concurrency,
+                                    **summary,
+                                }
+                            )
+                    await delete_collection(client, collection)
+            if "embedding" in args.scenarios:
+                results.extend(await embedding_results(client, app, args))
+    return results
+
+
+async def embedding_results(client, app, args) -> list:
+    # Loading the encoder here keeps model start-up out of the measurements
+    service = app.state.embedding_service
+    dim = (await asyncio.to_thread(lambda: service.encoder)).dimensions
+    collection = "load_embedding"
+    await create_collection(client, collection, dim)
+    await fill(client, collection, dim, 0, args.points)
+    results = []
+    for concurrency in args.concurrency:
+        run_id = random.random()
+
+        def embed(i):
+            return client.post(
+                f"/qdrant/{collection}/search/text",
+                json={"text": f"load test query {run_id} {i}", "top_k": args.top_k},
+            )
+
+        summary = await run_scenario(embed, args.requests, concurrency)
+        results.append(
+            {
+                "scenario": "embedding",
+                "dimensions": dim,
+                "payload_bytes": 0,
+                "concurrency": concurrency,
+                **summary,
+            }
+        )
+    await delete_collection(client, collection)
+    return results
+
+
+def regressions(results: list, baseline: list, tolerance: float) -> list:
+    """Lists the results that got worse than the baseline by over ``tolerance``."""
+    keys = ("scenario", "dimensions", "payload_bytes", "concurrency")
+    previous = {tuple(r[k] for k in keys): r for r in baseline}
+    found = []
+    for result in results:
+        before = previous.get(tuple(result[k] for k in keys))
+        if before is None:
+            continue
+        slower = result["p95_ms"] > before["p95_ms"] * (1 + tolerance)
+        fewer = result["requests_per_second"] < before["requests_per_second"] * (
+            1 - tolerance
+        )
+        for metric, regressed in (("p95_ms", slower), ("requests_per_second", fewer)):
+            if regressed:
+                found.append(
+                    {
+                        **{k: result[k] for k in keys},
+                        "metric": metric,
+                        "baseline": before[metric],
+                        "current": result[metric],
+                    }
+                )
+    return found
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ints = lambda s: [int(v) for v in s.split(",")]
+    parser.add_argument(
+        "--scenarios", type=lambda s: s.split(","), default=list(SCENARIOS[:4])
+    )
+    parser.add_argument("--dims", type=ints, default=[128, 768])
+    parser.add_argument("--payload-bytes", type=ints, default=[0, 4096])
+    parser.add_argument("--concurrency", type=ints, default=[1, 16, 64])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--points", type=int, default=2000, help="Points prefilled")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--model", default=None, help="Embedding model name or path")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", default=None, help="Earlier output to gate on")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if args.model:
+        os.environ["EMBEDDING_MODEL"] = args.model
+    random.seed(args.seed)
+
+    results = asyncio.run(main(args))
+    print(json.dumps(results, indent=2))
+    if args.compare:
+        with open(args.compare) as f:
+            found = regressions(results, json.load(f), args.max_regression)
+        for regression in found:
+            print(json.dumps(regression), file=sys.stderr)
+        sys.exit(1 if found else 0)
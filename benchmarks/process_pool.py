@@ -0,0 +1,119 @@
+"""Benchmark: embedding throughput of EmbeddingProcessPool by process count.
+
+For each process count, starts a pool (each process gets --threads torch
+threads, by default the cores divided among the processes), keeps
+--concurrency requests of --request-texts texts in flight and reports
+texts/sec and the speed-up over one process. The in-process TextEncoder on
+all cores is the baseline.
+
+Usage:
+    python -m benchmarks.process_pool --model /path/to/local/model
+    python -m benchmarks.process_pool --processes 1,2,4,8,16,32 --threads 1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from benchmarks.embedding_throughput import make_corpus
+from app.services.embedding_pool import EmbeddingProcessPool
+
+
+async def measure_pool(args, processes: int, texts: list) -> dict:
+    threads = args.threads or max(os.cpu_count() // processes, 1)
+    pool = EmbeddingProcessPool(
+        args.model,
+        processes=processes,
+        torch_threads=threads,
+        batch_size=args.request_texts,
+        max_rows=args.request_texts,
+        max_length=args.max_length,
+        local_files_only=True,
+    )
+    try:
+        start = time.perf_counter()
+        await pool.start()
+        start_seconds = time.perf_counter() - start
+        await pool.embed(texts[: processes * args.request_texts])  # warm-up
+
+        requests = [
+            texts[i : i + args.request_texts]
+            for i in range(0, len(texts), args.request_texts)
+        ]
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def request(batch):
+            async with semaphore:
+                await pool.embed(batch)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(request(batch) for batch in requests))
+        elapsed = time.perf_counter() - start
+    finally:
+        await pool.close()
+    return {
+        "processes": processes,
+        "threads_per_process": threads,
+        "start_seconds": round(start_seconds, 2),
+        "texts_per_second": round(len(texts) / elapsed, 2),
+    }
+
+
+def measure_in_process(args, texts: list) -> dict:
+    import torch
+    from app.services.text_processing import TextEncoder
+
+    torch.set_num_threads(os.cpu_count())
+    encoder = TextEncoder(
+        model_name=args.model, max_length=args.max_length, local_files_only=True
+    )
+    encoder.encode_batch(texts[: args.request_texts])  # warm-up
+    start = time.perf_counter()
+    for i in range(0, len(texts), args.request_texts):
+        encoder.encode_batch(texts[i : i + args.request_texts])
+    elapsed = time.perf_counter() - start
+    return {
+        "processes": 0,
+        "threads_per_process": os.cpu_count(),
+        "texts_per_second": round(len(texts) / elapsed, 2),
+    }
+
+
+async def main(args) -> None:
+    texts = make_corpus(args.texts)
+    results = [measure_in_process(args, texts)]
+    for processes in args.processes:
+        results.append(await measure_pool(args, processes, texts))
+    single = next((r for r in results if r["processes"] == 1), None)
+    if single is not None:
+        for result in results:
+            result["speedup_vs_one_process"] = round(
+                result["texts_per_second"] / single["texts_per_second"], 2
+            )
+    print(
+        json.dumps(
+            {"model": args.model, "cores": os.cpu_count(), "results": results},
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="bert-base-uncased")
+    parser.add_argument("--texts", type=int, default=2048)
+    parser.add_argument("--request-texts", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-length", type=int, default=128)
+    parser.add_argument(
+        "--processes",
+        type=lambda s: [int(p) for p in s.split(",")],
+        default=[1, 2, 4, 8],
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        help="Torch threads per process. Default: cores / processes",
+    )
+    asyncio.run(main(parser.parse_args()))
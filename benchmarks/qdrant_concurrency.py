@@ -0,0 +1,120 @@
+"""Concurrency benchmark: blocking QdrantClient vs AsyncQdrantClient.
+
+Runs many parallel "requests" (upsert followed by retrieve) from inside an
+event loop, the way the FastAPI endpoints call QdrantService, and reports
+throughput together with the worst event-loop stall observed by a heartbeat
+task. A blocking client stalls the loop for the whole round-trip, so other
+requests queue behind it; the async client keeps the loop responsive.
+
+Local in-memory mode executes in-process and has no network round-trip, so
+--rtt-ms adds a simulated round-trip to every call (time.sleep for the
+blocking client, asyncio.sleep for the async one). Point --url at a real
+Qdrant and pass --rtt-ms 0 to measure actual network behaviour.
+
+Usage:
+    python -m benchmarks.qdrant_concurrency --requests 2000 --concurrency 64
+    python -m benchmarks.qdrant_concurrency --url http://localhost:6333 --rtt-ms 0
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http import models
+
+COLLECTION = "bench_concurrency"
+
+
+async def heartbeat(stop: asyncio.Event, interval: float = 0.001) -> float:
+    """Measures the largest delay between scheduled wake-ups of the event loop."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+def make_point(i: int, dim: int) -> models.PointStruct:
+    return models.PointStruct(
+        id=i, vector=[random.random() for _ in range(dim)], payload={"i": i}
+    )
+
+
+async def run(client, blocking: bool, args) -> dict:
+    rtt = args.rtt_ms / 1000
+
+    async def call(method, **kwargs):
+        fn = getattr(client, method)
+        if blocking:
+            time.sleep(rtt)
+            return fn(**kwargs)
+        await asyncio.sleep(rtt)
+        return await fn(**kwargs)
+
+    if await call("collection_exists", collection_name=COLLECTION):
+        await call("delete_collection", collection_name=COLLECTION)
+    await call(
+        "create_collection",
+        collection_name=COLLECTION,
+        vectors_config=models.VectorParams(
+            size=args.dim, distance=models.Distance.COSINE
+        ),
+    )
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def request(i: int):
+        async with semaphore:
+            await call(
+                "upsert", collection_name=COLLECTION, points=[make_point(i, args.dim)]
+            )
+            await call("retrieve", collection_name=COLLECTION, ids=[i])
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(heartbeat(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    worst_stall = await probe
+
+    await call("delete_collection", collection_name=COLLECTION)
+    return {
+        "client": "QdrantClient" if blocking else "AsyncQdrantClient",
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "rtt_ms": args.rtt_ms,
+        "seconds": round(elapsed, 4),
+        "requests_per_second": round(args.requests / elapsed, 1),
+        "max_loop_stall_ms": round(worst_stall * 1000, 3),
+    }
+
+
+async def main(args) -> None:
+    target = {"url": args.url} if args.url else {"location": ":memory:"}
+    results = []
+
+    client = QdrantClient(**target)
+    results.append(await run(client, blocking=True, args=args))
+    client.close()
+
+    aclient = AsyncQdrantClient(**target, pool_size=args.concurrency)
+    results.append(await run(aclient, blocking=False, args=args))
+    await aclient.close()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None, help="Qdrant URL; default :memory:")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument(
+        "--rtt-ms", type=float, default=2.0, help="Simulated round-trip per call"
+    )
+    asyncio.run(main(parser.parse_args()))
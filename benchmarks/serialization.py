@@ -0,0 +1,102 @@
+"""Serialization cost per endpoint: legacy JSON round-trip vs the lean path.
+
+For get_document (one point) and search (top_k points), all with vectors,
+compares the cost of turning Qdrant client models into a response body:
+
+    legacy  json.loads(model_dump_json()), OperationStatus validation,
+            then FastAPI's JSON rendering
+    orjson  dict(point) rendered by ORJSONResponse
+    base64  as orjson, with vectors encoded as base64 float32
+    raw     the vectors alone as little-endian float32 bytes
+
+Usage:
+    python -m benchmarks.serialization --dims 768,2048 --top-k 10,100
+"""
+
+import argparse
+import json
+import random
+import time
+from fastapi import Request
+from qdrant_client.http import models
+from app.api.responses import vector_response
+from app.models.models import OperationStatus
+
+
+def make_points(n: int, dim: int) -> list:
+    return [
+        models.ScoredPoint(
+            id=i,
+            version=1,
+            score=random.random(),
+            payload={"text": "some chunk of text " * 10, "source": "bench"},
+            vector=[random.random() for _ in range(dim)],
+        )
+        for i in range(n)
+    ]
+
+
+def request(accept: str) -> Request:
+    return Request({"type": "http", "headers": [(b"accept", accept.encode("latin-1"))]})
+
+
+def legacy(points, single: bool) -> bytes:
+    dicts = [json.loads(p.model_dump_json()) for p in points]
+    details = dicts[0] if single else {"points": dicts}
+    return OperationStatus(message="ok", details=details).model_dump_json().encode()
+
+
+def lean(accept: str):
+    def run(points, single: bool) -> bytes:
+        dicts = [dict(p) for p in points]
+        details = dicts[0] if single else {"points": dicts}
+        return vector_response(request(accept), "ok", details, points=dicts).body
+
+    return run
+
+
+METHODS = {
+    "legacy": legacy,
+    "orjson": lean("application/json"),
+    "base64": lean("application/json; vector-encoding=base64"),
+    "raw": lean("application/octet-stream"),
+}
+
+
+def measure(fn, points, single: bool, repeat: int) -> tuple:
+    body = fn(points, single)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(points, single)
+    return (time.perf_counter() - start) / repeat, len(body)
+
+
+def main(args) -> None:
+    results = []
+    for dim in args.dims:
+        cases = [("get_document", 1, True)] + [
+            (f"search top_k={k}", k, False) for k in args.top_k
+        ]
+        for endpoint, n, single in cases:
+            points = make_points(n, dim)
+            for name, fn in METHODS.items():
+                seconds, size = measure(fn, points, single, args.repeat)
+                results.append(
+                    {
+                        "endpoint": endpoint,
+                        "dimensions": dim,
+                        "method": name,
+                        "microseconds": round(seconds * 1e6, 1),
+                        "body_bytes": size,
+                    }
+                )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ints = lambda s: [int(v) for v in s.split(",")]
+    parser.add_argument("--dims", type=ints, default=[768, 2048])
+    parser.add_argument("--top-k", type=ints, default=[10, 100])
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,156 @@
+"""Benchmark: the embedded vector store against Qdrant local mode.
+
+For each collection size, loads the same random vectors (with a small
+payload) into an EmbeddedClient and an AsyncQdrantClient in local mode,
+then reports upsert throughput, single-query latency percentiles, batched
+query throughput, filtered query latency, the resident memory added by the
+load and the overlap of each store's top k with the exact top k.
+
+Qdrant local mode is itself a brute-force NumPy implementation kept in
+memory; past a few hundred thousand vectors it becomes slow to load, so
+--qdrant-max-size bounds the sizes it is run for.
+
+Usage:
+    python -m benchmarks.vector_store
+    python -m benchmarks.vector_store --sizes 100000,1000000,3000000 \
+        --dimensions 384 --path /mnt/fast/embedded
+"""
+
+import argparse
+import asyncio
+import json
+import resource
+import shutil
+import tempfile
+import time
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http import models
+from app.services.embedded_store import EmbeddedClient
+
+
+def rss_mb() -> float:
+    """Current resident memory; the peak would carry over between stores."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ queries.T
+    return np.argsort(-scores, axis=0)[:k].T
+
+
+async def measure(args, client, size: int, vectors, queries, exact) -> dict:
+    await client.create_collection(
+        "bench",
+        vectors_config=models.VectorParams(
+            size=args.dimensions, distance=models.Distance.COSINE
+        ),
+    )
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    for offset in range(0, size, args.upsert_batch):
+        batch = vectors[offset : offset + args.upsert_batch]
+        await client.upsert(
+            "bench",
+            points=models.Batch(
+                ids=list(range(offset, offset + len(batch))),
+                vectors=batch.tolist(),
+                payloads=[
+                    {"group": i % 10} for i in range(offset, offset + len(batch))
+                ],
+            ),
+        )
+    upsert_seconds = time.perf_counter() - start
+    rss_growth = rss_mb() - rss_before
+
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        response = await client.query_points(
+            "bench", query=query.tolist(), limit=args.top_k
+        )
+        latencies.append(time.perf_counter() - start)
+        found.append([p.id for p in response.points])
+    recall = np.mean(
+        [len(set(f) & set(e.tolist())) / args.top_k for f, e in zip(found, exact)]
+    )
+
+    start = time.perf_counter()
+    await client.query_batch_points(
+        "bench",
+        requests=[
+            models.QueryRequest(query=q.tolist(), limit=args.top_k) for q in queries
+        ],
+    )
+    batch_seconds = time.perf_counter() - start
+
+    group = models.Filter(
+        must=[models.FieldCondition(key="group", match=models.MatchValue(value=3))]
+    )
+    filtered = []
+    for query in queries[: args.filtered_queries]:
+        start = time.perf_counter()
+        await client.query_points(
+            "bench", query=query.tolist(), query_filter=group, limit=args.top_k
+        )
+        filtered.append(time.perf_counter() - start)
+
+    await client.close()
+    ms = np.array(latencies) * 1000
+    return {
+        "upserts_per_second": round(size / upsert_seconds, 1),
+        "query_p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "query_p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "batch_queries_per_second": round(len(queries) / batch_seconds, 1),
+        "filtered_query_p50_ms": round(float(np.median(filtered)) * 1000, 2),
+        "recall_at_k": round(float(recall), 4),
+        "rss_growth_mb": round(rss_growth, 1),
+    }
+
+
+async def main(args) -> None:
+    rng = np.random.default_rng(0)
+    results = []
+    for size in args.sizes:
+        vectors = rng.normal(size=(size, args.dimensions)).astype(np.float32)
+        queries = rng.normal(size=(args.queries, args.dimensions)).astype(np.float32)
+        exact = exact_top_k(vectors, queries, args.top_k)
+        path = args.path or tempfile.mkdtemp(prefix="embedded-bench-")
+        shutil.rmtree(path, ignore_errors=True)
+        result = {"size": size}
+        result["embedded"] = await measure(
+            args, EmbeddedClient(path), size, vectors, queries, exact
+        )
+        shutil.rmtree(path, ignore_errors=True)
+        if size <= args.qdrant_max_size:
+            result["qdrant_local"] = await measure(
+                args,
+                AsyncQdrantClient(location=":memory:"),
+                size,
+                vectors,
+                queries,
+                exact,
+            )
+        results.append(result)
+    print(json.dumps({"dimensions": args.dimensions, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=lambda s: [int(p) for p in s.split(",")],
+        default=[10_000, 100_000, 1_000_000],
+    )
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--filtered-queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--upsert-batch", type=int, default=1024)
+    parser.add_argument("--qdrant-max-size", type=int, default=200_000)
+    parser.add_argument(
+        "--path", help="Directory for the embedded store. Default: a temporary one"
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,27 @@
+import pytest
+
+
+@pytest.fixture(scope="session")
+def tiny_model_path(tmp_path_factory):
+    """A small randomly initialised BERT model saved to disk, for offline tests."""
+    transformers = pytest.importorskip("transformers")
+    path = tmp_path_factory.mktemp("tiny-bert")
+    words = (
+        "the a vector database stores embeddings for retrieval search query "
+        "document chunk payload filter index cosine distance text long short"
+    ).split()
+    vocab = path / "vocab.txt"
+    vocab.write_text(
+        "\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", ".", ","] + words)
+    )
+    transformers.BertTokenizerFast.from_pretrained(path).save_pretrained(path)
+    config = transformers.BertConfig(
+        vocab_size=7 + len(words),
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+        max_position_embeddings=128,
+    )
+    transformers.BertModel(config).save_pretrained(path)
+    return str(path)
@@ -1,17 +1,48 @@
+import base64
+import numpy as np
+import pytest
 from fastapi.testclient import TestClient
 from app.main import app
 from app.models.models import Collection, CollectionCreate
 import json
+import time
 
 client = TestClient(app)
 
 
+@pytest.fixture(scope="module", autouse=True)
+def lifespan():
+    """Runs the application lifespan so the shared QdrantService exists."""
+    with client:
+        yield
+
+
 def test_read_main():
     response = client.get("/")
     assert response.status_code == 200
     assert response.json() == {"message": "Welcome to the Qdrant FastAPI application!"}
 
 
+def test_health():
+    assert client.get("/health/live").json() == {"status": "alive"}
+
+    response = client.get("/health/ready")
+
+    # The model is loaded lazily by default, so the app is ready without it
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+
+
+def test_metrics():
+    client.get("/")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert 'rag_request_duration_seconds_count{method="GET",route="/"}' in response.text
+    assert "rag_qdrant_call_duration_seconds" in response.text
+
+
 def test_list_collection():
     """Test creating a new collection."""
     response = client.get(
@@ -36,6 +67,72 @@ def test_create_collection():
     assert response.json()["message"] == "Collection created successfully"
 
 
+def test_create_collection_rejects_route_names():
+    for name in ("jobs", "batch", "embedding", "collections"):
+        response = client.post(
+            "/qdrant/collections/", json={"name": name, "dimensions": 3}
+        )
+
+        assert response.status_code == 422
+        assert "reserved" in response.text
+    assert client.get("/qdrant/jobs/").status_code == 200
+
+
+def test_create_collection_with_performance_settings():
+    data = {
+        "name": "test_tuned_collection",
+        "dimensions": 8,
+        "distance": "dot",
+        "hnsw": {"m": 32, "ef_construct": 200},
+        "quantization": {"type": "scalar", "quantile": 0.99, "always_ram": True},
+        "on_disk": True,
+        "on_disk_payload": True,
+        "optimizer": {"indexing_threshold": 20000},
+        "payload_indexes": [{"field": "source", "schema_type": "keyword"}],
+    }
+
+    response = client.post("/qdrant/collections/", json=data)
+
+    assert response.status_code == 201
+    assert response.json()["details"]["quantization"]["type"] == "scalar"
+
+
+def test_create_collection_is_removed_when_indexing_fails(monkeypatch):
+    service = app.state.qdrant_service
+
+    async def fail(**kwargs):
+        raise ValueError("index failed")
+
+    monkeypatch.setattr(service.client, "create_payload_index", fail)
+    data = {
+        "name": "test_unindexed_collection",
+        "dimensions": 3,
+        "payload_indexes": [{"field": "source"}],
+    }
+
+    response = client.post("/qdrant/collections/", json=data)
+    assert response.status_code == 400
+    monkeypatch.undo()
+
+    response = client.post("/qdrant/collections/", json=data)
+    assert response.status_code == 201
+    client.delete("/qdrant/collections/test_unindexed_collection")
+
+
+def test_update_collection():
+    data = {
+        "hnsw": {"ef_construct": 128},
+        "quantization": {"type": "binary"},
+        "payload_indexes": [{"field": "year", "schema_type": "integer"}],
+    }
+
+    response = client.patch("/qdrant/collections/test_tuned_collection", json=data)
+    client.delete("/qdrant/collections/test_tuned_collection")
+
+    assert response.status_code == 200
+    assert response.json()["message"] == "Collection updated"
+
+
 def test_upload_document():
     data = '{"id": 1, "metadata": {"test": "document"}, "vector": [0.5, 0.4, 0.1]}'
 
@@ -49,6 +146,139 @@ def test_upload_document():
     assert response.json()["message"] == "Document uploaded"
 
 
+def test_upload_documents_batch():
+    data = {
+        "collection_name": "test_collection",
+        "documents": [
+            {"id": i, "metadata": {"batch": True}, "vector": [0.1, 0.2, 0.3]}
+            for i in range(2, 12)
+        ],
+        "chunk_size": 3,
+    }
+
+    response = client.post("/qdrant/batch", json=data)
+
+    assert response.status_code == 201
+    assert response.json()["message"] == "Documents uploaded"
+    assert response.json()["details"]["uploaded"] == 10
+    assert len(response.json()["details"]["chunks"]) == 4
+
+
+def test_ingest_stream():
+    lines = [
+        json.dumps({"id": i, "metadata": {"stream": True}, "vector": [0.3, 0.2, 0.1]})
+        for i in range(12, 22)
+    ]
+    lines.insert(3, '{"id": "not valid", "vector": "oops"}')
+
+    response = client.post(
+        "/qdrant/test_collection/stream?chunk_size=4",
+        content="\n".join(lines) + "\n",
+        headers={"content-type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 207
+    assert response.json()["details"]["uploaded"] == 10
+    assert response.json()["details"]["invalid_lines"][0]["line"] == 4
+
+
+def test_ingest_stream_skips_long_lines(monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "NDJSON_MAX_LINE_BYTES", 200)
+    short = json.dumps({"id": 22, "metadata": {}, "vector": [0.3, 0.2, 0.1]})
+    long = json.dumps({"id": 23, "metadata": {"text": "x" * 500}, "vector": [0.1]})
+
+    def body():
+        # The long line arrives over several chunks
+        yield (short + "\n" + long[:150]).encode()
+        yield long[150:400].encode()
+        yield (long[400:] + "\n" + short.replace("22", "24")).encode()
+
+    response = client.post(
+        "/qdrant/test_collection/stream",
+        content=body(),
+        headers={"content-type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 207
+    assert response.json()["details"]["uploaded"] == 2
+    assert response.json()["details"]["invalid_lines"] == [
+        {"line": 2, "error": "Line longer than 200 bytes"}
+    ]
+
+
+def test_search():
+    data = {
+        "vector": [0.5, 0.4, 0.1],
+        "top_k": 3,
+        "filter": {"must": [{"key": "batch", "match": {"value": True}}]},
+        "hnsw_ef": 64,
+    }
+
+    response = client.post("/qdrant/test_collection/search", json=data)
+
+    assert response.status_code == 200
+    points = response.json()["details"]["points"]
+    assert len(points) == 3
+    assert all(p["payload"]["batch"] for p in points)
+
+
+def test_search_batch():
+    data = {
+        "searches": [
+            {"vector": [0.5, 0.4, 0.1], "top_k": 1},
+            {"vector": [0.3, 0.2, 0.1], "top_k": 2, "exact": True},
+        ]
+    }
+
+    response = client.post("/qdrant/test_collection/search/batch", json=data)
+
+    assert response.status_code == 200
+    results = response.json()["details"]["results"]
+    assert [len(r) for r in results] == [1, 2]
+    assert results[0][0]["id"] == 1
+
+
+def test_search_cache():
+    data = {"vector": [0.9, 0.1, 0.1], "top_k": 2}
+    stats_url = "/qdrant/collections/test_collection/cache"
+    before = client.get(stats_url).json()["details"]
+
+    first = client.post("/qdrant/test_collection/search", json=data)
+    second = client.post("/qdrant/test_collection/search", json=data)
+    after = client.get(stats_url).json()["details"]
+
+    assert first.json() == second.json()
+    assert after["hits"] == before["hits"] + 1
+    assert after["misses"] == before["misses"] + 1
+
+    client.post(
+        "/qdrant/test_collection",
+        json={"id": 99, "metadata": {"new": True}, "vector": [0.9, 0.1, 0.1]},
+    )
+    third = client.post("/qdrant/test_collection/search", json=data)
+    assert third.json()["details"]["points"][0]["id"] == 99
+    client.delete("/qdrant/test_collection/99")
+
+    response = client.put(stats_url, json={"enabled": False})
+    assert response.json()["details"]["enabled"] is False
+    client.put(stats_url, json={"enabled": True})
+
+    # Results are not cached right after a write Qdrant may not have applied
+    client.post(
+        "/qdrant/test_collection/stream?wait=false",
+        content=json.dumps({"id": 98, "metadata": {}, "vector": [0.1, 0.1, 0.9]}),
+        headers={"content-type": "application/x-ndjson"},
+    )
+    before = client.get(stats_url).json()["details"]
+    client.post("/qdrant/test_collection/search", json=data)
+    client.post("/qdrant/test_collection/search", json=data)
+    after = client.get(stats_url).json()["details"]
+    assert after["hits"] == before["hits"]
+    client.delete("/qdrant/test_collection/98")
+
+
 def test_get_document():
     response = client.get(
         "/qdrant/test_collection/1",
@@ -58,6 +288,105 @@ def test_get_document():
     assert response.json()["message"] == "Document found"
 
 
+def test_get_document_vector_encodings():
+    plain = client.get("/qdrant/test_collection/1").json()["details"]["vector"]
+
+    response = client.get(
+        "/qdrant/test_collection/1",
+        headers={"accept": "application/json; vector-encoding=base64"},
+    )
+    encoded = response.json()["details"]["vector"]
+    decoded = np.frombuffer(base64.b64decode(encoded), dtype="<f4")
+    np.testing.assert_allclose(decoded, plain, rtol=1e-6)
+
+    response = client.get(
+        "/qdrant/test_collection/1", headers={"accept": "application/octet-stream"}
+    )
+    assert response.headers["x-vector-dimensions"] == "3"
+    np.testing.assert_allclose(
+        np.frombuffer(response.content, dtype="<f4"), plain, rtol=1e-6
+    )
+
+
+def test_upload_document_base64_vector():
+    vector = base64.b64encode(np.array([0.1, 0.9, 0.3], dtype="<f4").tobytes())
+    data = {"id": 50, "vector": vector.decode(), "metadata": {"encoding": "base64"}}
+
+    response = client.post("/qdrant/test_collection", json=data)
+    search = client.post(
+        "/qdrant/test_collection/search",
+        json={"vector": data["vector"], "top_k": 1},
+    )
+    client.delete("/qdrant/test_collection/50")
+
+    assert response.status_code == 201
+    assert search.json()["details"]["points"][0]["id"] == 50
+
+
+def test_get_documents():
+    data = {"ids": [2, 3, 4, 1000], "with_payload": ["batch"], "with_vectors": True}
+
+    response = client.post("/qdrant/test_collection/retrieve", json=data)
+
+    assert response.status_code == 200
+    points = response.json()["details"]["points"]
+    assert sorted(p["id"] for p in points) == [2, 3, 4]
+    assert all(len(p["vector"]) == 3 for p in points)
+
+
+def test_export_documents():
+    count = client.post("/qdrant/test_collection/count", json={}).json()["details"]
+
+    response = client.post(
+        "/qdrant/test_collection/export", json={"batch_size": 4, "offset": 2}
+    )
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert len(lines) == count["count"] - 1
+    assert lines[0]["id"] == 2
+    assert len(lines[0]["vector"]) == 3
+
+    response = client.post(
+        "/qdrant/test_collection/export",
+        json={"format": "binary", "filter": {"must": [{"has_id": [2]}]}},
+    )
+    header_length = int.from_bytes(response.content[:4], "little")
+    header = json.loads(response.content[4 : 4 + header_length])
+    assert header["id"] == 2
+    assert len(response.content) == 4 + header_length + 4 + 3 * 4
+
+    response = client.post("/qdrant/missing_collection/export", json={})
+    assert response.status_code >= 400
+
+
+def test_count_and_delete_documents():
+    stream_filter = {"must": [{"key": "stream", "match": {"value": True}}]}
+
+    response = client.post("/qdrant/test_collection/count", json={})
+    total = response.json()["details"]["count"]
+    response = client.post(
+        "/qdrant/test_collection/count", json={"filter": stream_filter}
+    )
+    assert response.json()["details"]["count"] == 10
+
+    response = client.post(
+        "/qdrant/test_collection/delete/filter", json={"filter": stream_filter}
+    )
+    assert response.status_code == 200
+    response = client.post("/qdrant/test_collection/delete", json={"ids": [10, 11]})
+    assert response.status_code == 200
+
+    response = client.post("/qdrant/test_collection/count", json={})
+    assert response.json()["details"]["count"] == total - 12
+
+    response = client.post(
+        "/qdrant/test_collection/delete/filter", json={"filter": {"must": "oops"}}
+    )
+    assert response.status_code == 400
+
+
 def test_update_document():
     data = '{"id": 1, "metadata": {"test": "document"}, "vector": [0.2, 0.2, 0.2]}'
 
@@ -71,6 +400,53 @@ def test_update_document():
     assert response.json()["message"] == "Document updated"
 
 
+def test_expired_deadline():
+    expired = {"X-Request-Timeout": "0.0000001"}
+
+    read = client.get("/qdrant/test_collection/1", headers=expired)
+    write = client.post(
+        "/qdrant/test_collection",
+        json={"id": 999, "metadata": {}, "vector": [0.1, 0.2, 0.3]},
+        headers=expired,
+    )
+    info = client.get("/qdrant/collections/test_collection", headers=expired)
+
+    assert [read.status_code, write.status_code, info.status_code] == [504] * 3
+    assert client.get("/qdrant/test_collection/999").status_code == 400
+
+
+def test_background_write():
+    document = {"id": 50, "metadata": {"background": True}, "vector": [0.1, 0.1, 0.8]}
+
+    response = client.post("/qdrant/test_collection?background=true", json=document)
+
+    assert response.status_code == 202
+    job_id = response.json()["details"]["job_id"]
+    for _ in range(100):
+        job = client.get(f"/qdrant/jobs/{job_id}").json()["details"]
+        if job["status"] != "queued":
+            break
+        time.sleep(0.05)
+    assert job["status"] == "done"
+    assert job["written"] == 1
+    assert client.get("/qdrant/test_collection/50").status_code == 200
+    assert client.get("/qdrant/jobs/").json()["details"]["documents"] == 0
+    assert client.get("/qdrant/jobs/unknown").status_code == 404
+    client.delete("/qdrant/test_collection/50")
+
+
+def test_background_write_larger_than_the_buffer(monkeypatch):
+    monkeypatch.setattr(app.state.write_buffer, "max_documents", 1)
+    documents = [{"id": i, "vector": [0.1, 0.1, 0.8]} for i in (51, 52)]
+
+    response = client.post(
+        "/qdrant/batch?background=true",
+        json={"collection_name": "test_collection", "documents": documents},
+    )
+
+    assert response.status_code == 413
+
+
 def test_delete_document():
     response = client.delete(
         "/qdrant/test_collection/1",
@@ -0,0 +1,51 @@
+import asyncio
+import numpy as np
+from app.services.batching import MicroBatcher
+
+
+def test_concurrent_requests_share_batches():
+    calls = []
+
+    async def embed(texts):
+        calls.append(len(texts))
+        await asyncio.sleep(0.01)
+        return np.array([[float(t)] for t in texts], dtype=np.float32)
+
+    async def run():
+        batcher = MicroBatcher(embed, max_batch_size=8, max_wait_ms=20)
+        try:
+            results = await asyncio.gather(
+                *(batcher.submit([str(i), str(i + 100)]) for i in range(10))
+            )
+            return results, batcher.stats()
+        finally:
+            await batcher.close()
+
+    results, stats = asyncio.run(run())
+
+    for i, rows in enumerate(results):
+        assert rows[:, 0].tolist() == [i, i + 100]
+    assert sum(calls) == 20
+    assert len(calls) < 10
+    assert stats["requests"] == 10
+    assert stats["texts"] == 20
+    assert stats["batches"] == len(calls)
+    assert sum(stats["batch_size_histogram"].values()) == len(calls)
+
+
+def test_failed_batch_fails_every_caller():
+    async def embed(texts):
+        raise RuntimeError("model unavailable")
+
+    async def run():
+        batcher = MicroBatcher(embed, max_wait_ms=5)
+        try:
+            return await asyncio.gather(
+                batcher.submit(["a"]), batcher.submit(["b"]), return_exceptions=True
+            )
+        finally:
+            await batcher.close()
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(r, RuntimeError) for r in results)
@@ -0,0 +1,105 @@
+import pytest
+
+transformers = pytest.importorskip("transformers")
+
+from app.services.chunking import chunk_point_id, iter_chunks
+
+TEXT = " ".join(
+    f"the vector database stores {i} embeddings for retrieval. search the index"
+    for i in range(40)
+)
+
+
+@pytest.fixture(scope="module")
+def tokenizer(tiny_model_path):
+    return transformers.BertTokenizerFast.from_pretrained(tiny_model_path)
+
+
+def test_chunks_are_bounded_overlapping_slices(tokenizer):
+    chunks = list(
+        iter_chunks(TEXT, tokenizer, max_tokens=20, overlap=4, sentence_aware=False)
+    )
+
+    assert [c["index"] for c in chunks] == list(range(len(chunks)))
+    assert all(c["tokens"] <= 20 for c in chunks)
+    assert all(c["text"] == TEXT[c["start"] : c["end"]] for c in chunks)
+    assert chunks[0]["start"] == 0
+    assert chunks[-1]["end"] == len(TEXT)
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current["start"] < previous["end"]
+
+
+def test_small_tokenizer_blocks_give_the_same_chunks(tokenizer):
+    whole = list(iter_chunks(TEXT, tokenizer, max_tokens=20, overlap=4))
+    blocked = list(
+        iter_chunks(TEXT, tokenizer, max_tokens=20, overlap=4, block_chars=50)
+    )
+
+    assert blocked == whole
+
+
+def test_sentence_aware_chunks_end_on_sentences(tokenizer):
+    # Sentences are 13 tokens long, so every 24 token window holds an ending
+    chunks = list(iter_chunks(TEXT, tokenizer, max_tokens=24, overlap=0))
+
+    assert all(c["text"].endswith(".") for c in chunks[:-1])
+
+
+def test_short_text_is_one_chunk(tokenizer):
+    chunks = list(iter_chunks("search the index", tokenizer))
+
+    assert len(chunks) == 1
+    assert chunks[0]["text"] == "search the index"
+    assert list(iter_chunks("", tokenizer)) == []
+
+
+def test_chunk_point_id_is_deterministic():
+    assert chunk_point_id("doc", 3) == chunk_point_id("doc", 3)
+    assert chunk_point_id("doc", 3) != chunk_point_id("doc", 4)
+
+
+def test_chunked_text_upload(tiny_model_path):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.embedding import EmbeddingService
+
+    with TestClient(app) as client:
+        app.state.embedding_service = EmbeddingService(
+            model_name=tiny_model_path, max_length=64
+        )
+        client.post(
+            "/qdrant/collections/",
+            json={"name": "test_chunk_collection", "dimensions": "32"},
+        )
+
+        response = client.post(
+            "/qdrant/test_chunk_collection/text/chunked",
+            json={"id": "doc", "text": TEXT, "max_tokens": 30, "overlap": 5},
+        )
+        assert response.status_code == 201
+        uploaded = response.json()["details"]["uploaded"]
+        assert uploaded > 1
+
+        # A shorter new version replaces every chunk of the old one
+        response = client.post(
+            "/qdrant/test_chunk_collection/text/chunked",
+            json={"id": "doc", "text": TEXT[:100], "max_tokens": 30, "overlap": 5},
+        )
+        assert response.json()["details"]["uploaded"] < uploaded
+        count = client.post(
+            "/qdrant/test_chunk_collection/count",
+            json={
+                "filter": {"must": [{"key": "parent_id", "match": {"value": "doc"}}]}
+            },
+        )
+        assert (
+            count.json()["details"]["count"] == response.json()["details"]["uploaded"]
+        )
+
+        response = client.post(
+            "/qdrant/test_chunk_collection/text/chunked",
+            json={"id": "doc", "text": TEXT, "max_tokens": 100},
+        )
+        assert response.status_code == 400
+
+        client.delete("/qdrant/collections/test_chunk_collection")
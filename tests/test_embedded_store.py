@@ -0,0 +1,323 @@
+import asyncio
+import os
+import shutil
+import numpy as np
+import pytest
+from qdrant_client.http import models
+from app.models.models import Collection, CollectionCreate, Document, SearchQuery
+from app.services import embedded_store
+from app.services.embedded_store import EmbeddedClient
+from app.services.qdrant import QdrantService
+from app.services.sparse import SPARSE_VECTOR
+
+
+def brute_force(vectors, query, distance):
+    if distance == "Cosine":
+        vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        scores = vectors @ (query / np.linalg.norm(query))
+        return np.argsort(-scores), scores
+    if distance == "Dot":
+        scores = vectors @ query
+        return np.argsort(-scores), scores
+    if distance == "Euclid":
+        scores = np.linalg.norm(vectors - query, axis=1)
+    else:
+        scores = np.abs(vectors - query).sum(axis=1)
+    return np.argsort(scores), scores
+
+
+@pytest.mark.parametrize("distance", ["Cosine", "Dot", "Euclid", "Manhattan"])
+def test_search_is_exact(distance, monkeypatch):
+    # Small blocks, so the top k of several blocks are merged
+    monkeypatch.setattr(embedded_store, "BLOCK_ROWS", 64)
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, 16)).astype(np.float32)
+    queries = rng.normal(size=(3, 16)).astype(np.float32)
+    client = EmbeddedClient(":memory:")
+
+    async def run():
+        await client.create_collection(
+            "docs", vectors_config=models.VectorParams(size=16, distance=distance)
+        )
+        await client.upsert(
+            "docs",
+            points=[
+                models.PointStruct(
+                    id=i, vector=v.tolist(), payload={"even": i % 2 == 0}
+                )
+                for i, v in enumerate(vectors)
+            ],
+        )
+        single = await client.query_points("docs", query=queries[0].tolist(), limit=5)
+        even = await client.query_points(
+            "docs",
+            query=queries[0].tolist(),
+            query_filter=models.Filter(
+                must=[
+                    models.FieldCondition(
+                        key="even", match=models.MatchValue(value=True)
+                    )
+                ]
+            ),
+            limit=5,
+        )
+        batch = await client.query_batch_points(
+            "docs",
+            requests=[models.QueryRequest(query=q.tolist(), limit=5) for q in queries],
+        )
+        await client.close()
+        return single, even, batch
+
+    single, even, batch = asyncio.run(run())
+
+    order, scores = brute_force(vectors, queries[0], distance)
+    assert [p.id for p in single.points] == order[:5].tolist()
+    assert [p.score for p in single.points] == pytest.approx(
+        scores[order[:5]], rel=1e-4
+    )
+    assert [p.id for p in even.points] == [i for i in order if i % 2 == 0][:5]
+    for query, response in zip(queries, batch):
+        order, _ = brute_force(vectors, query, distance)
+        assert [p.id for p in response.points] == order[:5].tolist()
+
+
+def test_updates_tombstone_and_compact(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedded_store, "COMPACT_MIN_ROWS", 8)
+    path = str(tmp_path / "store")
+    client = EmbeddedClient(path, compact_ratio=0.4)
+
+    async def write():
+        await client.create_collection(
+            "docs", vectors_config=models.VectorParams(size=2, distance="Dot")
+        )
+        await client.upsert(
+            "docs",
+            points=[
+                models.PointStruct(id=i, vector=[float(i), 1.0], payload={"i": i})
+                for i in range(10)
+            ],
+        )
+        # Three rows become tombstones: two rewrites and a delete
+        await client.upsert(
+            "docs",
+            points=[models.PointStruct(id=1, vector=[100.0, 0.0], payload={"i": -1})],
+        )
+        await client.update_vectors(
+            "docs", points=[models.PointVectors(id=2, vector=[50.0, 0.0])]
+        )
+        await client.delete("docs", points_selector=models.PointIdsList(points=[3]))
+        collection = client._collections["docs"]
+        before = (collection.rows, collection.tombstones)
+        # Two more tombstones cross 40% of the rows
+        await client.delete("docs", points_selector=models.PointIdsList(points=[4, 5]))
+        after = (collection.rows, collection.tombstones)
+        await client.close()
+        return before, after
+
+    before, after = asyncio.run(write())
+    assert before == (12, 3)
+    assert after == (7, 0)
+
+    reopened = EmbeddedClient(path)
+
+    async def read():
+        top = await reopened.query_points("docs", query=[1.0, 0.0], limit=2)
+        count = await reopened.count("docs")
+        page, offset = await reopened.scroll("docs", limit=4)
+        await reopened.close()
+        return top, count, page, offset
+
+    top, count, page, offset = asyncio.run(read())
+    assert [(p.id, p.payload) for p in top.points] == [(1, {"i": -1}), (2, {"i": 2})]
+    assert count.count == 7
+    assert [p.id for p in page] == [0, 1, 2, 6]
+    assert offset == 7
+
+
+def test_interrupted_compaction_and_store_lock(tmp_path):
+    path = str(tmp_path / "store")
+    client = EmbeddedClient(path)
+
+    async def write():
+        for name in ("docs", "notes"):
+            await client.create_collection(
+                name, vectors_config=models.VectorParams(size=2, distance="Dot")
+            )
+            await client.upsert(
+                name, points=[models.PointStruct(id=1, vector=[1.0, 0.0], payload={})]
+            )
+
+    asyncio.run(write())
+    # A second process cannot open the store while it is in use
+    with pytest.raises(RuntimeError, match="one process"):
+        EmbeddedClient(path)
+    asyncio.run(client.close())
+
+    # "docs" crashed after being moved aside, before its new copy was swapped
+    # in; "notes" crashed while its new copy was being written
+    docs, notes = os.path.join(path, "docs"), os.path.join(path, "notes")
+    shutil.copytree(docs, docs + ".compacting")
+    os.replace(docs, docs + ".replaced")
+    shutil.copytree(notes, notes + ".compacting")
+    reopened = EmbeddedClient(path)
+
+    async def read():
+        counts = [(await reopened.count(name)).count for name in ("docs", "notes")]
+        collections = await reopened.get_collections()
+        await reopened.close()
+        return counts, collections
+
+    counts, collections = asyncio.run(read())
+    assert counts == [1, 1]
+    assert sorted(c.name for c in collections.collections) == ["docs", "notes"]
+    assert sorted(os.listdir(path)) == [".lock", "docs", "notes"]
+
+
+def test_qdrant_service_on_embedded_client():
+    service = QdrantService(client=EmbeddedClient(":memory:"))
+    collection = Collection(name="docs")
+
+    async def run():
+        created = await service.create_collection(
+            CollectionCreate(name="docs", dimensions=2, distance="euclid")
+        )
+        uploaded = await service.upload_documents(
+            collection,
+            [
+                Document(id=i, vector=[float(i), 0.0], metadata={"i": i})
+                for i in range(5)
+            ],
+        )
+        found = await service.search(
+            collection, SearchQuery(vector=[3.2, 0.0], top_k=2, score_threshold=1.0)
+        )
+        missing = await service.search(
+            Collection(name="missing"), SearchQuery(vector=[0.0, 0.0])
+        )
+        duplicate = await service.create_collection(
+            CollectionCreate(name="docs", dimensions=2)
+        )
+        await service.close()
+        return created, uploaded, found, missing, duplicate
+
+    created, uploaded, found, missing, duplicate = asyncio.run(run())
+
+    assert created["success"] and uploaded["success"]
+    assert [(p["id"], round(p["score"], 3)) for p in found["content"]] == [
+        (3, 0.2),
+        (4, 0.8),
+    ]
+    assert not missing["success"]
+    assert duplicate["status_code"] == 400
+
+
+def test_dense_update_keeps_the_sparse_vector():
+    client = EmbeddedClient(":memory:")
+    sparse = models.SparseVector(indices=[3, 7], values=[0.5, 1.5])
+
+    async def run():
+        await client.create_collection(
+            "docs",
+            vectors_config=models.VectorParams(size=2, distance="Dot"),
+            sparse_vectors_config={SPARSE_VECTOR: models.SparseVectorParams()},
+        )
+        await client.upsert(
+            "docs",
+            points=[
+                models.PointStruct(
+                    id=1, vector={"": [1.0, 0.0], SPARSE_VECTOR: sparse}, payload={}
+                )
+            ],
+        )
+        # As QdrantService.update_document sends a dense-only document
+        await client.update_vectors(
+            "docs", points=[models.PointVectors(id=1, vector=[0.0, 1.0])]
+        )
+        found = await client.query_points(
+            "docs", query=sparse, using=SPARSE_VECTOR, limit=1
+        )
+        (point,) = await client.retrieve("docs", ids=[1], with_vectors=True)
+        await client.close()
+        return found, point
+
+    found, point = asyncio.run(run())
+
+    assert [p.id for p in found.points] == [1]
+    assert point.vector[""] == [0.0, 1.0]
+    assert point.vector[SPARSE_VECTOR].indices == [3, 7]
+
+
+def test_scroll_order_follows_writes():
+    client = EmbeddedClient(":memory:")
+    uuid = "5c56c793-69f3-4fbf-87e6-c4bf54c28c26"
+
+    def point(i, payload=None):
+        return models.PointStruct(
+            id=i, vector=[float(i), 1.0], payload=payload or {"i": i}
+        )
+
+    async def scroll_all():
+        ids, offset = [], None
+        while True:
+            page, offset = await client.scroll("docs", limit=3, offset=offset)
+            ids += [p.id for p in page]
+            if offset is None:
+                return ids
+
+    async def run():
+        await client.create_collection(
+            "docs", vectors_config=models.VectorParams(size=2, distance="Dot")
+        )
+        await client.upsert("docs", points=[point(i) for i in (8, 2, 6, 4)])
+        first = await scroll_all()
+        # Writes after the order was built: new ids, a rewrite and deletes
+        await client.upsert(
+            "docs", points=[point(5), point(2, {"i": -2}), point(9), point(1)]
+        )
+        await client.upsert(
+            "docs",
+            points=[models.PointStruct(id=uuid, vector=[0.0, 1.0], payload={})],
+        )
+        await client.delete("docs", points_selector=models.PointIdsList(points=[6]))
+        second = await scroll_all()
+        page, _ = await client.scroll("docs", limit=2)
+        rewritten = page[1]
+        await client.close()
+        return first, second, rewritten
+
+    first, second, rewritten = asyncio.run(run())
+
+    assert first == [2, 4, 6, 8]
+    assert second == [1, 2, 4, 5, 8, 9, uuid]
+    assert rewritten.payload == {"i": -2}
+
+
+def test_match_any_skips_objects_and_nested_arrays():
+    client = EmbeddedClient(":memory:")
+    payloads = [{"tag": "a"}, {"tag": {"name": "a"}}, {"tag": [["a"], "b"]}]
+
+    def condition(match):
+        return models.Filter(must=[models.FieldCondition(key="tag", match=match)])
+
+    async def run():
+        await client.create_collection(
+            "docs", vectors_config=models.VectorParams(size=2, distance="Dot")
+        )
+        await client.upsert(
+            "docs",
+            points=[
+                models.PointStruct(id=i, vector=[1.0, 0.0], payload=payload)
+                for i, payload in enumerate(payloads)
+            ],
+        )
+        found = []
+        for match in (
+            models.MatchAny(any=["a", "b"]),
+            models.MatchExcept(**{"except": ["a"]}),
+        ):
+            page, _ = await client.scroll("docs", scroll_filter=condition(match))
+            found.append([p.id for p in page])
+        await client.close()
+        return found
+
+    assert asyncio.run(run()) == [[0, 2], [2]]
@@ -0,0 +1,324 @@
+import asyncio
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+
+from app.services.embedding import EmbeddingService
+from app.services.text_processing import TextEncoder
+
+TEXTS = [
+    "search the vector database",
+    "a long document chunk stores the text for retrieval and the query filter",
+    "cosine distance",
+]
+
+
+def test_encode_batch_matches_encode(tiny_model_path):
+    encoder = TextEncoder(model_name=tiny_model_path, max_length=64)
+    batched = encoder.encode_batch(TEXTS, batch_size=2)
+
+    assert batched.shape == (3, 32)
+    assert batched.dtype == np.float32
+    for text, row in zip(TEXTS, batched):
+        single = encoder.encode(text)[0].numpy()
+        np.testing.assert_allclose(row, single / np.linalg.norm(single), atol=1e-5)
+
+
+def test_encode_batch_empty(tiny_model_path):
+    encoder = TextEncoder(model_name=tiny_model_path)
+
+    assert encoder.encode_batch([]).shape == (0, 32)
+
+
+def test_embedding_service_embed(tiny_model_path):
+    service = EmbeddingService(model_name=tiny_model_path, workers=1, torch_threads=1)
+
+    async def embed():
+        try:
+            return await service.embed(TEXTS)
+        finally:
+            await service.close()
+
+    vectors = asyncio.run(embed())
+
+    assert vectors.shape == (3, 32)
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
+
+
+def test_text_upload_and_search(tiny_model_path):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        app.state.embedding_service = EmbeddingService(model_name=tiny_model_path)
+        client.post(
+            "/qdrant/collections/",
+            json={"name": "test_text_collection", "dimensions": "32"},
+        )
+        documents = [{"id": i, "text": t} for i, t in enumerate(TEXTS)]
+
+        response = client.post(
+            "/qdrant/test_text_collection/text", json={"documents": documents}
+        )
+        assert response.status_code == 201
+        assert response.json()["details"]["uploaded"] == 3
+
+        response = client.post(
+            "/qdrant/test_text_collection/search/text",
+            json={"text": TEXTS[1], "top_k": 1},
+        )
+        assert response.status_code == 200
+        assert response.json()["details"]["points"][0]["payload"]["text"] == TEXTS[1]
+
+        client.delete("/qdrant/collections/test_text_collection")
+
+
+def test_retrieve(tiny_model_path):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        app.state.embedding_service = EmbeddingService(model_name=tiny_model_path)
+        client.post(
+            "/qdrant/collections/",
+            json={"name": "test_retrieve_collection", "dimensions": "32"},
+        )
+        # The first text twice, under another id
+        documents = [{"id": i, "text": t} for i, t in enumerate(TEXTS + TEXTS[:1])]
+        client.post(
+            "/qdrant/test_retrieve_collection/text", json={"documents": documents}
+        )
+
+        response = client.post(
+            "/qdrant/test_retrieve_collection/retrieve/context",
+            json={"text": TEXTS[0], "top_k": 3, "max_tokens": 8},
+        )
+        assert response.status_code == 200
+        details = response.json()["details"]
+        assert details["duplicates"] == 1
+        assert details["points"][0]["payload"]["text"] == TEXTS[0]
+        assert details["points"][0]["vector"] is None
+        # The long text does not fit next to the first one
+        assert [p["payload"]["text"] for p in details["points"]] == [
+            TEXTS[0],
+            TEXTS[2],
+        ]
+        assert details["tokens"] <= 8
+
+        client.delete("/qdrant/collections/test_retrieve_collection")
+
+
+def test_embedding_service_cache(tiny_model_path):
+    service = EmbeddingService(model_name=tiny_model_path, dynamic_batching=False)
+
+    async def embed_twice():
+        try:
+            first = await service.embed(TEXTS)
+            second = await service.embed([TEXTS[2], TEXTS[0], TEXTS[2]])
+            return first, second
+        finally:
+            await service.close()
+
+    first, second = asyncio.run(embed_twice())
+
+    np.testing.assert_array_equal(second, first[[2, 0, 2]])
+    stats = service.stats()["cache"]
+    assert (stats["hits"], stats["misses"]) == (3, 3)
+
+
+def test_onnx_backend_matches_torch(tiny_model_path, tmp_path):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnxscript")
+    baseline = TextEncoder(model_name=tiny_model_path).encode_batch(TEXTS)
+    onnx_dir = str(tmp_path / "onnx")
+
+    fp32 = TextEncoder(model_name=tiny_model_path, backend="onnx", onnx_dir=onnx_dir)
+    int8 = TextEncoder(
+        model_name=tiny_model_path, backend="onnx", quantize=True, onnx_dir=onnx_dir
+    )
+
+    assert fp32.dimensions == 32
+    np.testing.assert_allclose(fp32.encode_batch(TEXTS), baseline, atol=1e-5)
+    # The vectors are unit length, so row-wise dot products are cosine similarities
+    similarity = (int8.encode_batch(TEXTS) * baseline).sum(axis=1)
+    assert similarity.min() > 0.99
+
+
+def test_concurrent_onnx_exports(tiny_model_path, tmp_path):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnxscript")
+    from concurrent.futures import ThreadPoolExecutor
+    from app.services.onnx_backend import load_session
+
+    onnx_dir = tmp_path / "onnx"
+
+    with ThreadPoolExecutor(3) as pool:
+        sessions = list(
+            pool.map(
+                lambda _: load_session(tiny_model_path, str(onnx_dir), quantize=True),
+                range(3),
+            )
+        )
+
+    assert len(sessions) == 3
+    assert sorted(p.name for p in onnx_dir.iterdir()) == [
+        ".lock",
+        "model.int8.onnx",
+        "model.json",
+        "model.onnx",
+    ]
+
+
+def test_onnx_export_follows_the_weights(tiny_model_path, tmp_path):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnxscript")
+    import shutil
+    import transformers
+    from app.services.onnx_backend import load_session
+
+    model_path = str(tmp_path / "model")
+    shutil.copytree(tiny_model_path, model_path)
+    onnx_dir = tmp_path / "onnx"
+    load_session(model_path, str(onnx_dir), quantize=True)
+    exported = (onnx_dir / "model.onnx").stat().st_mtime_ns
+
+    # Loading again reuses the export
+    load_session(model_path, str(onnx_dir), quantize=True)
+    assert (onnx_dir / "model.onnx").stat().st_mtime_ns == exported
+
+    # New weights at the same path, and another max_length, are exported again
+    config = transformers.BertConfig.from_pretrained(model_path)
+    transformers.BertModel(config).save_pretrained(model_path)
+    load_session(model_path, str(onnx_dir), quantize=True)
+    reexported = (onnx_dir / "model.onnx").stat().st_mtime_ns
+    assert reexported != exported
+    load_session(model_path, str(onnx_dir), max_length=64)
+    assert (onnx_dir / "model.onnx").stat().st_mtime_ns != reexported
+    assert not (onnx_dir / "model.int8.onnx").exists()
+
+
+def test_quantize_needs_onnx(tiny_model_path):
+    with pytest.raises(ValueError):
+        TextEncoder(model_name=tiny_model_path, quantize=True)
+
+
+def test_mmap_weights_match_from_pretrained(tiny_model_path):
+    pytest.importorskip("safetensors")
+    baseline = TextEncoder(model_name=tiny_model_path).encode_batch(TEXTS)
+
+    encoder = TextEncoder(model_name=tiny_model_path, mmap_weights=True)
+
+    np.testing.assert_allclose(encoder.encode_batch(TEXTS), baseline, atol=1e-6)
+
+
+def test_services_share_encoder_and_warm_up(tiny_model_path):
+    first = EmbeddingService(model_name=tiny_model_path, torch_threads=1)
+    second = EmbeddingService(model_name=tiny_model_path, torch_threads=1)
+    assert first.status == "not_loaded"
+
+    async def warm_up():
+        try:
+            await first.warm_up()
+        finally:
+            await first.close()
+            await second.close()
+
+    asyncio.run(warm_up())
+
+    assert first.status == "warm"
+    assert second.encoder is first.encoder
+
+
+def test_process_pool_matches_in_process(tiny_model_path):
+    baseline = TextEncoder(model_name=tiny_model_path).encode_batch(TEXTS)
+    service = EmbeddingService(model_name=tiny_model_path, torch_threads=1, processes=2)
+    service.pool.max_rows = 2  # three texts are split across both processes
+
+    async def embed():
+        try:
+            embeddings = await service.embed(TEXTS)
+            return embeddings, service.stats()["processes"]
+        finally:
+            await service.close()
+
+    embeddings, health = asyncio.run(embed())
+
+    np.testing.assert_allclose(embeddings, baseline, atol=1e-5)
+    assert health["healthy"]
+    assert sum(worker["texts"] for worker in health["workers"]) == 3
+    assert not any(worker.alive for worker in service.pool._workers)
+
+
+def test_process_pool_replaces_dead_worker(tiny_model_path):
+    from app.services.embedding_pool import EmbeddingProcessPool
+
+    pool = EmbeddingProcessPool(tiny_model_path, processes=1)
+
+    async def run():
+        try:
+            await pool.start()
+            worker = pool._workers[0]
+            worker.process.kill()
+            worker.process.join()
+            with pytest.raises(RuntimeError):
+                await pool.embed(TEXTS)
+            # The job waits for the replacement process to start
+            return await pool.embed(TEXTS)
+        finally:
+            await pool.close()
+
+    assert asyncio.run(run()).shape == (3, 32)
+    assert pool.restarts == 1
+
+
+def test_process_pool_retries_failed_restarts(tiny_model_path):
+    from app.services.embedding_pool import EmbeddingProcessPool
+
+    pool = EmbeddingProcessPool(tiny_model_path, processes=1, restart_backoff=0.05)
+    spawn = pool._spawn
+    failures = 2
+
+    async def flaky_spawn(index):
+        nonlocal failures
+        if failures:
+            failures -= 1
+            raise RuntimeError("out of memory")
+        return await spawn(index)
+
+    async def run():
+        try:
+            await pool.start()
+            pool._spawn = flaky_spawn
+            worker = pool._workers[0]
+            worker.process.kill()
+            worker.process.join()
+            with pytest.raises(RuntimeError):
+                await pool.embed(TEXTS)
+            # Every process is down and restarting failed: jobs fail at once
+            while not pool.health()["down"]:
+                await asyncio.sleep(0.01)
+            with pytest.raises(RuntimeError, match="No embedding process"):
+                await asyncio.wait_for(pool.embed(TEXTS), 1)
+            while pool.restarts == 0:
+                await asyncio.sleep(0.05)
+            return await pool.embed(TEXTS)
+        finally:
+            await pool.close()
+
+    assert asyncio.run(asyncio.wait_for(run(), 120)).shape == (3, 32)
+    assert failures == 0
+    assert not pool.health()["down"]
+
+
+def test_preload_skips_the_model_with_processes(tiny_model_path, monkeypatch):
+    from app.core.config import settings
+    from app.services import embedding
+
+    monkeypatch.setattr(settings, "EMBEDDING_MODEL", tiny_model_path)
+    monkeypatch.setattr(settings, "EMBEDDING_PROCESSES", 2)
+    loaded = dict(embedding._encoders)
+
+    EmbeddingService.preload()
+
+    assert embedding._encoders == loaded
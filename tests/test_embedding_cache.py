@@ -0,0 +1,98 @@
+import multiprocessing
+import numpy as np
+from app.services.embedding_cache import EmbeddingCache, cache_key
+
+
+def vector(value: float, size: int = 4) -> np.ndarray:
+    return np.full(size, value, dtype=np.float32)
+
+
+def test_cache_key_normalizes_whitespace_only():
+    key = cache_key("bert", "hello  world\n", 512, "mean")
+
+    assert key == cache_key("bert", " hello world", 512, "mean")
+    assert key != cache_key("bert", "hello world", 128, "mean")
+    assert key != cache_key("other", "hello world", 512, "mean")
+    assert key != cache_key("bert", "Hello world", 512, "mean")
+
+
+def test_lru_is_bounded_by_bytes():
+    entry = vector(0).nbytes + 16
+    cache = EmbeddingCache(max_bytes=2 * entry)
+    keys = [cache_key("m", str(i), 512, "mean") for i in range(3)]
+
+    cache.put(keys[0], vector(0))
+    cache.put(keys[1], vector(1))
+    cache.get(keys[0])
+    cache.put(keys[2], vector(2))
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0])[0] == 0
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= 2 * entry
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    keys = [cache_key("m", str(i), 512, "mean") for i in range(3)]
+    cache = EmbeddingCache(max_bytes=1024, path=str(tmp_path), disk_rows=2)
+    for i, key in enumerate(keys):
+        cache.put(key, vector(i))
+    assert cache.stats()["disk_evictions"] == 1
+    cache.close()
+
+    restarted = EmbeddingCache(max_bytes=1024, path=str(tmp_path))
+
+    assert restarted.get(keys[0]) is None
+    np.testing.assert_array_equal(restarted.get(keys[2]), vector(2))
+    assert restarted.stats()["disk_hits"] == 1
+    restarted.put(cache_key("m", "3", 512, "mean"), vector(3))
+    assert keys[1] not in restarted.disk.rows
+
+
+def test_disk_tier_is_recreated_for_another_model(tmp_path):
+    key = cache_key("m", "text", 512, "mean")
+    cache = EmbeddingCache(max_bytes=0, path=str(tmp_path), model_id="small")
+    cache.put(key, vector(1, size=4))
+    cache.close()
+
+    other = EmbeddingCache(max_bytes=0, path=str(tmp_path), model_id="large")
+    assert other.get(key) is None
+    other.put(key, vector(2, size=8))
+    other.close()
+
+    restarted = EmbeddingCache(max_bytes=0, path=str(tmp_path), model_id="large")
+    np.testing.assert_array_equal(restarted.get(key), vector(2, size=8))
+
+
+def hold_disk_tier(path, opened, release):
+    cache = EmbeddingCache(max_bytes=0, path=path, model_id="m")
+    cache.put(cache_key("m", "worker", 512, "mean"), vector(1))
+    opened.set()
+    release.wait(10)
+    cache.close()
+
+
+def test_disk_tier_is_used_by_one_process(tmp_path):
+    key = cache_key("m", "worker", 512, "mean")
+    context = multiprocessing.get_context("spawn")
+    opened, release = context.Event(), context.Event()
+    worker = context.Process(
+        target=hold_disk_tier, args=(str(tmp_path), opened, release)
+    )
+    worker.start()
+    try:
+        assert opened.wait(30)
+        # Another worker on the same path caches in memory only
+        cache = EmbeddingCache(max_bytes=1024, path=str(tmp_path), model_id="m")
+        assert cache.disk is None
+        assert cache.get(key) is None
+        cache.put(key, vector(2))
+        np.testing.assert_array_equal(cache.get(key), vector(2))
+    finally:
+        release.set()
+        worker.join(30)
+
+    restarted = EmbeddingCache(max_bytes=0, path=str(tmp_path), model_id="m")
+    np.testing.assert_array_equal(restarted.get(key), vector(1))
@@ -0,0 +1,79 @@
+import time
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.endpoints import admin
+from app.api.responses import ORJSONResponse
+from app.core.profiling import ProfileStore, ProfilingMiddleware, record_stage
+
+
+def make_client(tmp_path, sample_rate=1.0, slow_ms=1000.0, max_profiles=3):
+    app = FastAPI()
+    app.state.profile_store = ProfileStore(str(tmp_path), max_profiles=max_profiles)
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=app.state.profile_store,
+        sample_rate=sample_rate,
+        slow_ms=slow_ms,
+    )
+    app.include_router(admin.router, prefix="/admin")
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int, sleep_ms: float = 0):
+        record_stage("qdrant", 0.001)
+        time.sleep(sleep_ms / 1000)
+        return ORJSONResponse({"id": item_id})
+
+    return TestClient(app)
+
+
+def test_sampled_profile_has_stages_and_cprofile(tmp_path):
+    client = make_client(tmp_path)
+    assert client.get("/items/1").status_code == 200
+    profiles = client.get("/admin/profiles").json()["details"]["profiles"]
+    assert len(profiles) == 1
+    summary = profiles[0]
+    assert summary["route"] == "/items/{item_id}"
+    assert summary["sampled"] is True
+    stages = summary["stages_ms"]
+    assert stages["qdrant"] >= 1.0
+    assert {"serialization", "validation_and_other"} <= stages.keys()
+
+    profile = client.get(f"/admin/profiles/{summary['id']}").json()["details"]
+    assert "function calls" in profile["cprofile"]
+    raw = client.get(f"/admin/profiles/{summary['id']}/raw")
+    assert raw.status_code == 200 and raw.content
+
+
+def test_only_slow_requests_saved_when_not_sampled(tmp_path):
+    client = make_client(tmp_path, sample_rate=0.0, slow_ms=20)
+    client.get("/items/1")
+    client.get("/items/2", params={"sleep_ms": 30})
+    profiles = client.get("/admin/profiles").json()["details"]["profiles"]
+    assert [p["path"] for p in profiles] == ["/items/2"]
+    assert profiles[0]["sampled"] is False
+    assert client.get(f"/admin/profiles/{profiles[0]['id']}/raw").status_code == 404
+
+
+def test_profile_ring_is_bounded(tmp_path):
+    client = make_client(tmp_path, max_profiles=3)
+    for i in range(5):
+        client.get(f"/items/{i}")
+    profiles = client.get("/admin/profiles").json()["details"]["profiles"]
+    assert [p["path"] for p in profiles] == ["/items/4", "/items/3", "/items/2"]
+    # The admin requests themselves are profiled too, so count files, not calls
+    assert len(list(tmp_path.glob("*.json"))) == 3
+
+
+def test_profile_ring_survives_restart(tmp_path):
+    client = make_client(tmp_path, max_profiles=3)
+    for i in range(3):
+        client.get(f"/items/{i}")
+    first_ids = ProfileStore(str(tmp_path)).ids()
+
+    # A new store, as after a restart or in another worker, sees the old files
+    restarted = make_client(tmp_path, max_profiles=3)
+    restarted.get("/items/9")
+    profiles = restarted.get("/admin/profiles").json()["details"]["profiles"]
+    assert profiles[0]["path"] == "/items/9"
+    assert len(list(tmp_path.glob("*.json"))) == 3
+    assert first_ids[0] not in [p["id"] for p in profiles]
@@ -0,0 +1,221 @@
+import asyncio
+import time
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http import models
+from app.core.deadlines import (
+    DeadlineExceeded,
+    DeadlineMiddleware,
+    reset_deadline,
+    set_deadline,
+)
+from app.core.limiter import AdaptiveLimiter, ConcurrencyLimitMiddleware
+from app.models.models import Collection, SearchQuery
+from app.services.hedging import ResilientClient
+from app.services.qdrant import QdrantService
+
+
+class SlowQdrant:
+    """A local Qdrant whose calls are delayed by ``delays[method](call_number)``."""
+
+    def __init__(self, client, delays=None):
+        self.client = client
+        self.delays = delays or {}
+        self.calls = {}
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        async def call(*args, **kwargs):
+            number = self.calls[name] = self.calls.get(name, 0) + 1
+            delay = self.delays.get(name)
+            if delay is not None:
+                await asyncio.sleep(delay(number))
+            return await method(*args, **kwargs)
+
+        return call
+
+
+async def collection(client) -> None:
+    await client.create_collection(
+        "docs", vectors_config=models.VectorParams(size=2, distance="Cosine")
+    )
+    await client.upsert(
+        "docs", points=[models.PointStruct(id=1, vector=[1.0, 0.0], payload={})]
+    )
+
+
+def test_slow_reads_are_hedged_to_a_replica():
+    local = AsyncQdrantClient(location=":memory:")
+    # Every 25th read of the primary stalls; the replica is always fast
+    primary = SlowQdrant(
+        local, {"query_points": lambda n: 1.0 if n % 25 == 0 else 0.001}
+    )
+    replica = SlowQdrant(local)
+    client = ResilientClient(
+        primary, replicas=[replica], percentile=90, min_delay=0.005, budget=0.5
+    )
+
+    async def run():
+        await collection(local)
+        latencies = []
+        for _ in range(50):
+            start = time.perf_counter()
+            response = await client.query_points("docs", query=[1.0, 0.0])
+            latencies.append(time.perf_counter() - start)
+            assert response.points[0].id == 1
+        return latencies
+
+    latencies = asyncio.run(run())
+
+    # The stalled 25th and 50th reads were answered by the replica
+    assert max(latencies) < 0.5
+    assert client.hedges >= 1
+    assert replica.calls["query_points"] == client.hedges
+
+
+def test_calls_are_bounded_by_the_deadline():
+    local = AsyncQdrantClient(location=":memory:")
+    service = QdrantService(
+        client=SlowQdrant(local, {"query_points": lambda n: 1.0, "upsert": lambda n: 0})
+    )
+
+    async def run():
+        await collection(local)
+        token = set_deadline(0.05)
+        try:
+            start = time.perf_counter()
+            response = await service.search(
+                Collection(name="docs"), SearchQuery(vector=[1.0, 0.0])
+            )
+            elapsed = time.perf_counter() - start
+            with pytest.raises(DeadlineExceeded):
+                await service.client.count("docs")
+        finally:
+            reset_deadline(token)
+        return response, elapsed
+
+    response, elapsed = asyncio.run(run())
+
+    assert response["status_code"] == 504
+    assert elapsed < 0.5
+
+
+def test_request_deadline_header():
+    from app.main import app
+
+    with TestClient(app) as client:
+        local = AsyncQdrantClient(location=":memory:")
+        asyncio.run(collection(local))
+        app.state.qdrant_service = QdrantService(
+            client=SlowQdrant(local, {"query_points": lambda n: 0.5})
+        )
+
+        response = client.post(
+            "/qdrant/docs/search",
+            json={"vector": [1.0, 0.0]},
+            headers={"X-Request-Timeout": "0.05"},
+        )
+        assert response.status_code == 504
+
+        response = client.post("/qdrant/docs/search", json={"vector": [1.0, 0.0]})
+        assert response.status_code == 200
+
+
+def test_limiter_adapts_to_latency():
+    limiter = AdaptiveLimiter(initial_limit=20, min_limit=2, max_limit=40)
+
+    for _ in range(15):
+        assert limiter.try_acquire()
+    # Busy and fast: the limit grows
+    for _ in range(30):
+        limiter.release(0.01)
+        limiter.try_acquire()
+    grown = limiter.limit
+    assert grown > 20
+    # Latency rises well above its long-run average: the limit shrinks
+    for _ in range(30):
+        limiter.release(0.2)
+        limiter.try_acquire()
+    assert limiter.limit < grown
+    shrunk = limiter.limit
+    limiter.release(0.01, dropped=True)
+    assert limiter.limit == pytest.approx(max(shrunk * 0.9, 2))
+
+
+def test_requests_over_the_limit_are_shed():
+    app = FastAPI()
+    limiter = AdaptiveLimiter(initial_limit=2, min_limit=2, max_limit=2)
+    app.add_middleware(ConcurrencyLimitMiddleware, limiter=limiter)
+
+    @app.get("/qdrant/slow")
+    async def slow():
+        await asyncio.sleep(0.1)
+        return {}
+
+    @app.get("/health")
+    async def health():
+        return {}
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            responses = await asyncio.gather(
+                *(c.get("/qdrant/slow") for _ in range(5)), c.get("/health")
+            )
+        return responses
+
+    responses = asyncio.run(run())
+
+    statuses = sorted(r.status_code for r in responses[:5])
+    assert statuses == [200, 200, 503, 503, 503]
+    assert responses[5].status_code == 200
+    assert next(r for r in responses if r.status_code == 503).headers["Retry-After"]
+    assert limiter.in_flight == 0
+
+
+def test_limiter_ignores_deadlines_shortened_by_the_client():
+    app = FastAPI()
+    limiter = AdaptiveLimiter(initial_limit=20, min_limit=2, max_limit=40)
+    app.add_middleware(DeadlineMiddleware, default_seconds=0.05)
+    app.add_middleware(ConcurrencyLimitMiddleware, limiter=limiter)
+
+    @app.get("/qdrant/slow")
+    async def slow():
+        await asyncio.sleep(0.01)
+        raise DeadlineExceeded("Deadline exceeded during query")
+
+    @app.exception_handler(DeadlineExceeded)
+    async def deadline_exceeded(request, exc):
+        return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+    with TestClient(app) as client:
+        for _ in range(5):
+            response = client.get(
+                "/qdrant/slow", headers={"X-Request-Timeout": "0.001"}
+            )
+            assert response.status_code == 504
+        assert limiter.limit == 20
+        # The server's own deadline passing is a sign of overload
+        assert client.get("/qdrant/slow").status_code == 504
+        assert limiter.limit == pytest.approx(18)
+
+
+def test_limiter_averages_kinds_of_requests_apart():
+    limiter = AdaptiveLimiter(initial_limit=20, min_limit=2, max_limit=40)
+
+    for _ in range(10):
+        limiter.try_acquire()
+        limiter.release(0.002)
+        limiter.try_acquire()
+        limiter.release(2.0, kind="ingest")
+
+    latency = limiter.stats()["latency_ms"]
+    assert latency["default"] == {"short": 2.0, "long": 2.0}
+    assert latency["ingest"] == {"short": 2000.0, "long": 2000.0}
+    # Slow ingests do not read as a latency rise of the point reads
+    assert limiter.limit >= 20
@@ -0,0 +1,63 @@
+import numpy as np
+from app.services.retrieval import mmr_select, pack_to_budget, postprocess
+
+
+def test_mmr_prefers_diverse_candidates():
+    query = np.array([1.0, 0.0, 0.0])
+    candidates = np.array(
+        [
+            [1.0, 0.1, 0.0],
+            [1.0, 0.12, 0.0],  # nearly the same as the first
+            [0.7, 0.0, 0.7],
+            [0.0, 1.0, 0.0],
+        ]
+    )
+
+    relevance_only, _ = mmr_select(query, candidates, k=3, mmr_lambda=1.0)
+    diverse, _ = mmr_select(query, candidates, k=3, mmr_lambda=0.3)
+    deduplicated, duplicates = mmr_select(
+        query, candidates, k=4, mmr_lambda=1.0, duplicate_threshold=0.99
+    )
+
+    assert relevance_only == [0, 1, 2]
+    assert diverse == [0, 3, 2]
+    assert deduplicated == [0, 2, 3]
+    assert duplicates == 1
+
+
+def test_pack_to_budget_skips_items_that_do_not_fit():
+    assert pack_to_budget([4, 8, 3, 2], max_tokens=10) == [0, 2, 3]
+    assert pack_to_budget([4, 8, 3, 2], max_tokens=10, limit=2) == [0, 2]
+    assert pack_to_budget([12], max_tokens=10) == []
+
+
+def test_postprocess_packs_candidates_into_the_budget():
+    class WordTokenizer:
+        def __call__(self, texts, add_special_tokens=True):
+            return {"input_ids": [text.split() for text in texts]}
+
+    points = [
+        {"id": i, "vector": vector, "payload": {"text": text}}
+        for i, (vector, text) in enumerate(
+            [
+                ([1.0, 0.0], "one two three"),
+                ([0.9, 0.1], "a much longer text than the budget allows"),
+                ([0.8, 0.3], "four five"),
+                ([0.7, 0.5], "six"),
+            ]
+        )
+    ]
+
+    result = postprocess(
+        points,
+        np.array([1.0, 0.0]),
+        top_k=2,
+        mmr_lambda=1.0,
+        max_tokens=6,
+        tokenizer=WordTokenizer(),
+    )
+
+    assert [p["id"] for p in result["points"]] == [0, 2]
+    assert result["tokens"] == 5
+    assert result["over_budget"] == 1
+    assert result["candidates"] == 4
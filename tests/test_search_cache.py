@@ -0,0 +1,17 @@
+from app.models.models import SearchQuery
+from app.services.search_cache import SearchCache
+
+
+def test_search_overlapping_a_collection_delete_is_not_cached():
+    cache = SearchCache()
+    query = SearchQuery(vector=[1.0, 0.0])
+
+    # A search of the new collection starts, then the collection is deleted
+    # and recreated under the same name before it finishes
+    cache.get(cache.key("docs", query))
+    started = cache.key("docs", query)
+    cache.forget("docs")
+    cache.put(started, ["deleted point"])
+
+    assert cache.get(cache.key("docs", query)) is None
+    assert cache.stats("docs")["misses"] == 1
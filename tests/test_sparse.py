@@ -0,0 +1,74 @@
+import pytest
+
+pytest.importorskip("transformers")
+
+from app.services.embedding import EmbeddingService
+from app.services.sparse import SparseEncoder
+
+TEXTS = [
+    "search the vector database",
+    "a long document chunk stores the text for retrieval and the query filter",
+    "cosine distance",
+]
+
+
+@pytest.fixture(scope="module")
+def tokenizer(tiny_model_path):
+    from transformers import BertTokenizerFast
+
+    return BertTokenizerFast.from_pretrained(tiny_model_path)
+
+
+def test_bm25_term_weights(tokenizer):
+    encoder = SparseEncoder(tokenizer, k1=1.2, b=0.75, avg_length=4)
+    short, repeated = encoder.encode_documents(["cosine", "cosine cosine text"])
+    cosine = tokenizer.convert_tokens_to_ids("cosine")
+
+    assert short["indices"] == [cosine]
+    # Shorter than average documents weigh a matching term more
+    assert short["values"][0] > 1.0
+    weights = dict(zip(repeated["indices"], repeated["values"]))
+    assert weights[cosine] > weights[tokenizer.convert_tokens_to_ids("text")]
+    # Term frequency saturates at k1 + 1
+    assert all(v < 2.2 for v in weights.values())
+
+
+def test_query_vector(tokenizer):
+    query = SparseEncoder(tokenizer).encode_query("the cosine the")
+
+    assert query["indices"] == sorted(query["indices"])
+    assert len(query["indices"]) == 2
+    assert query["values"] == [1.0, 1.0]
+
+
+def test_hybrid_search(tiny_model_path):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        app.state.embedding_service = EmbeddingService(model_name=tiny_model_path)
+        response = client.post(
+            "/qdrant/collections/",
+            json={"name": "test_hybrid", "dimensions": 32, "sparse": True},
+        )
+        assert response.status_code == 201
+        documents = [{"id": i, "text": t} for i, t in enumerate(TEXTS)]
+        response = client.post(
+            "/qdrant/test_hybrid/text", json={"documents": documents, "sparse": True}
+        )
+        assert response.json()["details"]["uploaded"] == 3
+
+        response = client.post(
+            "/qdrant/test_hybrid/search/hybrid", json={"text": "cosine", "top_k": 3}
+        )
+        assert response.status_code == 200
+        points = response.json()["details"]["points"]
+        # The only exact term match ranks first whatever the dense ranking is
+        assert points[0]["id"] == 2
+        assert len(points) == 3
+
+        document = client.get("/qdrant/test_hybrid/2").json()["details"]
+        assert len(document["vector"]) == 32
+        assert document["sparse_vector"]["indices"]
+
+        client.delete("/qdrant/collections/test_hybrid")
@@ -0,0 +1,200 @@
+import asyncio
+import pytest
+from app.models.models import Document
+from app.services.write_buffer import BufferFull, WriteBuffer, WriteTooLarge
+
+
+class FakeQdrantService:
+    """Records the batches a WriteBuffer flushes.
+
+    Upserts fail with ``status_code`` when ``fail`` is set (only the first
+    ``failures`` times, if given), and always with 503 for collections in
+    ``down``. Updates of ``missing`` ids fail the whole call with 404.
+    """
+
+    def __init__(self, fail=False, status_code=400, failures=None, missing=(), down=()):
+        self.fail = fail
+        self.status_code = status_code
+        self.failures = failures
+        self.missing = set(missing)
+        self.down = set(down)
+        self.calls = []
+
+    def _status(self, collection):
+        if collection.name in self.down:
+            return 503
+        if not self.fail:
+            return None
+        if self.failures is not None:
+            self.failures -= 1
+            if self.failures < 0:
+                return None
+        return self.status_code
+
+    async def upload_documents(self, collection, documents, chunk_size=None):
+        self.calls.append(("upsert", collection.name, documents))
+        chunk = {"chunk": 0, "offset": 0, "count": len(documents)}
+        status_code = self._status(collection)
+        if status_code is not None:
+            chunk.update(success=False, status_code=status_code, error="unavailable")
+        else:
+            chunk.update(success=True)
+        return {"success": status_code is None, "content": {"chunks": [chunk]}}
+
+    async def update_documents(self, collection, documents):
+        self.calls.append(("update", collection.name, documents))
+        missing = [d.id for d in documents if d.id in self.missing]
+        if missing:
+            return {
+                "success": False,
+                "status_code": 404,
+                "content": f"No point with id {missing[0]}",
+            }
+        return {"success": True, "content": {}}
+
+
+def doc(id, value=0.1):
+    return Document(id=id, vector=[value, value], metadata={"value": value})
+
+
+def test_writes_are_coalesced_and_flushed():
+    service = FakeQdrantService()
+    buffer = WriteBuffer(service, flush_size=100, flush_interval_ms=10, workers=1)
+
+    async def run():
+        await buffer.start()
+        first = buffer.submit("docs", "upsert", [doc(1), doc(2)])
+        second = buffer.submit("docs", "upsert", [doc(1, 0.5)])
+        update = buffer.submit("docs", "update", [doc(2, 0.9)])
+        await buffer.close()
+        return first, second, update
+
+    first, second, update = asyncio.run(run())
+
+    # One upsert holding the latest version of each document
+    assert len(service.calls) == 1
+    operation, collection, documents = service.calls[0]
+    assert (operation, collection) == ("upsert", "docs")
+    assert [(d.id, d.vector[0]) for d in documents] == [(2, 0.9), (1, 0.5)]
+    assert documents[0].metadata == {"value": 0.1}
+    assert first.report()["superseded"] == 1
+    assert first.status == second.status == update.status == "done"
+    assert buffer.stats()["documents"] == 0
+
+
+def test_full_buffer_rejects_writes():
+    buffer = WriteBuffer(FakeQdrantService(), max_documents=2)
+
+    buffer.submit("docs", "upsert", [doc(1), doc(2)])
+
+    with pytest.raises(BufferFull):
+        buffer.submit("docs", "upsert", [doc(3)])
+    # More than the buffer can ever hold is not worth retrying
+    with pytest.raises(WriteTooLarge):
+        buffer.submit("docs", "upsert", [doc(3), doc(4), doc(5)])
+    with pytest.raises(ValueError):
+        buffer.submit("docs", "upsert", [Document(vector=[0.1, 0.2])])
+    assert buffer.stats()["rejected"] == 1
+
+
+def test_failed_flush_is_reported_on_the_job():
+    buffer = WriteBuffer(FakeQdrantService(fail=True), flush_interval_ms=1)
+
+    async def run():
+        await buffer.start()
+        job = buffer.submit("docs", "upsert", [doc(1), doc(2)])
+        await buffer.close()
+        return job
+
+    job = asyncio.run(run())
+
+    assert job.status == "failed"
+    assert job.errors[0] == "unavailable"
+    assert buffer.stats()["failed"] == 2
+
+
+def test_unflushed_writes_are_replayed_from_the_log(tmp_path):
+    log_path = str(tmp_path / "writes.log")
+    crashed = WriteBuffer(FakeQdrantService(), log_path=log_path)
+    asyncio.run(asyncio.to_thread(crashed._open_log))
+    job = crashed.submit("docs", "upsert", [doc(1), doc(2, 0.3)])
+    # The process stops before anything is flushed
+
+    service = FakeQdrantService()
+    buffer = WriteBuffer(service, log_path=log_path, flush_interval_ms=1)
+
+    async def run():
+        await buffer.start()
+        await buffer.close()
+
+    asyncio.run(run())
+
+    assert [d.id for d in service.calls[0][2]] == [1, 2]
+    assert buffer.job(job.id).status == "done"
+    with open(log_path, "rb") as f:
+        assert f.read() == b""
+
+
+def test_temporary_failures_are_retried():
+    service = FakeQdrantService(fail=True, status_code=503, failures=2)
+    buffer = WriteBuffer(service, flush_interval_ms=1)
+
+    async def run():
+        await buffer.start()
+        job = buffer.submit("docs", "upsert", [doc(1), doc(2)])
+        while job.pending:
+            await asyncio.sleep(0.01)
+        await buffer.close()
+        return job
+
+    job = asyncio.run(run())
+
+    assert job.status == "done"
+    assert len(service.calls) == 3
+    assert buffer.stats()["retried"] == 4
+
+
+def test_rejected_update_batch_is_split():
+    service = FakeQdrantService(missing=[2])
+    buffer = WriteBuffer(service, flush_size=100, flush_interval_ms=10, workers=1)
+
+    async def run():
+        await buffer.start()
+        good = buffer.submit("docs", "update", [doc(1), doc(3), doc(4)])
+        bad = buffer.submit("docs", "update", [doc(2)])
+        await buffer.close()
+        return good, bad
+
+    good, bad = asyncio.run(run())
+
+    assert good.status == "done"
+    assert bad.status == "failed"
+    assert bad.errors == ["No point with id 2"]
+
+
+def test_log_is_compacted_under_load(tmp_path):
+    log_path = tmp_path / "writes.log"
+    service = FakeQdrantService(down=["offline"])
+    buffer = WriteBuffer(
+        service, max_documents=4, flush_interval_ms=1, log_path=str(log_path)
+    )
+
+    async def run():
+        await buffer.start()
+        # Never written, so the buffer is never empty and the log never reset
+        buffer.submit("offline", "upsert", [doc(1)])
+        for i in range(20):
+            job = buffer.submit("docs", "upsert", [doc(i)])
+            while job.pending:
+                await asyncio.sleep(0.001)
+        await buffer.close(timeout=0.1)
+
+    asyncio.run(run())
+
+    lines = log_path.read_bytes().splitlines()
+    assert len(lines) < 10
+    replayed = WriteBuffer(FakeQdrantService(), log_path=str(log_path))
+    replayed._open_log()
+    assert replayed.stats()["collections"] == {
+        "offline": {"pending": 1, "flushing": False}
+    }